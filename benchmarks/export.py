@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+
+"""
+Benchmark the specifications export on a synthetic collection
+
+Times each stage of the export separately (YAML load, order_data, rendering
+and publishing to a local stand-in for GitHub) and writes the results as JSON
+so they can be compared between commits:
+
+    python -m benchmarks.export --specifications 100 --fields 50 --output before.json
+    python -m benchmarks.export --specifications 100 --fields 50 --compare before.json
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import resource
+import tempfile
+import tracemalloc
+from io import StringIO
+from datetime import datetime, timezone
+from benchmarks.synthetic import write_collection
+from src.specifications.publishers import DirectoryPublisher, GitPublisher, git
+from src.specifications.update_specifications import yaml, compile_schema, order_data, dump_frontmatter
+
+STAGES = ['load', 'order', 'render', 'publish']
+
+def create_bare_repo(path):
+    """Create a bare git repository with an empty commit on main to publish to"""
+    env = {
+        **os.environ,
+        'GIT_AUTHOR_NAME': 'Benchmark',
+        'GIT_AUTHOR_EMAIL': 'benchmark@localhost',
+        'GIT_COMMITTER_NAME': 'Benchmark',
+        'GIT_COMMITTER_EMAIL': 'benchmark@localhost',
+    }
+    git('init', '-q', '--bare', path)
+    tree = git('mktree', cwd=path, input='')
+    commit = git('commit-tree', tree, '-m', 'Initial commit', cwd=path, env=env)
+    git('update-ref', 'refs/heads/main', commit, cwd=path)
+
+def run_stages(mapping, schema, publisher, branch_name, trace_memory=False):
+    """
+    Run each stage of the export over every file in the mapping
+
+    Args:
+        mapping: Dict of source path to destination path
+        schema: Compiled Schema of the specifications collection
+        publisher: Publisher to publish the rendered files to
+        branch_name: Name of the branch to publish on
+        trace_memory: Record the peak memory allocated in each stage
+
+    Returns:
+        Tuple of dict of stage to seconds, dict of stage to peak bytes
+        (empty unless trace_memory) and dict of rendered files
+    """
+    seconds = {}
+    peaks = {}
+
+    def start():
+        if trace_memory:
+            tracemalloc.reset_peak()
+        return time.perf_counter()
+
+    def stop(stage, started):
+        seconds[stage] = time.perf_counter() - started
+        if trace_memory:
+            peaks[stage] = tracemalloc.get_traced_memory()[1]
+
+    started = start()
+    loaded = []
+    for source in mapping:
+        with open(source, 'r') as f:
+            loaded.append(yaml.load(f.read())["data"])
+    stop('load', started)
+
+    started = start()
+    ordered = [order_data(data, schema) for data in loaded]
+    stop('order', started)
+
+    started = start()
+    files = {}
+    for destination, data in zip(mapping.values(), ordered):
+        files[destination] = dump_frontmatter(data)
+    stop('render', started)
+
+    started = start()
+    publisher.create_branch(branch_name, publisher.get_branch_sha('main'))
+    publisher.publish(branch_name, files)
+    stop('publish', started)
+
+    return seconds, peaks, files
+
+def get_commit():
+    """Get the commit being benchmarked, or None outside a git checkout"""
+    try:
+        return git('rev-parse', 'HEAD')
+    except Exception:
+        return None
+
+def benchmark(specifications=5, datasets=1, fields=20, guidance_length=400, repeat=3,
+              publisher='git', trace_memory=True, seed=0):
+    """
+    Benchmark the export of a synthetic collection
+
+    Args:
+        specifications: Number of specification files
+        datasets: Number of datasets in each specification
+        fields: Number of fields in each dataset
+        guidance_length: Approximate number of characters of guidance per field
+        repeat: Number of timed runs, the fastest of which is reported
+        publisher: Local stand-in to publish to, 'git' or 'directory'
+        trace_memory: Make an extra run tracing the peak memory of each stage
+        seed: Random seed for the synthetic collection
+
+    Returns:
+        Dict of results
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        mapping = write_collection(
+            os.path.join(directory, 'collection'), specifications, datasets, fields, guidance_length, seed
+        )
+        source_bytes = sum(os.path.getsize(source) for source in mapping)
+
+        started = time.perf_counter()
+        schema = compile_schema()
+        config_seconds = time.perf_counter() - started
+
+        if publisher == 'git':
+            target = os.path.join(directory, 'specification.git')
+            create_bare_repo(target)
+            stand_in = GitPublisher(target)
+        else:
+            stand_in = DirectoryPublisher(os.path.join(directory, 'specification'))
+
+        # Keep the per-file progress output of publishing out of the results
+        stdout = sys.stdout
+        sys.stdout = StringIO()
+        try:
+            runs = [
+                run_stages(mapping, schema, stand_in, f"mini-cms/benchmark-{i}")
+                for i in range(repeat)
+            ]
+
+            peaks = {}
+            if trace_memory:
+                tracemalloc.start()
+                try:
+                    _, peaks, _ = run_stages(mapping, schema, stand_in, "mini-cms/benchmark-memory", trace_memory=True)
+                finally:
+                    tracemalloc.stop()
+        finally:
+            sys.stdout = stdout
+
+    rendered_bytes = sum(len(content.encode('utf-8')) for content in runs[0][2].values())
+
+    stages = {}
+    for stage in STAGES:
+        fastest = min(seconds[stage] for seconds, _, _ in runs)
+        stage_bytes = rendered_bytes if stage in ('render', 'publish') else source_bytes
+        stages[stage] = {
+            'seconds': fastest,
+            'files_per_second': len(mapping) / fastest if fastest else None,
+            'bytes_per_second': stage_bytes / fastest if fastest else None,
+            'peak_memory_bytes': peaks.get(stage),
+        }
+
+    return {
+        'commit': get_commit(),
+        'created': datetime.now(timezone.utc).isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'parameters': {
+            'specifications': specifications,
+            'datasets': datasets,
+            'fields': fields,
+            'guidance_length': guidance_length,
+            'repeat': repeat,
+            'publisher': publisher,
+            'seed': seed,
+        },
+        'files': len(mapping),
+        'source_bytes': source_bytes,
+        'rendered_bytes': rendered_bytes,
+        'config_seconds': config_seconds,
+        'stages': stages,
+        'total_seconds': sum(stage['seconds'] for stage in stages.values()),
+        # ru_maxrss is in kilobytes on Linux
+        'max_rss_bytes': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024,
+    }
+
+def format_results(results, previous=None):
+    """Format results as a table, with the change from previous results if given"""
+    lines = [
+        f"{results['files']} files, {results['source_bytes'] / 1e6:.2f} MB source, "
+        f"{results['rendered_bytes'] / 1e6:.2f} MB rendered",
+        "",
+        f"{'stage':<10}{'seconds':>10}{'files/s':>12}{'MB/s':>10}{'peak MB':>10}" + (f"{'change':>10}" if previous else ""),
+    ]
+
+    for stage, result in results['stages'].items():
+        peak = result['peak_memory_bytes']
+        line = (
+            f"{stage:<10}{result['seconds']:>10.4f}{result['files_per_second'] or 0:>12.1f}"
+            f"{(result['bytes_per_second'] or 0) / 1e6:>10.2f}{(peak / 1e6 if peak is not None else float('nan')):>10.2f}"
+        )
+        if previous and stage in previous['stages']:
+            line += f"{result['seconds'] / previous['stages'][stage]['seconds']:>9.2f}x"
+        lines.append(line)
+
+    lines.append(f"{'total':<10}{results['total_seconds']:>10.4f}")
+    return "\n".join(lines)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the specifications export on a synthetic collection")
+    parser.add_argument("--specifications", type=int, default=5, help="number of specification files (default: 5)")
+    parser.add_argument("--datasets", type=int, default=1, help="datasets per specification (default: 1)")
+    parser.add_argument("--fields", type=int, default=20, help="fields per dataset (default: 20)")
+    parser.add_argument("--guidance-length", type=int, default=400,
+                        help="approximate characters of guidance per field (default: 400)")
+    parser.add_argument("--repeat", type=int, default=3, help="number of timed runs (default: 3)")
+    parser.add_argument("--publisher", choices=['git', 'directory'], default='git',
+                        help="local stand-in to publish to (default: git)")
+    parser.add_argument("--no-memory", action="store_true", help="skip the memory tracing run")
+    parser.add_argument("--seed", type=int, default=0, help="random seed (default: 0)")
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    parser.add_argument("--compare", help="JSON results of a previous run to compare against")
+    args = parser.parse_args(argv)
+
+    results = benchmark(
+        specifications=args.specifications,
+        datasets=args.datasets,
+        fields=args.fields,
+        guidance_length=args.guidance_length,
+        repeat=args.repeat,
+        publisher=args.publisher,
+        trace_memory=not args.no_memory,
+        seed=args.seed,
+    )
+
+    previous = None
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            previous = json.load(f)
+
+    print(format_results(results, previous))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}")
+
+    return results
+
+if __name__ == "__main__":
+    main()
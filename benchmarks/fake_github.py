@@ -0,0 +1,602 @@
+#!/usr/bin/env python3
+
+"""
+Local stand-in for the parts of the GitHub API the exporter uses
+
+Serves the REST and GraphQL requests PyGithub makes for a sync from a local
+bare git repository, so a sync can be run end to end without a network:
+
+    with FakeGitHub(path) as github:
+        repo = github.client().get_repo(github.repository)
+        ...
+        assert github.count('PUT', '/contents/') == 5
+
+Every request is recorded with its status, size and duration. Latency can
+be added to each request, and rate limits or server errors injected, to
+reproduce production failures. It can also be run on its own, to point the
+command line at with `GITHUB_API_URL`:
+
+    python -m benchmarks.fake_github /tmp/specification.git --port 8000 --latency 0.05
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import base64
+import argparse
+import threading
+import subprocess
+from urllib.parse import urlsplit, parse_qs, unquote, urlencode
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from src.specifications.publishers import git
+
+# Author of every commit made through the API
+IDENTITY = {
+    'GIT_AUTHOR_NAME': 'Fake GitHub',
+    'GIT_AUTHOR_EMAIL': 'fake-github@localhost',
+    'GIT_COMMITTER_NAME': 'Fake GitHub',
+    'GIT_COMMITTER_EMAIL': 'fake-github@localhost',
+}
+
+class ApiError(Exception):
+    """An error response, with the status and message GitHub would send"""
+
+    def __init__(self, status, message, headers=None):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+        self.headers = headers or {}
+
+class FakeGitHub:
+    """
+    GitHub API server for one repository, backed by a bare git repository
+
+    Args:
+        path: Bare git repository to serve, which must have a main branch
+        repository: Full name the repository is served as
+        latency: Seconds to wait before answering each request
+    """
+
+    def __init__(self, path, repository='digital-land/specification', latency=0.0):
+        self.path = path
+        self.repository = repository
+        self.latency = latency
+        self.calls = []
+        self.pulls = []
+        self.failures = []
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def repo_url(self):
+        return f"{self.base_url}/repos/{self.repository}"
+
+    def start(self, port=0):
+        """Start serving in a background thread, on a free port unless given one"""
+        self._server = ThreadingHTTPServer(('127.0.0.1', port), _Handler)
+        self._server.daemon_threads = True
+        self._server.fake = self
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop serving"""
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+
+    def client(self, **kwargs):
+        """
+        Get a PyGithub client for the server
+
+        The client is configured as a sync's is (see client_options), but
+        without backoff or throttling, so retries don't slow tests down.
+        Keyword arguments override the client options.
+        """
+        from github import Github, Auth
+        from src.specifications.github_client import client_options
+
+        options = {**client_options(backoff_factor=0, jitter=0), 'base_url': self.base_url, **kwargs}
+        return Github(auth=Auth.Token('fake-token'), seconds_between_requests=None, seconds_between_writes=None,
+                      **options)
+
+    def fail(self, status, method=None, path=None, times=1, message=None, headers=None):
+        """
+        Answer the next matching requests with an error instead
+
+        Args:
+            status: HTTP status to answer with, such as 502
+            method: Only fail requests with this method
+            path: Only fail requests whose path matches this regular expression
+            times: Number of requests to fail
+            message: Message of the error, saying it was injected if not given
+            headers: Extra headers to send with the error
+        """
+        with self._lock:
+            self.failures.append({
+                'status': status,
+                'method': method,
+                'path': re.compile(path) if path else None,
+                'times': times,
+                'message': message or f"Injected {status} error",
+                'headers': headers or {},
+            })
+
+    def rate_limit(self, method=None, path=None, times=1, reset=0, retry_after=None):
+        """
+        Answer the next matching requests as if the primary rate limit ran out
+
+        Args:
+            method: Only limit requests with this method
+            path: Only limit requests whose path matches this regular expression
+            times: Number of requests to limit
+            reset: Seconds until the limit resets, as sent in X-RateLimit-Reset
+            retry_after: Seconds to send in Retry-After, which is left out if not given
+        """
+        headers = {
+            'X-RateLimit-Limit': '5000',
+            'X-RateLimit-Remaining': '0',
+            'X-RateLimit-Reset': str(int(time.time() + reset)),
+        }
+        if retry_after is not None:
+            headers['Retry-After'] = str(retry_after)
+        self.fail(403, method=method, path=path, times=times, headers=headers,
+                  message="API rate limit exceeded for installation ID 1.")
+
+    def count(self, method=None, path=None):
+        """Count the recorded calls with a method and a path matching a regular expression"""
+        return len(self.find_calls(method, path))
+
+    def find_calls(self, method=None, path=None):
+        """Get the recorded calls with a method and a path matching a regular expression"""
+        return [
+            call for call in self.calls
+            if (method is None or call['method'] == method) and (path is None or re.search(path, call['path']))
+        ]
+
+    def reset_calls(self):
+        """Forget the recorded calls"""
+        self.calls = []
+
+    def _take_failure(self, method, path):
+        with self._lock:
+            for failure in self.failures:
+                if failure['method'] not in (None, method):
+                    continue
+                if failure['path'] is not None and not failure['path'].search(path):
+                    continue
+                failure['times'] -= 1
+                if failure['times'] <= 0:
+                    self.failures.remove(failure)
+                return failure
+        return None
+
+    def handle(self, method, path, query, body):
+        """
+        Answer one request
+
+        Returns:
+            Tuple of status, JSON-serialisable response and dict of headers
+        """
+        failure = self._take_failure(method, path)
+        if failure is not None:
+            raise ApiError(failure['status'], failure['message'], failure['headers'])
+
+        if path == '/graphql' and method == 'POST':
+            return 200, self._graphql(body), {}
+
+        prefix = f"/repos/{self.repository}"
+        if path != prefix and not path.startswith(prefix + '/'):
+            raise ApiError(404, "Not Found")
+        route = path[len(prefix):]
+
+        # Writes change refs and the pull requests, so they are made one at a time
+        with self._lock:
+            for pattern, route_method, handler in ROUTES:
+                match = re.fullmatch(pattern, route)
+                if match and route_method == method:
+                    return handler(self, query, body, *[unquote(group) for group in match.groups()])
+        raise ApiError(404, "Not Found")
+
+    # Git
+
+    def _git(self, *args, input=None, env=None):
+        return git(*args, cwd=self.path, input=input, env={**os.environ, **IDENTITY, **(env or {})})
+
+    def _resolve(self, ref):
+        """Get the commit SHA of a branch or commit, or None if there is none"""
+        try:
+            return self._git('rev-parse', '--verify', '--quiet', f"{ref}^{{commit}}")
+        except Exception:
+            return None
+
+    def _read_blob(self, tree_ish, path):
+        """Get the blob SHA and content of a file at a commit, or None if there is no such file"""
+        try:
+            sha = self._git('rev-parse', '--verify', '--quiet', f"{tree_ish}:{path}")
+            if self._git('cat-file', '-t', sha) != 'blob':
+                return None
+        except Exception:
+            return None
+        return sha, self._cat(sha)
+
+    def _cat(self, sha):
+        """Get the content of a blob, byte for byte"""
+        return subprocess.run(['git', 'cat-file', 'blob', sha], cwd=self.path, capture_output=True,
+                              check=True).stdout
+
+    def _commit_file(self, branch, path, content, message):
+        """Commit one file on top of a branch, moving the branch, and return the new commit SHA"""
+        head = self._resolve(f"refs/heads/{branch}")
+        blob = self._git('hash-object', '-w', '--stdin', input=content.decode('utf-8'))
+        tree = self._write_tree(head, [(path, blob)])
+        commit = self._git('commit-tree', tree, '-p', head, '-m', message)
+        self._git('update-ref', f"refs/heads/{branch}", commit, head)
+        return commit
+
+    def _write_tree(self, base, entries):
+        """Write a tree of a base commit or tree with (path, blob SHA) entries added, returning its SHA"""
+        index = os.path.join(self.path, f"fake-github-index-{threading.get_ident()}")
+        env = {'GIT_INDEX_FILE': index}
+        try:
+            if base:
+                self._git('read-tree', base, env=env)
+            else:
+                self._git('read-tree', '--empty', env=env)
+            for path, blob in entries:
+                self._git('update-index', '--add', '--cacheinfo', f"100644,{blob},{path}", env=env)
+            return self._git('write-tree', env=env)
+        finally:
+            if os.path.exists(index):
+                os.remove(index)
+
+    # JSON shapes
+
+    def _ref_json(self, ref, sha):
+        return {
+            'ref': ref,
+            'url': f"{self.repo_url}/git/{ref}",
+            'object': {'sha': sha, 'type': 'commit', 'url': f"{self.repo_url}/git/commits/{sha}"},
+        }
+
+    def _commit_json(self, sha):
+        tree, parents, message = self._git('show', '-s', '--format=%T%n%P%n%B', sha).split('\n', 2)
+        return {
+            'sha': sha,
+            'url': f"{self.repo_url}/git/commits/{sha}",
+            'message': message,
+            'tree': {'sha': tree, 'url': f"{self.repo_url}/git/trees/{tree}"},
+            'parents': [{'sha': parent, 'url': f"{self.repo_url}/git/commits/{parent}"} for parent in parents.split()],
+        }
+
+    def _content_json(self, path, sha, content=None):
+        data = {
+            'type': 'file',
+            'name': path.rsplit('/', 1)[-1],
+            'path': path,
+            'sha': sha,
+            'url': f"{self.repo_url}/contents/{path}",
+        }
+        if content is not None:
+            data.update({'size': len(content), 'encoding': 'base64',
+                         'content': base64.b64encode(content).decode('ascii')})
+        return data
+
+    def _repository_json(self):
+        owner, name = self.repository.split('/', 1)
+        return {
+            'id': 1,
+            'name': name,
+            'full_name': self.repository,
+            'owner': {'login': owner, 'type': 'Organization'},
+            'url': self.repo_url,
+            'html_url': f"{self.base_url}/{self.repository}",
+            'default_branch': 'main',
+        }
+
+    def _pull_json(self, pull):
+        return {
+            **pull,
+            'url': f"{self.repo_url}/pulls/{pull['number']}",
+            'html_url': f"{self.base_url}/{self.repository}/pull/{pull['number']}",
+            'head': {'ref': pull['head'], 'sha': self._resolve(f"refs/heads/{pull['head']}"),
+                     'repo': self._repository_json()},
+            'base': {'ref': pull['base'], 'sha': self._resolve(f"refs/heads/{pull['base']}"),
+                     'repo': self._repository_json()},
+        }
+
+    # Routes
+
+    def _get_repository(self, query, body):
+        return 200, self._repository_json(), {}
+
+    def _get_branch(self, query, body, branch):
+        sha = self._resolve(f"refs/heads/{branch}")
+        if sha is None:
+            raise ApiError(404, "Branch not found")
+        return 200, {'name': branch, 'commit': {'sha': sha, 'url': f"{self.repo_url}/commits/{sha}"}}, {}
+
+    def _get_ref(self, query, body, ref):
+        sha = self._resolve(f"refs/{ref}")
+        if sha is None:
+            raise ApiError(404, "Not Found")
+        return 200, self._ref_json(f"refs/{ref}", sha), {}
+
+    def _create_ref(self, query, body):
+        ref, sha = body['ref'], body['sha']
+        if self._resolve(ref) is not None:
+            raise ApiError(422, "Reference already exists")
+        if self._resolve(sha) is None:
+            raise ApiError(422, "Object does not exist")
+        self._git('update-ref', ref, sha)
+        return 201, self._ref_json(ref, sha), {}
+
+    def _update_ref(self, query, body, ref):
+        current = self._resolve(f"refs/{ref}")
+        if current is None:
+            raise ApiError(422, "Reference does not exist")
+        sha = body['sha']
+        if self._resolve(sha) is None:
+            raise ApiError(422, "Object does not exist")
+        if not body.get('force'):
+            try:
+                self._git('merge-base', '--is-ancestor', current, sha)
+            except Exception:
+                raise ApiError(422, "Update is not a fast forward")
+        self._git('update-ref', f"refs/{ref}", sha)
+        return 200, self._ref_json(f"refs/{ref}", sha), {}
+
+    def _get_commit(self, query, body, sha):
+        if self._resolve(sha) is None:
+            raise ApiError(404, "Not Found")
+        return 200, self._commit_json(sha), {}
+
+    def _create_commit(self, query, body):
+        parents = [argument for parent in body.get('parents', []) for argument in ('-p', parent)]
+        sha = self._git('commit-tree', body['tree'], *parents, '-m', body['message'])
+        return 201, self._commit_json(sha), {}
+
+    def _get_tree(self, query, body, sha):
+        arguments = ['ls-tree', '-l', '--full-tree'] + (['-r'] if query.get('recursive') else []) + [sha]
+        try:
+            listing = self._git(*arguments)
+        except Exception:
+            raise ApiError(404, "Not Found")
+        tree = []
+        for line in listing.splitlines():
+            info, path = line.split('\t', 1)
+            mode, kind, object_sha, size = info.split()
+            element = {'path': path, 'mode': mode, 'type': kind, 'sha': object_sha,
+                       'url': f"{self.repo_url}/git/{kind}s/{object_sha}"}
+            if kind == 'blob':
+                element['size'] = int(size)
+            tree.append(element)
+        return 200, {'sha': sha, 'url': f"{self.repo_url}/git/trees/{sha}", 'tree': tree, 'truncated': False}, {}
+
+    def _create_tree(self, query, body):
+        entries = []
+        for element in body['tree']:
+            if 'content' in element:
+                blob = self._git('hash-object', '-w', '--stdin', input=element['content'])
+            else:
+                blob = element['sha']
+            entries.append((element['path'], blob))
+        sha = self._write_tree(body.get('base_tree'), entries)
+        return 201, {'sha': sha, 'url': f"{self.repo_url}/git/trees/{sha}", 'tree': [], 'truncated': False}, {}
+
+    def _get_blob(self, query, body, sha):
+        try:
+            content = self._cat(sha)
+        except Exception:
+            raise ApiError(404, "Not Found")
+        return 200, {'sha': sha, 'size': len(content), 'encoding': 'base64',
+                     'content': base64.b64encode(content).decode('ascii'),
+                     'url': f"{self.repo_url}/git/blobs/{sha}"}, {}
+
+    def _get_commits(self, query, body):
+        arguments = ['rev-list', query.get('sha', 'main')]
+        if query.get('path'):
+            arguments += ['--', query['path']]
+        try:
+            shas = self._git(*arguments).split()
+        except Exception:
+            raise ApiError(404, "Not Found")
+        page, headers = self._paginate(shas, query, '/commits')
+        return 200, [
+            {'sha': sha, 'url': f"{self.repo_url}/commits/{sha}", 'commit': self._commit_json(sha)}
+            for sha in page
+        ], headers
+
+    def _get_contents(self, query, body, path):
+        ref = query.get('ref', 'main')
+        found = self._read_blob(ref, path)
+        if found is None:
+            raise ApiError(404, "Not Found")
+        return 200, self._content_json(path, found[0], found[1]), {}
+
+    def _put_contents(self, query, body, path):
+        branch = body.get('branch', 'main')
+        if self._resolve(f"refs/heads/{branch}") is None:
+            raise ApiError(404, f"Branch {branch} not found")
+        existing = self._read_blob(f"refs/heads/{branch}", path)
+        if existing is not None and 'sha' not in body:
+            raise ApiError(422, "Invalid request.\n\n\"sha\" wasn't supplied.")
+        if existing is not None and body['sha'] != existing[0]:
+            raise ApiError(409, f"{path} does not match {body['sha']}")
+
+        content = base64.b64decode(body['content'])
+        commit = self._commit_file(branch, path, content, body['message'])
+        blob = self._read_blob(commit, path)[0]
+        return (200 if existing else 201), {
+            'content': self._content_json(path, blob),
+            'commit': self._commit_json(commit),
+        }, {}
+
+    def _get_pulls(self, query, body):
+        pulls = [
+            self._pull_json(pull) for pull in self.pulls
+            if query.get('state', 'open') in ('all', pull['state'])
+            and query.get('base') in (None, pull['base'])
+            and query.get('head') in (None, f"{self.repository.split('/')[0]}:{pull['head']}")
+        ]
+        page, headers = self._paginate(pulls, query, '/pulls')
+        return 200, page, headers
+
+    def _create_pull(self, query, body):
+        for ref in (body['head'], body['base']):
+            if self._resolve(f"refs/heads/{ref}") is None:
+                raise ApiError(422, f"Validation Failed: no branch {ref}")
+        if any(pull['head'] == body['head'] and pull['state'] == 'open' for pull in self.pulls):
+            raise ApiError(422, f"A pull request already exists for {body['head']}.")
+        pull = {
+            'number': len(self.pulls) + 1,
+            'state': 'open',
+            'title': body['title'],
+            'body': body.get('body'),
+            'head': body['head'],
+            'base': body['base'],
+        }
+        self.pulls.append(pull)
+        return 201, self._pull_json(pull), {}
+
+    def _update_pull(self, query, body, number):
+        for pull in self.pulls:
+            if str(pull['number']) == number:
+                pull.update({key: body[key] for key in ('title', 'body', 'state', 'base') if key in body})
+                return 200, self._pull_json(pull), {}
+        raise ApiError(404, "Not Found")
+
+    def _paginate(self, items, query, route):
+        """Get the page of items a query asks for, and the Link header to the next page"""
+        per_page = int(query.get('per_page', 30))
+        page = int(query.get('page', 1))
+        start = (page - 1) * per_page
+        headers = {}
+        if start + per_page < len(items):
+            headers['Link'] = f'<{self.repo_url}{route}?{urlencode({**query, "page": page + 1})}>; rel="next"'
+        return items[start:start + per_page], headers
+
+    def _graphql(self, body):
+        """Answer the blob queries made by GitHubPublisher.get_published_contents"""
+        data = {}
+        for alias, expression in re.findall(r'(\w+): object\(expression: ("(?:[^"\\]|\\.)*")\)', body['query']):
+            tree_ish, path = json.loads(expression).split(':', 1)
+            found = self._read_blob(tree_ish, path)
+            if found is None:
+                data[alias] = None
+            else:
+                data[alias] = {'oid': found[0], 'text': found[1].decode('utf-8'), 'isTruncated': False}
+        return {'data': {'repository': data}}
+
+# Route pattern, below the repository's path, to method and handler
+ROUTES = [
+    (r'', 'GET', FakeGitHub._get_repository),
+    (r'/branches/(.+)', 'GET', FakeGitHub._get_branch),
+    (r'/git/refs?/(heads/.+)', 'GET', FakeGitHub._get_ref),
+    (r'/git/refs', 'POST', FakeGitHub._create_ref),
+    (r'/git/refs/(heads/.+)', 'PATCH', FakeGitHub._update_ref),
+    (r'/git/commits/([0-9a-f]+)', 'GET', FakeGitHub._get_commit),
+    (r'/git/commits', 'POST', FakeGitHub._create_commit),
+    (r'/git/trees/([0-9a-f]+)', 'GET', FakeGitHub._get_tree),
+    (r'/git/trees', 'POST', FakeGitHub._create_tree),
+    (r'/git/blobs/([0-9a-f]+)', 'GET', FakeGitHub._get_blob),
+    (r'/commits', 'GET', FakeGitHub._get_commits),
+    (r'/contents/(.+)', 'GET', FakeGitHub._get_contents),
+    (r'/contents/(.+)', 'PUT', FakeGitHub._put_contents),
+    (r'/pulls', 'GET', FakeGitHub._get_pulls),
+    (r'/pulls', 'POST', FakeGitHub._create_pull),
+    (r'/pulls/(\d+)', 'PATCH', FakeGitHub._update_pull),
+]
+
+class _Handler(BaseHTTPRequestHandler):
+    """Passes each request to the FakeGitHub and records it"""
+
+    protocol_version = 'HTTP/1.1'
+    # Headers and body are written separately, which Nagle's algorithm would hold up for an ACK
+    disable_nagle_algorithm = True
+
+    def respond(self):
+        started = time.perf_counter()
+        fake = self.server.fake
+        url = urlsplit(self.path)
+        # Also answer GitHub Enterprise Server paths, for a base URL ending in /api/v3
+        path = re.sub(r'^/api(/v3)?(?=/)', '', url.path)
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        length = int(self.headers.get('Content-Length') or 0)
+        raw = self.rfile.read(length) if length else b''
+
+        if fake.latency:
+            time.sleep(fake.latency)
+
+        try:
+            status, data, headers = fake.handle(self.command, path, query, json.loads(raw) if raw else {})
+        except ApiError as e:
+            status, data, headers = e.status, {'message': e.message}, e.headers
+        except Exception as e:
+            status, data, headers = 500, {'message': f"{type(e).__name__}: {e}"}, {}
+
+        response = json.dumps(data).encode('utf-8')
+        # Recorded before answering, so the call is there as soon as the client has its response
+        fake.calls.append({
+            'method': self.command,
+            'path': path,
+            'query': query,
+            'status': status,
+            'bytes_sent': len(raw),
+            'bytes_received': len(response),
+            'seconds': time.perf_counter() - started,
+        })
+
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(response)))
+        for header, value in headers.items():
+            self.send_header(header, value)
+        self.end_headers()
+        self.wfile.write(response)
+
+    do_GET = respond
+    do_POST = respond
+    do_PUT = respond
+    do_PATCH = respond
+    do_DELETE = respond
+
+    def log_message(self, format, *args):
+        pass
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve a local git repository as the GitHub API")
+    parser.add_argument("path", help="bare git repository to serve, with a main branch")
+    parser.add_argument("--repository", default="digital-land/specification",
+                        help="full name to serve the repository as (default: digital-land/specification)")
+    parser.add_argument("--port", type=int, default=8000, help="port to listen on (default: 8000)")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds to wait before each response")
+    args = parser.parse_args(argv)
+
+    fake = FakeGitHub(args.path, repository=args.repository, latency=args.latency)
+    fake.start(args.port)
+    print(f"Serving {args.path} as {args.repository} at {fake.base_url}, "
+          f"use GITHUB_API_URL={fake.base_url} to publish to it")
+    try:
+        fake._thread.join()
+    except KeyboardInterrupt:
+        fake.stop()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+
+"""
+Compare the memory of holding a synthetic collection loaded each way
+
+Loads every file of a synthetic specifications collection and keeps it, as
+round trip `CommentedMap` documents, as those documents with the ordered
+copies order_data makes of them, and as the compact model in
+src/specifications/model.py. Reports the memory each holds once loaded, the
+peak while loading and the time taken:
+
+    python -m benchmarks.model --specifications 200 --fields 50 --output model.json
+"""
+
+import os
+import gc
+import json
+import time
+import argparse
+import tempfile
+import tracemalloc
+from benchmarks.synthetic import write_collection
+from src.specifications.update_specifications import yaml, load_config, compile_schema, order_data
+from src.specifications.model import load_collection
+
+def load_documents(config, sources):
+    documents = []
+    for source in sources:
+        with open(source, 'r') as f:
+            documents.append(yaml.load(f))
+    return documents
+
+def load_ordered(config, sources):
+    schema = compile_schema(config, 'specifications')
+    loaded = []
+    for document in load_documents(config, sources):
+        loaded.append((document, order_data(document['data'], schema)))
+    return loaded
+
+def load_model(config, sources):
+    return load_collection(config, 'specifications', sources=sources)
+
+# Name to a function loading sources and returning what is kept of them
+LOADERS = {
+    'documents': load_documents,
+    'ordered': load_ordered,
+    'model': load_model,
+}
+
+def measure(load, config, sources):
+    """Get the bytes held once loaded, the peak bytes while loading and the seconds taken"""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        started = time.perf_counter()
+        loaded = load(config, sources)
+        seconds = time.perf_counter() - started
+        gc.collect()
+        held, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del loaded
+    return {'held_bytes': held, 'peak_bytes': peak, 'seconds': seconds}
+
+def benchmark(specifications=50, datasets=2, fields=20, guidance_length=400, seed=0):
+    """
+    Measure each way of loading a synthetic collection
+
+    Args:
+        specifications: Number of specification files
+        datasets: Number of datasets in each specification
+        fields: Number of fields in each dataset
+        guidance_length: Approximate number of characters of guidance per field
+        seed: Random seed for the synthetic collection
+
+    Returns:
+        Dict of results
+    """
+    config = load_config()
+    with tempfile.TemporaryDirectory() as directory:
+        mapping = write_collection(directory, specifications, datasets, fields, guidance_length, seed)
+        sources = list(mapping)
+        results = {name: measure(load, config, sources) for name, load in LOADERS.items()}
+        source_bytes = sum(os.path.getsize(source) for source in sources)
+
+    return {
+        'parameters': {
+            'specifications': specifications,
+            'datasets': datasets,
+            'fields': fields,
+            'guidance_length': guidance_length,
+            'seed': seed,
+        },
+        'source_bytes': source_bytes,
+        'loaders': results,
+    }
+
+def format_results(results):
+    """Format results as a table, with each loader's memory relative to the model's"""
+    model = results['loaders']['model']
+    lines = [
+        f"{results['source_bytes'] / 1e6:.2f} MB source",
+        "",
+        f"{'loader':<12}{'held MB':>10}{'peak MB':>10}{'seconds':>10}{'held vs model':>16}",
+    ]
+    for name, result in results['loaders'].items():
+        lines.append(
+            f"{name:<12}{result['held_bytes'] / 1e6:>10.2f}{result['peak_bytes'] / 1e6:>10.2f}"
+            f"{result['seconds']:>10.3f}{result['held_bytes'] / model['held_bytes']:>15.2f}x"
+        )
+    return "\n".join(lines)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare the memory of holding a collection loaded each way")
+    parser.add_argument("--specifications", type=int, default=50, help="number of specification files (default: 50)")
+    parser.add_argument("--datasets", type=int, default=2, help="datasets per specification (default: 2)")
+    parser.add_argument("--fields", type=int, default=20, help="fields per dataset (default: 20)")
+    parser.add_argument("--guidance-length", type=int, default=400,
+                        help="approximate characters of guidance per field (default: 400)")
+    parser.add_argument("--seed", type=int, default=0, help="random seed (default: 0)")
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    args = parser.parse_args(argv)
+
+    results = benchmark(args.specifications, args.datasets, args.fields, args.guidance_length, args.seed)
+    print(format_results(results))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}")
+
+    return results
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+
+"""
+Benchmark the frontmatter serializer against ruamel's emitter
+
+Dumps the ordered data of every specification in the collection, and of a
+synthetic collection, with both and checks the output is identical:
+
+    python -m benchmarks.serializer --specifications 20 --fields 50
+"""
+
+import os
+import glob
+import time
+import argparse
+import tempfile
+from io import StringIO
+from benchmarks.synthetic import write_collection
+from src.specifications.update_specifications import yaml, serializer, compile_schema, order_data
+
+SPECIFICATIONS_GLOB = "data/collections/specifications/*.yml"
+
+def ruamel_dump(data):
+    buffer = StringIO()
+    yaml.dump(data, buffer)
+    return buffer.getvalue()
+
+def time_dump(dump, documents, repeat):
+    """Get the fastest time of dumping every document, over repeat runs"""
+    fastest = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for data in documents:
+            dump(data)
+        seconds = time.perf_counter() - started
+        fastest = seconds if fastest is None else min(fastest, seconds)
+    return fastest
+
+def compare(documents, repeat=5):
+    """
+    Time ruamel and the serializer dumping the same documents
+
+    Args:
+        documents: List of ordered data to dump
+        repeat: Number of timed runs, the fastest of which is reported
+
+    Returns:
+        Dict of results
+
+    Raises:
+        AssertionError: If the output of the two differs for any document
+    """
+    for data in documents:
+        assert serializer.dump(data) == ruamel_dump(data), "serializer output differs from ruamel"
+
+    ruamel_seconds = time_dump(ruamel_dump, documents, repeat)
+    serializer_seconds = time_dump(serializer.dump, documents, repeat)
+
+    return {
+        'documents': len(documents),
+        'bytes': sum(len(serializer.dump(data).encode('utf-8')) for data in documents),
+        'ruamel_seconds': ruamel_seconds,
+        'serializer_seconds': serializer_seconds,
+        'speedup': ruamel_seconds / serializer_seconds if serializer_seconds else None,
+    }
+
+def load_documents(paths, schema):
+    """Load and order the data of source YAML files"""
+    documents = []
+    for path in paths:
+        with open(path, 'r') as f:
+            documents.append(order_data(yaml.load(f)["data"], schema))
+    return documents
+
+def benchmark(specifications=20, datasets=1, fields=50, guidance_length=400, repeat=5, seed=0):
+    """
+    Benchmark the serializer on the specifications collection and a synthetic one
+
+    Returns:
+        Dict of collection name to results
+    """
+    schema = compile_schema()
+    results = {}
+
+    paths = sorted(glob.glob(SPECIFICATIONS_GLOB))
+    if paths:
+        results['specifications'] = compare(load_documents(paths, schema), repeat)
+
+    with tempfile.TemporaryDirectory() as directory:
+        mapping = write_collection(
+            os.path.join(directory, 'collection'), specifications, datasets, fields, guidance_length, seed
+        )
+        results['synthetic'] = compare(load_documents(mapping, schema), repeat)
+
+    return results
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the frontmatter serializer against ruamel")
+    parser.add_argument("--specifications", type=int, default=20, help="number of synthetic specifications (default: 20)")
+    parser.add_argument("--datasets", type=int, default=1, help="datasets per specification (default: 1)")
+    parser.add_argument("--fields", type=int, default=50, help="fields per dataset (default: 50)")
+    parser.add_argument("--guidance-length", type=int, default=400,
+                        help="approximate characters of guidance per field (default: 400)")
+    parser.add_argument("--repeat", type=int, default=5, help="number of timed runs (default: 5)")
+    parser.add_argument("--seed", type=int, default=0, help="random seed (default: 0)")
+    args = parser.parse_args(argv)
+
+    results = benchmark(
+        specifications=args.specifications,
+        datasets=args.datasets,
+        fields=args.fields,
+        guidance_length=args.guidance_length,
+        repeat=args.repeat,
+        seed=args.seed,
+    )
+
+    print(f"{'collection':<16}{'files':>8}{'MB':>8}{'ruamel s':>12}{'serializer s':>14}{'speedup':>10}")
+    for name, result in results.items():
+        print(
+            f"{name:<16}{result['documents']:>8}{result['bytes'] / 1e6:>8.2f}"
+            f"{result['ruamel_seconds']:>12.4f}{result['serializer_seconds']:>14.4f}{result['speedup']:>9.1f}x"
+        )
+
+    return results
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+
+"""
+Benchmark how long the command line takes to start
+
+Times fresh interpreters importing each module and running short offline
+commands, and checks none of them load PyGithub or its HTTP stack, which only
+the commands that talk to GitHub need. Results can be written as JSON and
+compared between commits:
+
+    python -m benchmarks.startup --output before.json
+    python -m benchmarks.startup --compare before.json
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+
+# Name to the arguments to start Python with
+COMMANDS = {
+    'import cli': ['-c', 'import src.specifications.cli'],
+    'import update_specifications': ['-c', 'import src.specifications.update_specifications'],
+    'import validator': ['-c', 'import src.specifications.validator'],
+    'help': ['-m', 'src.specifications', '--help'],
+    'publish --help': ['-m', 'src.specifications', 'publish', '--help'],
+    'validate one file': ['-m', 'src.specifications', 'validate', 'data/collections/specifications/listed-building.yml'],
+    'render one collection': ['-m', 'src.specifications', 'render'],
+}
+
+# Modules only the commands that talk to GitHub should load
+NETWORK_MODULES = ('github', 'requests', 'urllib3')
+
+# Reports the network modules loaded by running the arguments after it as Python would
+LOADED_MODULES_SCRIPT = """
+import sys, runpy
+arguments = sys.argv[1:]
+try:
+    if arguments[0] == '-c':
+        sys.argv = ['-c']
+        exec(arguments[1])
+    else:
+        sys.argv = [arguments[1], *arguments[2:]]
+        runpy.run_module(arguments[1], run_name='__main__', alter_sys=True)
+except SystemExit:
+    pass
+finally:
+    sys.stdout = sys.__stdout__
+    network = sorted({name.split('.')[0] for name in sys.modules} & set(%r))
+    print('LOADED ' + ','.join(network))
+"""
+
+def run(arguments, cwd=None):
+    """Run Python with arguments, returning the seconds taken"""
+    started = time.perf_counter()
+    subprocess.run([sys.executable, *arguments], cwd=cwd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                   check=True)
+    return time.perf_counter() - started
+
+def get_network_modules(arguments, cwd=None):
+    """Get the network modules loaded by running Python with arguments"""
+    result = subprocess.run(
+        [sys.executable, '-c', LOADED_MODULES_SCRIPT % (NETWORK_MODULES,), *arguments],
+        cwd=cwd, capture_output=True, text=True, check=True
+    )
+    loaded = result.stdout.strip().splitlines()[-1][len('LOADED '):]
+    return loaded.split(',') if loaded else []
+
+def benchmark(commands=None, repeat=5, cwd=None):
+    """
+    Time each command starting in a fresh interpreter
+
+    Args:
+        commands: Dict of name to Python arguments, COMMANDS if not given
+        repeat: Number of timed runs, the fastest of which is reported
+        cwd: Directory to run in, the current directory if not given
+
+    Returns:
+        Dict of command name to results
+    """
+    results = {}
+    for name, arguments in (commands or COMMANDS).items():
+        # The first run warms the bytecode cache and isn't timed
+        run(arguments, cwd)
+        results[name] = {
+            'seconds': min(run(arguments, cwd) for _ in range(repeat)),
+            'network_modules': get_network_modules(arguments, cwd),
+        }
+    return results
+
+def format_results(results, previous=None):
+    """Format results as a table, with the change from previous results if given"""
+    lines = [f"{'command':<32}{'seconds':>10}  {'network modules':<20}" + (f"{'change':>10}" if previous else "")]
+    for name, result in results.items():
+        line = f"{name:<32}{result['seconds']:>10.4f}  {','.join(result['network_modules']) or '-':<20}"
+        if previous and name in previous:
+            line += f"{result['seconds'] / previous[name]['seconds']:>9.2f}x"
+        lines.append(line)
+    return "\n".join(lines)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark how long the command line takes to start")
+    parser.add_argument("--repeat", type=int, default=5, help="number of timed runs (default: 5)")
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    parser.add_argument("--compare", help="JSON results of a previous run to compare against")
+    args = parser.parse_args(argv)
+
+    results = benchmark(repeat=args.repeat, cwd=os.getcwd())
+
+    previous = None
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            previous = json.load(f)
+
+    print(format_results(results, previous))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}")
+
+    return results
+
+if __name__ == "__main__":
+    main()
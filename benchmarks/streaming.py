@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+
+"""
+Compare the peak memory of rendering a very large specification whole and streamed
+
+Writes a synthetic specification of each size, a field at a time, then
+renders it in a fresh interpreter with render_file, which loads it whole,
+and with stream_render, which reads one value at a time. Reports each one's
+peak resident memory and the time taken, and checks both write the same file:
+
+    python -m benchmarks.streaming --megabytes 1 10 100 --whole-up-to 10
+
+Rendering whole takes memory in proportion to the file, so it is skipped for
+sizes above --whole-up-to.
+"""
+
+import os
+import sys
+import json
+import filecmp
+import time
+import argparse
+import resource
+import tempfile
+import subprocess
+from benchmarks.synthetic import write_large_specification
+
+MODES = ('stream', 'whole')
+
+def render(mode, source, destination):
+    """Render a source into a file as the mode does, returning the seconds and peak resident bytes"""
+    from src.specifications.update_specifications import load_config, compile_schema, render_file
+    from src.specifications.streaming import stream_render
+
+    schema = compile_schema(load_config())
+    started = time.perf_counter()
+    with open(destination, 'w') as out:
+        if mode == 'stream':
+            stream_render(source, schema, out)
+        else:
+            out.write(render_file(source, schema))
+    return {'seconds': time.perf_counter() - started, 'max_rss_bytes': get_peak_rss()}
+
+def get_peak_rss():
+    """Get the peak resident bytes of this process"""
+    # On Linux ru_maxrss keeps the peak of the process that started this one, VmHWM doesn't
+    try:
+        with open('/proc/self/status', 'r') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+def measure(mode, source, destination):
+    """Render in a fresh interpreter, so its peak memory is the rendering's alone"""
+    result = subprocess.run(
+        [sys.executable, '-m', 'benchmarks.streaming', '--render', mode, source, destination],
+        capture_output=True, text=True, check=True
+    )
+    return json.loads(result.stdout)
+
+def benchmark(megabytes=(1, 10, 100), whole_up_to=10, guidance_length=400, seed=0):
+    """
+    Measure rendering synthetic specifications of each size whole and streamed
+
+    Args:
+        megabytes: Sizes of specification to write, in millions of bytes
+        whole_up_to: Largest size to also render whole
+        guidance_length: Approximate number of characters of guidance per field
+        seed: Random seed for the synthetic specifications
+
+    Returns:
+        Dict of results
+    """
+    sizes = []
+    with tempfile.TemporaryDirectory() as directory:
+        source = os.path.join(directory, 'large.yml')
+        for size in megabytes:
+            fields = write_large_specification(source, size, guidance_length, seed)
+            result = {'megabytes': size, 'fields': fields, 'source_bytes': os.path.getsize(source)}
+
+            destinations = []
+            for mode in MODES:
+                if mode == 'whole' and size > whole_up_to:
+                    continue
+                destination = os.path.join(directory, f"{mode}.md")
+                result[mode] = measure(mode, source, destination)
+                destinations.append(destination)
+
+            result['same_output'] = filecmp.cmp(*destinations, shallow=False) if len(destinations) > 1 else None
+            for destination in destinations:
+                os.remove(destination)
+            sizes.append(result)
+
+    return {
+        'parameters': {
+            'megabytes': list(megabytes),
+            'whole_up_to': whole_up_to,
+            'guidance_length': guidance_length,
+            'seed': seed,
+        },
+        'sizes': sizes,
+    }
+
+def format_results(results):
+    """Format results as a table of each size's peak memory and time, whole and streamed"""
+    lines = [f"{'source MB':>10}{'fields':>10}{'stream MB':>12}{'seconds':>10}{'whole MB':>12}{'seconds':>10}  same"]
+    for result in results['sizes']:
+        line = f"{result['source_bytes'] / 1e6:>10.1f}{result['fields']:>10}"
+        for mode in MODES:
+            measured = result.get(mode)
+            if measured:
+                line += f"{measured['max_rss_bytes'] / 1e6:>12.1f}{measured['seconds']:>10.2f}"
+            else:
+                line += f"{'-':>12}{'-':>10}"
+        same = result['same_output']
+        lines.append(line + ("  -" if same is None else "  yes" if same else "  NO"))
+    return "\n".join(lines)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare the peak memory of rendering a large specification "
+                                                 "whole and streamed")
+    parser.add_argument("--megabytes", type=float, nargs="+", default=[1, 10, 100],
+                        help="sizes of specification to render, in MB (default: 1 10 100)")
+    parser.add_argument("--whole-up-to", type=float, default=10,
+                        help="largest size to also render whole, in MB (default: 10)")
+    parser.add_argument("--guidance-length", type=int, default=400,
+                        help="approximate characters of guidance per field (default: 400)")
+    parser.add_argument("--seed", type=int, default=0, help="random seed (default: 0)")
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    parser.add_argument("--render", nargs=3, metavar=("MODE", "SOURCE", "DESTINATION"), help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.render:
+        print(json.dumps(render(*args.render)))
+        return None
+
+    results = benchmark(args.megabytes, args.whole_up_to, args.guidance_length, args.seed)
+    print(format_results(results))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}")
+
+    return results
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+
+import os
+import random
+from io import StringIO
+from src.specifications.update_specifications import yaml
+
+WORDS = (
+    "the a of to and in for on is that by with as be this it are from or an at "
+    "planning authority boundary dataset reference geometry listed building area "
+    "conservation tree preservation order direction document organisation date "
+    "entry start end provide value example must should notes description site"
+).split()
+
+def generate_text(length, rng):
+    """Generate text of roughly `length` characters split into paragraphs"""
+    words = []
+    size = 0
+    while size < length:
+        word = rng.choice(WORDS)
+        words.append(word)
+        size += len(word) + 1
+
+    paragraphs = [" ".join(words[i:i + 40]) for i in range(0, len(words), 40)]
+    return "\n\n".join(paragraphs)
+
+def generate_field(index, guidance_length, rng):
+    """Generate a synthetic field of a dataset, with its keys out of schema order"""
+    return {
+        'guidance': generate_text(guidance_length, rng) + "\n",
+        'description': generate_text(60, rng),
+        'field': f"field-{index}",
+    }
+
+def generate_specification(index, datasets=1, fields=20, guidance_length=400, seed=0):
+    """
+    Generate a synthetic specification in the source YAML format
+
+    Keys are written out of schema order so ordering has work to do.
+
+    Args:
+        index: Number of the specification, used in its ID
+        datasets: Number of datasets in the specification
+        fields: Number of fields in each dataset
+        guidance_length: Approximate number of characters of guidance per field
+        seed: Random seed, so the same arguments give the same specification
+
+    Returns:
+        Dict of the source file content
+    """
+    rng = random.Random(f"{seed}-{index}")
+    specification = f"synthetic-{index}"
+
+    return {
+        'id': specification,
+        'display_name': f"Synthetic {index}",
+        'data': {
+            'name': f"Synthetic {index}",
+            'specification': specification,
+            'plural': f"Synthetic {index}s",
+            'specification-status': 'candidate-standard',
+            'version': '1.0.0',
+            'start-date': '',
+            'end-date': '',
+            'entry-date': '2024-01-01',
+            'github-discussion': index,
+            'datasets': [
+                {
+                    'fields': [generate_field(field, guidance_length, rng) for field in range(fields)],
+                    'name': f"synthetic {index} dataset {dataset}",
+                    'dataset': f"{specification}-{dataset}",
+                }
+                for dataset in range(datasets)
+            ]
+        }
+    }
+
+def write_collection(directory, specifications=5, datasets=1, fields=20, guidance_length=400, seed=0):
+    """
+    Write a synthetic specifications collection into a directory
+
+    Args:
+        directory: Directory to write the YAML files into
+        specifications: Number of specification files to write
+        datasets: Number of datasets in each specification
+        fields: Number of fields in each dataset
+        guidance_length: Approximate number of characters of guidance per field
+        seed: Random seed
+
+    Returns:
+        Dict of source path to destination path, like get_file_mapping
+    """
+    os.makedirs(directory, exist_ok=True)
+
+    mapping = {}
+    for index in range(specifications):
+        source = os.path.join(directory, f"synthetic-{index}.yml")
+        with open(source, 'w') as f:
+            yaml.dump(generate_specification(index, datasets, fields, guidance_length, seed), f)
+        mapping[source] = f"content/specification/synthetic-{index}.md"
+
+    return mapping
+
+def _indent(text, spaces):
+    return ''.join(' ' * spaces + line if line.strip() else line for line in text.splitlines(keepends=True))
+
+def write_large_specification(path, megabytes, guidance_length=400, seed=0):
+    """
+    Write a synthetic specification with one dataset of fields that runs to a given size
+
+    The file is written a field at a time, so a specification far larger
+    than would fit in memory loaded can be written.
+
+    Args:
+        path: Path of the YAML file to write
+        megabytes: Size to write fields up to, in millions of bytes
+        guidance_length: Approximate number of characters of guidance per field
+        seed: Random seed
+
+    Returns:
+        The number of fields written
+    """
+    rng = random.Random(f"{seed}-large")
+    document = generate_specification(1, datasets=1, fields=0, seed=seed)
+    data = document.pop('data')
+    dataset = data.pop('datasets')[0]
+    del dataset['fields']
+
+    fields = 0
+    with open(path, 'w') as f:
+        yaml.dump(document, f)
+        f.write("data:\n")
+        buffer = StringIO()
+        yaml.dump(data, buffer)
+        f.write(_indent(buffer.getvalue(), 2))
+        f.write("  datasets:\n    - fields:\n")
+
+        while f.tell() < megabytes * 1e6:
+            buffer = StringIO()
+            # Dumped as a sequence so each field's dash lines up under the fields key
+            yaml.dump([generate_field(fields, guidance_length, rng)], buffer)
+            f.write(_indent(buffer.getvalue(), 6))
+            fields += 1
+
+        buffer = StringIO()
+        yaml.dump(dataset, buffer)
+        f.write(_indent(buffer.getvalue(), 6))
+
+    return fields
@@ -0,0 +1,4 @@
+import sys
+from src.specifications.cli import main
+
+sys.exit(main())
@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+
+"""
+Compile every collection under data/collections into one bundle file
+
+    python -m src.specifications bundle --output data/collections.bundle
+
+The bundle starts with a header line, the length of a JSON index and the
+index itself, followed by each source file's document as compact JSON. The
+index records where each document is, keyed on the collection's
+`field_map` id (such as `specification`), and which nested items (such as
+datasets and their fields, keyed on their own `field_map` ids) it holds. A
+reader parses the index once and then reads any one document by slicing it
+out of a memory map, without parsing the rest.
+"""
+
+import os
+import json
+import mmap
+import hashlib
+
+# Where the bundle is built unless told otherwise
+BUNDLE_PATH = "data/collections.bundle"
+
+MAGIC = b"MINI-CMS-BUNDLE\n"
+
+# Bumped whenever the layout changes, so older bundles are rebuilt rather than misread
+FORMAT_VERSION = 1
+
+def get_config_hash(config):
+    """Get a hash of the parsed config, which records are indexed by"""
+    return hashlib.sha1(json.dumps(config, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+def get_index_tree(fields):
+    """
+    Get the repeatable fields whose items are indexed, from a collection's fields in the config
+
+    Returns:
+        Dict of field ID to its field_map id and the same for its own fields
+    """
+    return {
+        field['id']: ((field.get('field_map') or {}).get('id'), get_index_tree(field['fields']))
+        for field in fields or []
+        if isinstance(field, dict) and 'id' in field and isinstance(field.get('fields'), list)
+    }
+
+def get_references(data, tree, prefix='', position=None, references=None):
+    """
+    Find the keyed nested items of a document's data
+
+    Returns:
+        Dict of dotted path (such as `datasets.fields`) to a list of
+        [key, position] pairs, where the position is the list of indexes
+        leading to the item
+    """
+    position = position or []
+    references = {} if references is None else references
+    for field, (key, children) in tree.items():
+        path = prefix + field
+        items = data.get(field)
+        if not isinstance(items, list):
+            continue
+        for index, item in enumerate(items):
+            if not isinstance(item, dict):
+                continue
+            if key and item.get(key) is not None:
+                references.setdefault(path, []).append([str(item[key]), position + [index]])
+            get_references(item, children, f"{path}.", position + [index], references)
+    return references
+
+def build_bundle(config, path, directory=None, sources=None):
+    """
+    Build or update the bundle of every collection
+
+    A bundle is updated incrementally: a source whose size and modification
+    time match its record in the existing bundle is copied over as it is,
+    and only new or changed sources are parsed. Everything is parsed again if
+    the config or the bundle format has changed.
+
+    Args:
+        config: Parsed config
+        path: Path of the bundle to write
+        directory: Directory the collections are in, data/collections if not given
+        sources: Source YAML paths to bundle, everything in the collections
+            directory if not given
+
+    Returns:
+        Dict with the number of sources `parsed` and `reused`
+
+    Raises:
+        ValueError: If two sources in a collection have the same key
+    """
+    # Only building needs the YAML loader, readers only need the standard library
+    from src.specifications.discovery import COLLECTIONS_DIRECTORY
+    from src.specifications.validator import yaml, find_sources
+
+    directory = directory or COLLECTIONS_DIRECTORY
+    if sources is None:
+        sources = find_sources(directory)
+    collections = {collection['id']: collection for collection in config['collections']}
+    config_hash = get_config_hash(config)
+
+    previous = None
+    if os.path.exists(path):
+        try:
+            previous = CollectionBundle(path)
+        except ValueError:
+            previous = None
+    if previous is not None and previous.header.get('config') != config_hash:
+        previous.close()
+        previous = None
+    reusable = previous.sources() if previous is not None else {}
+
+    header = {'version': FORMAT_VERSION, 'config': config_hash, 'collections': {}}
+    chunks = []
+    offset = 0
+    counts = {'parsed': 0, 'reused': 0}
+
+    try:
+        for source in sources:
+            parts = os.path.relpath(source, directory).split(os.sep)
+            collection_id = parts[0] if len(parts) > 1 else None
+            collection = collections.get(collection_id)
+            if collection is None:
+                continue
+
+            key_field = (collection.get('field_map') or {}).get('id')
+            entries = header['collections'].setdefault(collection_id, {'key': key_field, 'records': {}})
+            stat = os.stat(source)
+
+            reused = reusable.get((collection_id, source))
+            if reused is not None and (reused[1]['mtime_ns'], reused[1]['size']) == (stat.st_mtime_ns, stat.st_size):
+                key, entry = reused
+                record = previous.read_raw(collection_id, key)
+                references = entry['references']
+                counts['reused'] += 1
+            else:
+                with open(source, 'r') as f:
+                    document = yaml.load(f)
+                data = document.get('data') if isinstance(document, dict) else None
+                data = data if isinstance(data, dict) else {}
+                key = data.get(key_field) if key_field else None
+                key = str(key) if key is not None else os.path.splitext(os.path.basename(source))[0]
+                record = json.dumps(document, separators=(',', ':'), ensure_ascii=False, default=str).encode('utf-8')
+                references = get_references(data, get_index_tree(collection.get('fields')))
+                counts['parsed'] += 1
+
+            if key in entries['records']:
+                raise ValueError(
+                    f"{source} and {entries['records'][key]['source']} both have the key {key!r} "
+                    f"in the {collection_id} collection"
+                )
+            entries['records'][key] = {
+                'source': source,
+                'offset': offset,
+                'length': len(record),
+                'mtime_ns': stat.st_mtime_ns,
+                'size': stat.st_size,
+                'references': references,
+            }
+            chunks.append(record)
+            offset += len(record)
+    finally:
+        if previous is not None:
+            previous.close()
+
+    encoded = json.dumps(header, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+    temporary = f"{path}.tmp"
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(temporary, 'wb') as f:
+        f.write(MAGIC)
+        f.write(b"%d\n" % len(encoded))
+        f.write(encoded)
+        for chunk in chunks:
+            f.write(chunk)
+    os.replace(temporary, path)
+
+    return counts
+
+class CollectionBundle:
+    """
+    Reads documents from a bundle built by build_bundle
+
+    Only the index is parsed when the bundle is opened. Each document is
+    parsed when it is read, from a memory map of the file.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # An empty file can't be mapped
+            self._file.close()
+            raise ValueError(f"{path} is not a collection bundle")
+
+        try:
+            if self._map[:len(MAGIC)] != MAGIC:
+                raise ValueError(f"{path} is not a collection bundle")
+            end = self._map.find(b"\n", len(MAGIC))
+            length = int(self._map[len(MAGIC):end])
+            self._records_start = end + 1 + length
+            self.header = json.loads(self._map[end + 1:self._records_start])
+            if self.header.get('version') != FORMAT_VERSION:
+                raise ValueError(f"{path} is bundle format {self.header.get('version')}, not {FORMAT_VERSION}")
+        except Exception:
+            self.close()
+            raise
+        self._indexes = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """Unmap and close the bundle file"""
+        if not self._map.closed:
+            self._map.close()
+        self._file.close()
+
+    def collections(self):
+        """Get the IDs of the bundled collections"""
+        return list(self.header['collections'])
+
+    def keys(self, collection_id):
+        """Get the keys of a collection's documents, in source order"""
+        return list(self._records(collection_id))
+
+    def read_raw(self, collection_id, key):
+        """Get the JSON of a document as bytes"""
+        entry = self._records(collection_id)[key]
+        start = self._records_start + entry['offset']
+        return self._map[start:start + entry['length']]
+
+    def get(self, collection_id, key, default=None):
+        """
+        Get one document, parsing only that document
+
+        Args:
+            collection_id: ID of the collection
+            key: Value of the collection's field_map id, such as a specification name
+
+        Returns:
+            The source file's document, or default if there is no such document
+        """
+        if key not in self._records(collection_id):
+            return default
+        return json.loads(self.read_raw(collection_id, key))
+
+    def find(self, collection_id, path, key):
+        """
+        Find nested items by their key, parsing only the documents that hold them
+
+        Args:
+            collection_id: ID of the collection
+            path: Dotted path of the repeatable field, such as `datasets` or `datasets.fields`
+            key: Value of the nested field_map id, such as a dataset name
+
+        Returns:
+            List of (document key, item) pairs
+        """
+        found = []
+        for document_key, position in self._index(collection_id, path).get(key, []):
+            item = self.get(collection_id, document_key)['data']
+            for field, index in zip(path.split('.'), position):
+                item = item[field][index]
+            found.append((document_key, item))
+        return found
+
+    def sources(self):
+        """Get (collection ID, source path) to the (key, index entry) of every document"""
+        return {
+            (collection_id, entry['source']): (key, entry)
+            for collection_id, collection in self.header['collections'].items()
+            for key, entry in collection['records'].items()
+        }
+
+    def _records(self, collection_id):
+        collection = self.header['collections'].get(collection_id)
+        return collection['records'] if collection else {}
+
+    def _index(self, collection_id, path):
+        """Get nested key to the documents and positions holding it, built from the index on first use"""
+        if (collection_id, path) not in self._indexes:
+            index = {}
+            for document_key, entry in self._records(collection_id).items():
+                for key, position in entry['references'].get(path, []):
+                    index.setdefault(key, []).append((document_key, position))
+            self._indexes[(collection_id, path)] = index
+        return self._indexes[(collection_id, path)]
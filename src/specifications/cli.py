@@ -0,0 +1,345 @@
+#!/usr/bin/env python3
+
+"""
+Command line interface for rendering, validating, diffing and publishing collections
+
+    python -m src.specifications render --output-dir /tmp/specification
+    python -m src.specifications render --stream --output-dir /tmp/specification
+    python -m src.specifications validate
+    python -m src.specifications diff --git-dir /path/to/specification.git
+    python -m src.specifications bundle
+    python -m src.specifications watch --output-dir /tmp/specification
+    GITHUB_TOKEN=<your-github-token> python -m src.specifications publish --incremental
+
+Each command imports what it uses when it runs, so offline commands such as
+render and validate never load PyGithub, and importing this module has no
+side effects.
+"""
+
+import os
+import sys
+import argparse
+
+def add_collection_arguments(parser):
+    collections = parser.add_mutually_exclusive_group()
+    collections.add_argument("--collection", action="append", dest="collections", metavar="ID",
+                             help="use this collection from config.yml, can be repeated (default: specifications)")
+    collections.add_argument("--all-collections", action="store_true",
+                             help="use every collection with an export in config.yml")
+
+def add_workers_argument(parser, default=1):
+    parser.add_argument("--workers", type=int, default=default,
+                        help=f"number of processes to work with, 0 for one per CPU (default: {default})")
+
+def add_target_arguments(parser, verb):
+    local = parser.add_mutually_exclusive_group()
+    local.add_argument("--output-dir", help=f"{verb} a local directory instead of GitHub")
+    local.add_argument("--git-dir", help=f"{verb} a local git repository instead of GitHub")
+
+def get_parser():
+    # Only standard library modules, so building the parser still loads nothing heavy
+    from src.specifications.publishers import CONTENTS_CONCURRENCY
+
+    parser = argparse.ArgumentParser(prog="python -m src.specifications",
+                                     description="Render, validate, diff and publish collections from config.yml")
+    commands = parser.add_subparsers(dest="command", required=True, metavar="command")
+
+    render = commands.add_parser("render", help="render collections as markdown",
+                                 description="Render collections as markdown")
+    render.add_argument("--output-dir", help="write the rendered files into this directory")
+    render.add_argument("--stream", action="store_true",
+                        help="write each file into --output-dir as it's rendered, without loading its source "
+                             "whole, for very large specifications")
+    add_collection_arguments(render)
+    add_workers_argument(render)
+    render.set_defaults(handler=render_command)
+
+    validate = commands.add_parser("validate", help="validate collections against the schema in config.yml",
+                                   description="Validate collections against the schema in config.yml")
+    validate.add_argument("sources", nargs="*",
+                          help="source files to validate, everything under data/collections if not given")
+    validate.add_argument("--config", default="config.yml", help="config file (default: config.yml)")
+    add_workers_argument(validate)
+    validate.set_defaults(handler=validate_command)
+
+    diff = commands.add_parser("diff", help="list what publishing would change",
+                               description="List the files, datasets and fields publishing would change")
+    add_target_arguments(diff, "compare with")
+    diff.add_argument("--branch", default="main", help="branch to compare with (default: main)")
+    add_collection_arguments(diff)
+    add_workers_argument(diff)
+    diff.set_defaults(handler=diff_command)
+
+    publish = commands.add_parser("publish", help="open a pull request updating the published collections",
+                                  description="Create a pull request updating the published specifications")
+    publish.add_argument("--incremental", action="store_true",
+                         help="only render specifications changed since the last sync")
+    add_workers_argument(publish)
+    publish.add_argument("--contents-api", action="store_true",
+                         help="commit each file with the Contents API, for tokens without Git Data API access")
+    publish.add_argument("--concurrency", type=int, default=CONTENTS_CONCURRENCY,
+                         help="most GitHub requests in flight at once with --contents-api "
+                              f"(default: {CONTENTS_CONCURRENCY})")
+    add_target_arguments(publish, "publish to")
+    publish.add_argument("--reuse-pr", action="store_true",
+                         help="update an open mini-cms pull request for the same collections instead of "
+                              "opening a new one")
+    publish.add_argument("--report",
+                         help="write a JSON report of the time and GitHub API requests of each stage to this file")
+    publish.add_argument("--job-summary", action="store_true",
+                         help="add a summary of the run to the GitHub Actions job summary")
+    publish.add_argument("--skip-validation", action="store_true",
+                         help="publish even if the sources don't match the schema in config.yml")
+    add_collection_arguments(publish)
+    publish.add_argument("--journal",
+                         help="record the progress of the sync in this file, and resume a failed sync recorded in it")
+    publish.set_defaults(handler=publish_command)
+
+    import_ = commands.add_parser("import", help="import collections edited in the published repository",
+                                  description="Import specifications edited in the specification repository")
+    local = import_.add_mutually_exclusive_group()
+    local.add_argument("--input-dir", help="import from a local directory instead of GitHub")
+    local.add_argument("--git-dir", help="import from a local git repository instead of GitHub")
+    import_.add_argument("--repository", help="repository to import from (default: the collection's export)")
+    import_.add_argument("--branch", default="main", help="branch to import from (default: main)")
+    import_.add_argument("--collection", default="specifications",
+                         help="collection to import, from config.yml (default: specifications)")
+    add_workers_argument(import_)
+    import_.set_defaults(handler=import_command)
+
+    bundle = commands.add_parser("bundle", help="compile every collection into one indexed bundle file",
+                                 description="Compile every collection into one indexed bundle file, "
+                                             "parsing only the sources changed since the last build")
+    bundle.add_argument("--output", default="data/collections.bundle",
+                        help="bundle file to build or update (default: data/collections.bundle)")
+    bundle.add_argument("--config", default="config.yml", help="config file (default: config.yml)")
+    bundle.set_defaults(handler=bundle_command)
+
+    watch = commands.add_parser("watch", help="re-render collections into a directory as they change",
+                                description="Render collections into a directory, then re-render each source "
+                                            "as it's saved and everything when config.yml changes")
+    watch.add_argument("--output-dir", required=True, help="write the rendered files into this directory")
+    watch.add_argument("--config", default="config.yml", help="config file (default: config.yml)")
+    watch.add_argument("--interval", type=float, default=0.2,
+                       help="seconds between checks for changes (default: 0.2)")
+    watch.add_argument("--debounce", type=float, default=0.05,
+                       help="seconds without further changes to wait before rendering (default: 0.05)")
+    add_collection_arguments(watch)
+    watch.set_defaults(handler=watch_command)
+
+    return parser
+
+def get_collection_targets(config, args):
+    """Get the repository to collection IDs to use, from the collection arguments"""
+    from src.specifications.update_specifications import get_targets, COLLECTION_ID
+
+    if args.all_collections:
+        return get_targets(config)
+    return get_targets(config, args.collections or [COLLECTION_ID])
+
+def get_local_publisher(args):
+    """Get the publisher for --output-dir or --git-dir, or None to use GitHub"""
+    from src.specifications.publishers import DirectoryPublisher, GitPublisher
+
+    if args.output_dir:
+        return DirectoryPublisher(args.output_dir)
+    if args.git_dir:
+        return GitPublisher(args.git_dir)
+    return None
+
+def get_github_publisher(repository, token=None):
+    """Get a publisher for a GitHub repository, loading PyGithub"""
+    from github import Github, Auth
+    from src.specifications.github_client import client_options
+    from src.specifications.publishers import GitHubPublisher
+
+    g = Github(auth=Auth.Token(token) if token else None, **client_options())
+    return GitHubPublisher(g.get_repo(repository))
+
+def render_command(args):
+    from src.specifications.update_specifications import load_config, render_collections
+
+    config = load_config()
+    collection_ids = [collection_id for ids in get_collection_targets(config, args).values() for collection_id in ids]
+    if args.stream:
+        return stream_command(args, config, collection_ids)
+    files = render_collections(config, collection_ids, workers=args.workers)
+
+    for destination, content in files.items():
+        if args.output_dir:
+            path = os.path.join(args.output_dir, destination)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Keep the carriage returns in rendered bodies, as DirectoryPublisher does
+            with open(path, 'w', newline='') as f:
+                f.write(content)
+        print(destination)
+    print(f"Rendered {len(files)} files")
+    return 0
+
+def stream_command(args, config, collection_ids):
+    from src.specifications.update_specifications import get_render_jobs
+    from src.specifications.streaming import render_to_directory
+
+    streamed = render_to_directory(get_render_jobs(config, collection_ids), args.output_dir, workers=args.workers)
+    for destination in streamed:
+        print(destination)
+    whole = sum(1 for result in streamed.values() if not result)
+    print(f"Rendered {len(streamed)} files" + (f", {whole} of them loaded whole" if whole else ""))
+    return 0
+
+def validate_command(args):
+    from src.specifications.validator import yaml, validate, get_errors
+
+    with open(args.config, 'r') as f:
+        config = yaml.load(f)
+
+    sources = [source for source in args.sources if source.endswith(('.yml', '.yaml'))] or None
+    violations = validate(config, sources, workers=args.workers)
+
+    for violation in violations:
+        print(violation)
+    errors = get_errors(violations)
+    if errors:
+        print(f"{len(errors)} violations found")
+        return 1
+    if violations:
+        print(f"{len(violations)} warnings found")
+    return 0
+
+def diff_command(args):
+    from src.specifications.update_specifications import (
+        load_config,
+        render_collections,
+        get_changed_files,
+        describe_changes,
+    )
+
+    config = load_config()
+    targets = get_collection_targets(config, args)
+    publisher = get_local_publisher(args)
+    if publisher is not None:
+        # Everything is compared with the one local stand-in
+        targets = {None: [collection_id for ids in targets.values() for collection_id in ids]}
+
+    for repository, collection_ids in targets.items():
+        target = publisher or get_github_publisher(repository, os.getenv("GITHUB_TOKEN"))
+        rendered = render_collections(config, collection_ids, workers=args.workers)
+        sha = target.get_branch_sha(args.branch)
+        files = get_changed_files(target, sha, rendered)
+
+        if repository:
+            print(f"## {repository}\n")
+        if files:
+            print(describe_changes(target, sha, files, config, collection_ids))
+        else:
+            print("No changes")
+    return 0
+
+def publish_command(args):
+    from datetime import datetime
+    from src.specifications.update_specifications import (
+        load_config,
+        describe_collections,
+        sync_specifications,
+        create_pull_request,
+        get_branch_name,
+    )
+    from src.specifications.instrumentation import Instrumentation
+    from src.specifications.journal import SyncJournal
+
+    config = load_config()
+    targets = get_collection_targets(config, args)
+
+    # Create a pull request on each repository, publishing its collections in one commit
+    now = datetime.now()
+    created = now.strftime('%Y-%m-%d--%H-%M-%S')
+    instrumentation = Instrumentation()
+    journal = SyncJournal(args.journal) if args.journal else None
+
+    try:
+        publisher = get_local_publisher(args)
+        if publisher is not None:
+            # Everything goes to the one local stand-in
+            collection_ids = [collection_id for ids in targets.values() for collection_id in ids]
+            description = describe_collections(config, collection_ids)
+            title = f"[Mini CMS] Update {description} {created}"
+            body = f"This PR updates the {description} based on the latest changes from the Mini CMS."
+            sync_specifications(publisher, get_branch_name(now, collection_ids), title, body,
+                                batch=not args.contents_api, incremental=args.incremental, workers=args.workers,
+                                instrumentation=instrumentation, reuse_pull_request=args.reuse_pr,
+                                collections=collection_ids, config=config, check_schema=not args.skip_validation, journal=journal)
+        else:
+            # Get GitHub token from environment variable
+            token = os.getenv("GITHUB_TOKEN")
+            if not token:
+                raise ValueError("GITHUB_TOKEN environment variable is not set")
+
+            for repository, collection_ids in targets.items():
+                description = describe_collections(config, collection_ids)
+                title = f"[Mini CMS] Update {description} {created}"
+                body = f"This PR updates the {description} based on the latest changes from the Mini CMS."
+                create_pull_request(token, title, body, batch=not args.contents_api,
+                                    incremental=args.incremental, workers=args.workers,
+                                    instrumentation=instrumentation, reuse_pull_request=args.reuse_pr,
+                                    collections=collection_ids, config=config, repository=repository,
+                                    check_schema=not args.skip_validation, journal=journal,
+                                    branch_name=get_branch_name(now, collection_ids), concurrency=args.concurrency)
+    finally:
+        print(instrumentation.summary())
+        if args.report:
+            instrumentation.write_report(args.report)
+        if args.job_summary:
+            instrumentation.write_job_summary()
+    return 0
+
+def import_command(args):
+    from src.specifications.update_specifications import load_config, REPO_NAME
+    from src.specifications.import_specifications import import_collection
+    from src.specifications.publishers import DirectoryPublisher, GitPublisher
+    from src.specifications.discovery import get_export_rule
+
+    config = load_config()
+    if args.input_dir:
+        publisher = DirectoryPublisher(args.input_dir)
+    elif args.git_dir:
+        publisher = GitPublisher(args.git_dir)
+    else:
+        rule = get_export_rule(config, args.collection) or {}
+        repository = args.repository or rule.get('repository') or REPO_NAME
+        publisher = get_github_publisher(repository, os.getenv("GITHUB_TOKEN"))
+
+    written = import_collection(publisher, config, args.collection, branch=args.branch, workers=args.workers)
+    print(f"Imported {len(written)} files")
+    return 0
+
+def bundle_command(args):
+    from src.specifications.validator import yaml
+    from src.specifications.bundle import build_bundle
+
+    with open(args.config, 'r') as f:
+        config = yaml.load(f)
+
+    counts = build_bundle(config, args.output)
+    print(f"Bundled {counts['parsed'] + counts['reused']} files into {args.output}, "
+          f"{counts['parsed']} parsed and {counts['reused']} unchanged")
+    return 0
+
+def watch_command(args):
+    from src.specifications.update_specifications import COLLECTION_ID
+    from src.specifications.watch import Watcher
+
+    # Every exported collection is watched, and found again whenever config.yml changes
+    collection_ids = None if args.all_collections else args.collections or [COLLECTION_ID]
+    watcher = Watcher(args.output_dir, collection_ids, config_path=args.config)
+    watcher.run(interval=args.interval, debounce=args.debounce)
+    return 0
+
+def main(argv=None):
+    parser = get_parser()
+    args = parser.parse_args(argv)
+    if getattr(args, 'stream', False) and not args.output_dir:
+        parser.error("--stream needs --output-dir")
+    return args.handler(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
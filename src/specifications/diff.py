@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+
+from ruamel.yaml import YAML
+
+# Frontmatter is only read to compare it, so the safe loader is enough
+yaml = YAML(typ='safe')
+
+# GitHub rejects pull request bodies longer than 65536 characters
+MAX_BODY_LENGTH = 60000
+
+def split_frontmatter(content):
+    """
+    Split a markdown file into its YAML frontmatter and body
+
+    Args:
+        content: Markdown content starting with frontmatter between `---` lines
+
+    Returns:
+        Tuple of the frontmatter YAML, empty if there is none, and the body
+    """
+    if not content or not content.startswith('---\n'):
+        return '', content or ''
+
+    end = content.find('\n---\n', 3)
+    if end == -1:
+        return content[4:], ''
+    return content[4:end + 1], content[end + 5:]
+
+def parse_frontmatter(content):
+    """
+    Parse the YAML frontmatter of a markdown file
+
+    Args:
+        content: Markdown content starting with frontmatter between `---` lines
+
+    Returns:
+        Dict of the frontmatter, empty if there is none
+    """
+    frontmatter, _ = split_frontmatter(content)
+    if not frontmatter:
+        return {}
+    return yaml.load(frontmatter) or {}
+
+def diff_items(old, new, schema):
+    """
+    Compare two items with the structure order_data produces
+
+    Repeatable fields are compared item by item, matching items on their key
+    from the field_map (such as `dataset` or `field`) rather than their
+    position, so each list is diffed in linear time and reordering isn't
+    reported as a change.
+
+    Args:
+        old: Dict of the published item
+        new: Dict of the rendered item
+        schema: Schema for the items' nesting level
+
+    Returns:
+        Dict of the changed fields and the added, removed and changed items
+        of each repeatable field, or None if nothing differs
+    """
+    changed = []
+    children = {}
+
+    fields = list(schema.order)
+    fields += [field for field in list(old) + list(new) if field not in schema.order and field not in fields]
+
+    for field in fields:
+        old_value = old.get(field)
+        new_value = new.get(field)
+        child = schema.children.get(field)
+
+        if child is not None and isinstance(old_value or [], list) and isinstance(new_value or [], list):
+            child_diff = diff_lists(old_value or [], new_value or [], child)
+            if child_diff:
+                children[field] = child_diff
+        elif old_value != new_value:
+            changed.append(field)
+
+    if not changed and not children:
+        return None
+    return {'changed': changed, 'children': children}
+
+def diff_lists(old, new, schema):
+    """
+    Compare the items of a repeatable field, matched on the schema's key
+
+    Returns:
+        Dict of added and removed item keys and of changed item key to its
+        diff, or None if nothing differs
+    """
+    old_items = _key_items(old, schema.key)
+    new_items = _key_items(new, schema.key)
+
+    added = [key for key in new_items if key not in old_items]
+    removed = [key for key in old_items if key not in new_items]
+    changed = {}
+    for key, item in new_items.items():
+        if key in old_items:
+            item_diff = diff_items(old_items[key], item, schema)
+            if item_diff:
+                changed[key] = item_diff
+
+    if not added and not removed and not changed:
+        return None
+    return {'added': added, 'removed': removed, 'changed': changed}
+
+def _key_items(items, key):
+    """Get a dict of key to item, falling back to the position for items without a unique key"""
+    keyed = {}
+    for index, item in enumerate(items):
+        if not isinstance(item, dict):
+            item = {'value': item}
+        item_key = item.get(key) if key else None
+        if item_key is None or str(item_key) in keyed:
+            item_key = f"#{index + 1}"
+        keyed[str(item_key)] = item
+    return keyed
+
+def format_item_diff(diff, schema, depth=0):
+    """Format a diff of items as nested markdown list lines"""
+    indent = '  ' * depth
+    lines = []
+
+    if diff['changed']:
+        lines.append(f"{indent}- Changed {', '.join(f'`{field}`' for field in diff['changed'])}")
+
+    for field, child_diff in diff['children'].items():
+        child = schema.children[field]
+        label = child.label or field
+        for key in child_diff['added']:
+            lines.append(f"{indent}- {label} `{key}` added")
+        for key in child_diff['removed']:
+            lines.append(f"{indent}- {label} `{key}` removed")
+        for key, item_diff in child_diff['changed'].items():
+            lines.append(f"{indent}- {label} `{key}` changed")
+            lines += format_item_diff(item_diff, child, depth + 1)
+
+    return lines
+
+def describe_file_changes(published, rendered, schemas):
+    """
+    Describe how rendered files differ from the published ones as markdown
+
+    Args:
+        published: Dict of destination path to published content, without
+            destinations that aren't published yet
+        rendered: Dict of destination path to rendered content
+        schemas: Dict of destination path to the Schema of its collection
+
+    Returns:
+        Markdown list of the changes to each file
+    """
+    lines = []
+    for destination, content in rendered.items():
+        schema = schemas[destination]
+        new = parse_frontmatter(content)
+
+        if destination not in published:
+            label = schema.label or 'File'
+            lines.append(f"- **`{destination}`**: new {label.lower()}")
+            continue
+
+        lines.append(f"- **`{destination}`**")
+        diff = diff_items(parse_frontmatter(published[destination]), new, schema)
+        if diff is None:
+            # Only the markdown body or formatting differs
+            lines.append("  - Changed content outside the frontmatter")
+        else:
+            lines += format_item_diff(diff, schema, depth=1)
+
+    return "\n".join(lines)
+
+def add_changes_to_body(body, changes, max_length=MAX_BODY_LENGTH):
+    """Add a description of the changes to a pull request body, cut short to fit"""
+    body = f"{body}\n\n### Changes\n\n{changes}"
+    if len(body) <= max_length:
+        return body
+
+    note = "\n\n_The list of changes was cut short, see the files changed for the rest._"
+    cut = body.rfind("\n", 0, max_length - len(note))
+    return body[:cut] + note
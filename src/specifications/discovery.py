@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+
+import os
+import re
+
+# Directory each collection's source files are in, unless its export says otherwise
+COLLECTIONS_DIRECTORY = "data/collections"
+
+SOURCE_EXTENSIONS = ('.yml', '.yaml')
+
+# Directory and destination template to the directory's mtime and discovered mapping
+_cache = {}
+
+def get_export_rule(config, collection_id):
+    """
+    Get how a collection is exported from the config file
+
+    A collection is exported if it has an `export` with a `destination`
+    template, in which `{name}` is the name of the source file without its
+    extension. Sources are found in `data/collections/<collection>` unless the
+    export gives a `source` directory. The export can also give the
+    `repository` to publish to and a `body` field to write as the markdown
+    body instead of in the frontmatter.
+
+    Args:
+        config: Parsed config
+        collection_id: ID of the collection
+
+    Returns:
+        Dict of the source directory, destination template, repository and
+        body field, or None if the collection isn't exported
+    """
+    for collection in config['collections']:
+        if collection['id'] != collection_id:
+            continue
+
+        export = collection.get('export')
+        if not export or 'destination' not in export:
+            return None
+
+        return {
+            'source': export.get('source', os.path.join(COLLECTIONS_DIRECTORY, collection_id)),
+            'destination': export['destination'],
+            'repository': export.get('repository'),
+            'body': export.get('body'),
+        }
+
+    return None
+
+def get_exported_collections(config):
+    """Get the IDs of the collections with an export in the config, in config order"""
+    return [
+        collection['id']
+        for collection in config['collections']
+        if get_export_rule(config, collection['id']) is not None
+    ]
+
+def discover_sources(directory, destination):
+    """
+    Map every source file in a directory to its destination path
+
+    The mapping is cached against the directory's mtime, which changes when
+    files are added, removed or renamed, so rescanning a large collection is
+    only paid for when its files have changed.
+
+    Args:
+        directory: Directory of source YAML files
+        destination: Destination path template, with `{name}` for the source file name
+
+    Returns:
+        Dict of source path to destination path, sorted by source path
+    """
+    mtime = os.stat(directory).st_mtime_ns
+    key = (directory, destination)
+
+    cached = _cache.get(key)
+    if cached is None or cached[0] != mtime:
+        mapping = {}
+        with os.scandir(directory) as entries:
+            for entry in sorted(entries, key=lambda entry: entry.name):
+                name, extension = os.path.splitext(entry.name)
+                if extension in SOURCE_EXTENSIONS and entry.is_file():
+                    mapping[os.path.join(directory, entry.name)] = destination.format(name=name)
+        cached = _cache[key] = (mtime, mapping)
+
+    return dict(cached[1])
+
+def match_destination(destination, path):
+    """
+    Get the source file name a destination path was exported from
+
+    Args:
+        destination: Destination path template, with `{name}` for the source file name
+        path: Path of a file in the published repository
+
+    Returns:
+        The name `{name}` stood for, or None if the path doesn't match the template
+    """
+    before, _, after = destination.partition('{name}')
+    match = re.fullmatch(f"{re.escape(before)}([^/]+){re.escape(after)}", path)
+    return match.group(1) if match else None
+
+def clear_cache():
+    """Forget every discovered mapping"""
+    _cache.clear()
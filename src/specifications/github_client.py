@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+
+import os
+import random
+from github import GithubRetry
+
+# Methods that are safe to send again if a response never arrives or is a server error
+IDEMPOTENT_METHODS = frozenset({'GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'})
+
+class SyncRetry(GithubRetry):
+    """
+    Retry policy for the GitHub API calls made by a sync
+
+    Built on PyGithub's GithubRetry, which waits for `Retry-After` and
+    `X-RateLimit-Reset` on rate limited requests and for a fixed time on
+    secondary rate limits. On top of that:
+
+    - server errors and dropped connections are only retried for idempotent
+      methods, so a POST that may have been applied isn't applied twice
+    - rate limited requests are retried whatever the method, as GitHub
+      rejected them without acting on them
+    - backoff has random jitter added, so concurrent runs hitting the same
+      limit don't all retry at once
+    """
+
+    def __init__(self, jitter=1.0, **kwargs):
+        self.jitter = jitter
+        kwargs.setdefault('allowed_methods', IDEMPOTENT_METHODS)
+        # Let the final error response through so PyGithub raises it as a GithubException
+        kwargs.setdefault('raise_on_status', False)
+        super().__init__(**kwargs)
+
+    def new(self, **kw):
+        retry = super().new(**kw)
+        retry.jitter = self.jitter
+        return retry
+
+    def is_retry(self, method, status_code, has_retry_after=False):
+        # GithubRetry.increment only carries on with a 403 that is a rate limit
+        if status_code == 403 and status_code in (self.status_forcelist or ()):
+            return bool(self.total)
+        return super().is_retry(method, status_code, has_retry_after)
+
+    def get_backoff_time(self):
+        backoff = super().get_backoff_time()
+        if backoff <= 0:
+            return backoff
+        return min(self.backoff_max, backoff + random.uniform(0, self.jitter))
+
+def client_options(retries=5, backoff_factor=1.0, jitter=1.0, pool_size=10, timeout=30):
+    """
+    Get the keyword arguments to create a Github client for a sync with
+
+    The client keeps one pooled HTTP session for all its requests, and
+    retries according to SyncRetry. Requests go to the API at
+    `GITHUB_API_URL` if it is set, as it is in GitHub Actions, which also
+    lets a sync run against GitHub Enterprise Server or a local stand-in.
+
+    Args:
+        retries: Number of times to retry a request
+        backoff_factor: Backoff between retries, doubling each time
+        jitter: Maximum random seconds added to each backoff
+        pool_size: Number of connections to keep open to the API
+        timeout: Seconds to wait for a response
+
+    Returns:
+        Dict of keyword arguments for github.Github
+    """
+    options = {
+        'retry': SyncRetry(total=retries, backoff_factor=backoff_factor, jitter=jitter),
+        'pool_size': pool_size,
+        'timeout': timeout,
+    }
+    if os.getenv("GITHUB_API_URL"):
+        options['base_url'] = os.getenv("GITHUB_API_URL")
+    return options
@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+
+"""
+Import specifications edited in the specification repository back into data/collections
+
+    GITHUB_TOKEN=<your-github-token> python -m src.specifications.import_specifications
+    python -m src.specifications.import_specifications --git-dir /path/to/specification
+"""
+
+import os
+import sys
+from io import StringIO
+from concurrent.futures import ProcessPoolExecutor
+from ruamel.yaml.comments import CommentedMap, CommentedSeq
+from ruamel.yaml.scalarstring import ScalarString, DoubleQuotedScalarString, PlainScalarString
+from src.specifications.update_specifications import (
+    yaml,
+    compile_schema,
+    get_file_mapping,
+    order_data,
+    dump_frontmatter,
+    render_files,
+    COLLECTION_ID,
+)
+from src.specifications.publishers import git_blob_sha
+from src.specifications.discovery import get_export_rule, match_destination
+from src.specifications.diff import split_frontmatter
+
+class _Unpatchable(Exception):
+    """Raised when a value can't be changed in place in a source's text"""
+
+def _lines(text):
+    """Split text into lines keeping their line feeds, without splitting on the carriage returns in values"""
+    lines = [line + '\n' for line in text.split('\n')]
+    lines[-1] = lines[-1][:-1]
+    return lines
+
+def _span_end(lines, start, end, column):
+    """Move the end of a key's lines back over the blank lines and comments before the next key"""
+    while end > start + 1:
+        line = lines[end - 1]
+        text = line.strip()
+        if text and not (text.startswith('#') and len(line) - len(line.lstrip(' ')) <= column):
+            break
+        end -= 1
+    return end
+
+def _same(old, new, body=False):
+    # The body is published stripped
+    if body and isinstance(old, str) and isinstance(new, str):
+        return old.strip() == new.strip()
+    return old == new
+
+def _restyle(old, new):
+    """Keep the quoting or block style of the value being replaced"""
+    if type(new) is str and isinstance(old, ScalarString):
+        return type(old)(new)
+    return new
+
+def _emit(key, value, prefix, column):
+    """Dump a key and its value as lines at a column, the first starting with the prefix it replaces"""
+    out = StringIO()
+    yaml.dump({PlainScalarString(key): value}, out)
+    emitted = out.getvalue().split('\n')[:-1]
+    return [prefix + emitted[0] + '\n'] + [(' ' * column + line if line else line) + '\n' for line in emitted[1:]]
+
+def _patch_mapping(existing, new, schema, lines, end, edits, body_field=None):
+    """
+    Collect the edits to the lines of a block mapping that make its fields match new
+
+    Args:
+        existing: Mapping loaded round trip from the lines
+        new: Ordered data the mapping's fields should have
+        schema: Schema of the mapping's nesting level
+        lines: Lines of the source
+        end: Index of the line the mapping ends before
+        edits: List to add (start, end, replacement lines) edits to
+        body_field: Field published as the markdown body, compared stripped
+
+    Raises:
+        _Unpatchable: If the mapping isn't laid out a key to a line
+    """
+    if not isinstance(existing, CommentedMap) or existing.fa.flow_style() or not existing:
+        raise _Unpatchable()
+    keys = list(existing)
+    starts = [existing.lc.key(key)[0] for key in keys]
+    if any(first >= second for first, second in zip(starts, starts[1:])):
+        raise _Unpatchable()
+    column = existing.lc.key(keys[0])[1]
+    spans = {
+        key: (start, _span_end(lines, start, starts[index + 1] if index + 1 < len(keys) else end, column))
+        for index, (key, start) in enumerate(zip(keys, starts))
+    }
+
+    for field in schema.order:
+        if field in existing and field in new:
+            old, value = existing[field], new[field]
+            if _same(old, value, field == body_field):
+                continue
+            child = schema.children.get(field)
+            if child is not None:
+                # Change just the fields that differ in each item, if the items are the same ones
+                item_edits = []
+                try:
+                    _patch_sequence(old, value, child, lines, spans[field][1], item_edits)
+                except _Unpatchable:
+                    pass
+                else:
+                    edits.extend(item_edits)
+                    continue
+            if field == body_field and isinstance(old, str) and isinstance(value, str):
+                # The body is published stripped, keep the end it had
+                value = value.strip() + old[len(old.rstrip()):]
+            start, stop = spans[field]
+            edits.append((start, stop, _emit(field, _restyle(old, value), lines[start][:existing.lc.key(field)[1]],
+                                             column)))
+        elif field in existing:
+            start, stop = spans[field]
+            # The first key of a sequence item starts on the line with its dash
+            if lines[start][:column].strip():
+                raise _Unpatchable()
+            edits.append((start, stop, []))
+        elif field in new:
+            # New fields go after the existing ones, leaving them where they are
+            at = spans[keys[-1]][1]
+            edits.append((at, at, _emit(field, new[field], ' ' * column, column)))
+
+def _patch_sequence(existing, new, schema, lines, end, edits):
+    """Collect the edits to the items of a block sequence of mappings, matched by position"""
+    if not isinstance(existing, CommentedSeq) or existing.fa.flow_style() or not existing or \
+            not isinstance(new, list) or len(new) != len(existing):
+        raise _Unpatchable()
+    starts = [existing.lc.item(index)[0] for index in range(len(existing))]
+    if any(first >= second for first, second in zip(starts, starts[1:])):
+        raise _Unpatchable()
+
+    for index, (old, value) in enumerate(zip(existing, new)):
+        if not isinstance(value, dict):
+            raise _Unpatchable()
+        if old != value:
+            _patch_mapping(old, value, schema, lines, starts[index + 1] if index + 1 < len(starts) else end, edits)
+
+def _render(data, schema, body_field=None):
+    """Render data as render_file would render a source with it"""
+    data = order_data(data, schema)
+    body = data.pop(body_field, None) if body_field else None
+    return dump_frontmatter(data) + (f"\n{body.strip()}\n" if body else "")
+
+def _patch_source(text, document, data, schema, body_field=None):
+    """
+    Change only the values in a source's text that differ from the imported data
+
+    Returns:
+        The source text with the lines of just those values rewritten, or
+        None if it isn't laid out so they can be
+    """
+    existing = document.get('data') if isinstance(document, CommentedMap) else None
+    if not isinstance(existing, CommentedMap):
+        return None
+    lines = _lines(text)
+
+    # The data runs up to the next key at the top of the file
+    keys = list(document)
+    index = keys.index('data')
+    end = document.lc.key(keys[index + 1])[0] if index + 1 < len(keys) else len(lines)
+
+    edits = []
+    try:
+        _patch_mapping(existing, data, schema, lines, end, edits, body_field)
+    except _Unpatchable:
+        return None
+
+    # From the end, so earlier line numbers stay right, and new fields in the order they were added
+    for _, (start, stop, replacement) in sorted(enumerate(edits), key=lambda edit: (edit[1][0], edit[0]), reverse=True):
+        lines[start:stop] = replacement
+    patched = ''.join(lines)
+
+    # Only keep the patch if it renders as rewriting the whole source would
+    if _render(yaml.load(patched)['data'], schema, body_field) != _render(data, schema, body_field):
+        return None
+    return patched
+
+def import_file(content, source, schema, body_field=None):
+    """
+    Write a published markdown file back to its source YAML file
+
+    The frontmatter is loaded round trip, so the quoting and literal blocks it
+    was published with are kept. In an existing source only the lines of the
+    values that differ are rewritten, keeping the order, styles and layout of
+    the rest of the file as the CMS wrote them, and anything outside the
+    data, such as its `id`, as it is. New sources, and sources laid out so
+    their values can't be changed in place, are written whole, ordered as
+    config.yml orders the collection.
+
+    Args:
+        content: Markdown content of the published file
+        source: Path of the source YAML file to write
+        schema: Compiled Schema of the source's collection
+        body_field: Field the markdown body is read into (see render_file)
+    """
+    frontmatter, body = split_frontmatter(content)
+    data = (yaml.load(frontmatter) if frontmatter else None) or CommentedMap()
+    if body_field and body.strip():
+        body = body.strip() + "\n"
+        # Literal blocks can't keep carriage returns, which the CMS writes into some bodies
+        data[body_field] = DoubleQuotedScalarString(body) if '\r' in body else body
+    data = order_data(data, schema)
+
+    text = None
+    document = CommentedMap()
+    if os.path.exists(source):
+        # Read as it is, so the lines left alone are written back byte for byte
+        with open(source, 'r', newline='') as f:
+            text = f.read()
+        document = yaml.load(text) or CommentedMap()
+
+    patched = _patch_source(text, document, data, schema, body_field) if text else None
+    os.makedirs(os.path.dirname(source) or '.', exist_ok=True)
+    with open(source, 'w', newline='') as f:
+        if patched is not None:
+            f.write(patched)
+        else:
+            document['data'] = data
+            yaml.dump(document, f)
+
+def get_published_files(publisher, sha, destination):
+    """
+    Get the git blob SHA of every published file matching a destination template
+
+    Returns:
+        Dict of path to git blob SHA, from one listing of the commit's tree
+    """
+    return {
+        path: blob_sha
+        for path, blob_sha in publisher.get_published_shas(sha).items()
+        if match_destination(destination, path) is not None
+    }
+
+def import_collection(publisher, config, collection_id=COLLECTION_ID, branch="main", workers=1):
+    """
+    Import the published files of a collection into its source files
+
+    The published tree is listed once and compared with the local sources
+    rendered as they would be exported, so only the files that differ are
+    fetched (in one batch) and written. Files published without a source are
+    written to a new source file, named after the published file. Sources
+    whose file was removed from the published repository are left alone.
+
+    Args:
+        publisher: Publisher to import from
+        config: Parsed config
+        collection_id: ID of the exported collection to import
+        branch: Branch to import from
+        workers: Number of processes to render and write with, 1 to work
+            serially or 0 for one per CPU
+
+    Returns:
+        List of the source paths written, in published path order
+
+    Raises:
+        ValueError: If the collection has no export configured
+    """
+    rule = get_export_rule(config, collection_id)
+    if rule is None:
+        raise ValueError(f"No export is configured for the {collection_id} collection in config.yml")
+    schema = compile_schema(config, collection_id)
+    mapping = get_file_mapping(config, collection_id)
+    sources = {destination: source for source, destination in mapping.items()}
+
+    sha = publisher.get_branch_sha(branch)
+    published = get_published_files(publisher, sha, rule['destination'])
+
+    # Only fetch the files the local sources wouldn't render exactly
+    rendered = render_files(schema, [sources[path] for path in published if path in sources], workers=workers,
+                            mapping=mapping, body_field=rule['body'])
+    changed = [path for path, blob_sha in published.items() if git_blob_sha(rendered.get(path, '')) != blob_sha]
+    if not changed:
+        return []
+    contents = publisher.get_published_contents(sha, changed)
+
+    jobs = []
+    for path in sorted(contents):
+        source = sources.get(path)
+        if source is None:
+            source = os.path.join(rule['source'], f"{match_destination(rule['destination'], path)}.yml")
+        jobs.append((contents[path], source, schema, rule['body']))
+
+    if workers != 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=workers or None) as executor:
+            list(executor.map(import_file, *zip(*jobs)))
+    else:
+        for job in jobs:
+            import_file(*job)
+
+    written = [source for _, source, _, _ in jobs]
+    for source in written:
+        print(f"Imported {source}")
+    return written
+
+def main(argv=None):
+    # Parsed by the CLI, which defines the arguments of every command
+    from src.specifications.cli import main as cli_main
+    return cli_main(['import', *(sys.argv[1:] if argv is None else argv)])
+
+if __name__ == "__main__":
+    sys.exit(main())
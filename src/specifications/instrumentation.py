@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+
+import os
+import json
+import time
+import logging
+from contextlib import contextmanager
+from collections import Counter, defaultdict
+
+# Logger PyGithub writes every request and response to at debug level
+GITHUB_REQUESTER_LOGGER = "github.Requester"
+
+RATE_LIMIT_HEADERS = {
+    'x-ratelimit-limit': 'limit',
+    'x-ratelimit-remaining': 'remaining',
+    'x-ratelimit-used': 'used',
+    'x-ratelimit-reset': 'reset',
+    'x-ratelimit-resource': 'resource',
+}
+
+class Instrumentation:
+    """
+    Records where the time and API quota of a sync run go
+
+    Stages are timed with the `stage` context manager, and GitHub API requests
+    are recorded while inside `instrument_github`.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages = []
+        self.requests = []
+        self.rate_limit = {}
+
+    @contextmanager
+    def stage(self, name, **labels):
+        """Time a stage of the run, labelled with e.g. the file or call it was for"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record_stage(name, time.perf_counter() - started, **labels)
+
+    def record_stage(self, name, seconds, **labels):
+        """Record a stage timed elsewhere, such as in a worker process"""
+        self.stages.append({'stage': name, **labels, 'seconds': seconds})
+
+    def record_request(self, method, url, status, bytes_sent=0, bytes_received=0, headers=None):
+        """Record a GitHub API request and the rate limit left after it"""
+        self.requests.append({
+            'method': method,
+            'url': url,
+            'status': status,
+            'bytes_sent': bytes_sent,
+            'bytes_received': bytes_received,
+        })
+
+        for header, key in RATE_LIMIT_HEADERS.items():
+            if headers and header in headers:
+                self.rate_limit[key] = headers[header]
+
+    @contextmanager
+    def instrument_github(self):
+        """Record every request PyGithub makes while inside the context"""
+        logger = logging.getLogger(GITHUB_REQUESTER_LOGGER)
+        handler = _GitHubRequestHandler(self)
+        level, propagate = logger.level, logger.propagate
+
+        # PyGithub only logs requests at debug level, so don't pass them on
+        logger.addHandler(handler)
+        logger.setLevel(logging.DEBUG)
+        logger.propagate = False
+        try:
+            yield self
+        finally:
+            logger.removeHandler(handler)
+            logger.setLevel(level)
+            logger.propagate = propagate
+
+    def report(self):
+        """Get the report of the run as a dict"""
+        stage_totals = defaultdict(float)
+        for stage in self.stages:
+            stage_totals[stage['stage']] += stage['seconds']
+
+        endpoints = Counter(f"{request['method']} {request['url'].split('?')[0]}" for request in self.requests)
+
+        return {
+            'total_seconds': time.perf_counter() - self.started,
+            'stage_totals': dict(stage_totals),
+            'stages': self.stages,
+            'api': {
+                'requests': len(self.requests),
+                'bytes_sent': sum(request['bytes_sent'] for request in self.requests),
+                'bytes_received': sum(request['bytes_received'] for request in self.requests),
+                'errors': sum(1 for request in self.requests if request['status'] >= 400),
+                'endpoints': dict(endpoints.most_common()),
+                'rate_limit': self.rate_limit,
+            },
+        }
+
+    def summary(self):
+        """Get a human readable markdown summary of the run"""
+        report = self.report()
+        api = report['api']
+
+        lines = [
+            "### Specifications sync",
+            "",
+            f"Total time: {report['total_seconds']:.2f}s",
+            "",
+            "| Stage | Count | Seconds |",
+            "| --- | ---: | ---: |",
+        ]
+        counts = Counter(stage['stage'] for stage in self.stages)
+        for name, seconds in report['stage_totals'].items():
+            lines.append(f"| {name} | {counts[name]} | {seconds:.3f} |")
+
+        lines += [
+            "",
+            f"GitHub API requests: {api['requests']} ({api['errors']} errors), "
+            f"{api['bytes_sent']} bytes sent, {api['bytes_received']} bytes received",
+        ]
+        if api['rate_limit']:
+            lines.append(
+                f"Rate limit remaining: {api['rate_limit'].get('remaining', '?')}"
+                f"/{api['rate_limit'].get('limit', '?')}"
+            )
+
+        return "\n".join(lines)
+
+    def write_report(self, path):
+        """Write the report of the run as JSON"""
+        with open(path, 'w') as f:
+            json.dump(self.report(), f, indent=2)
+
+    def write_job_summary(self):
+        """Add the summary to the GitHub Actions job summary, if running in GitHub Actions"""
+        path = os.getenv("GITHUB_STEP_SUMMARY")
+        if not path:
+            return False
+
+        with open(path, 'a') as f:
+            f.write(self.summary() + "\n")
+        return True
+
+class _GitHubRequestHandler(logging.Handler):
+    """Passes the requests PyGithub logs to an Instrumentation"""
+
+    def __init__(self, instrumentation):
+        super().__init__(logging.DEBUG)
+        self.instrumentation = instrumentation
+
+    def emit(self, record):
+        # PyGithub logs (verb, scheme, hostname, url, request headers, input,
+        # status, response headers, output) for every request
+        if not isinstance(record.args, tuple) or len(record.args) != 9:
+            return
+
+        verb, _, _, url, _, input, status, headers, output = record.args
+        self.instrumentation.record_request(
+            verb,
+            url,
+            status,
+            bytes_sent=_size(input),
+            bytes_received=_size(output),
+            headers=headers,
+        )
+
+def _size(data):
+    """Get the size in bytes of a request or response body"""
+    if isinstance(data, str):
+        return len(data.encode('utf-8'))
+    if isinstance(data, bytes):
+        return len(data)
+    return 0
+
+class InstrumentedRepo:
+    """Times every method call made on a GitHub repository"""
+
+    def __init__(self, repo, instrumentation):
+        self._repo = repo
+        self._instrumentation = instrumentation
+
+    def __getattr__(self, name):
+        attribute = getattr(self._repo, name)
+        if not callable(attribute):
+            return attribute
+
+        def call(*args, **kwargs):
+            with self._instrumentation.stage('github', call=name):
+                return attribute(*args, **kwargs)
+
+        return call
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+
+import os
+import json
+from src.specifications.publishers import git_blob_sha
+
+class SyncJournal:
+    """
+    Records the progress of a sync so a failed run can be resumed
+
+    Each sync is recorded under a key, such as the collections it publishes,
+    with the source commit it was rendered from, the branch it publishes to
+    and the git blob SHA of every file already committed there. The journal
+    is saved after every file, so a rerun from the same source commit can
+    publish the rest to the same branch instead of starting again.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, 'r') as f:
+                entries = json.load(f)
+        except FileNotFoundError:
+            return {}
+        except ValueError:
+            print(f"Ignoring unreadable sync journal {self.path}")
+            return {}
+        return entries if isinstance(entries, dict) else {}
+
+    def save(self):
+        """Write the journal, replacing the file so a crash never leaves it half written"""
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        temporary = f"{self.path}.tmp"
+        with open(temporary, 'w') as f:
+            json.dump(self.entries, f, indent=2, sort_keys=True)
+        os.replace(temporary, self.path)
+
+    def get_resumable(self, key, source_commit):
+        """
+        Get the unfinished sync of a key from the same source commit
+
+        Returns:
+            Dict of the branch and of destination path to the git blob SHA of
+            each file committed to it, or None if there is nothing to resume
+        """
+        entry = self.entries.get(key)
+        if not entry or not source_commit or entry.get('source_commit') != source_commit:
+            return None
+        return entry
+
+    def start(self, key, source_commit, branch):
+        """Record the start of a sync to a branch, forgetting any earlier one"""
+        self.entries[key] = {'source_commit': source_commit, 'branch': branch, 'files': {}}
+        self.save()
+
+    def record(self, key, destination, content):
+        """Record a file as committed to the branch"""
+        self.entries[key]['files'][destination] = git_blob_sha(content)
+        self.save()
+
+    def get_pending(self, key, files):
+        """Get the files that aren't recorded as committed with the same content"""
+        uploaded = self.entries[key]['files']
+        return {
+            destination: content
+            for destination, content in files.items()
+            if uploaded.get(destination) != git_blob_sha(content)
+        }
+
+    def finish(self, key):
+        """Forget a sync once its pull request is open"""
+        if self.entries.pop(key, None) is not None:
+            self.save()
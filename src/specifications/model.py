@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+
+"""
+Compact in-memory model of collections, for holding many of them at once
+
+Loading every specification and guidance page round trip keeps each one as
+ruamel `CommentedMap`s, with their comment and position metadata, and
+ordering copies them again. Here each item (a specification, dataset, field
+or any other collection's item) is instead a slotted object holding only a
+tuple of its values, in the order config.yml gives its fields:
+
+    collections = load_collections(load_config())
+    specification = collections['specifications']['listed-building']
+    for dataset in specification.datasets:
+        print(dataset.key, [field['field'] for field in dataset.fields])
+
+Field names live once in each level's Layout rather than in every item, and
+strings repeated across files, such as dataset and field names, are stored once.
+"""
+
+import os
+import sys
+from src.specifications.validator import yaml
+
+# Stands in for a field an item doesn't have, so every item of a level has a value per field
+MISSING = object()
+
+class Layout:
+    """
+    Fields of one nesting level of a collection, shared by all its items
+
+    Built from a compiled Schema, with a Layout for each repeatable field
+    with its own fields, such as the datasets of a specification.
+    """
+
+    __slots__ = ('fields', 'index', 'key', 'label', 'item_type', 'children')
+
+    def __init__(self, schema):
+        self.fields = tuple(sys.intern(field) for field in schema.order)
+        self.index = {field: position for position, field in enumerate(self.fields)}
+        self.key = schema.key
+        self.label = schema.label
+        self.item_type = ITEM_TYPES.get(schema.key, Item)
+        self.children = {field: Layout(child) for field, child in schema.children.items()}
+
+class Item:
+    """
+    One item of a collection, with its fields in schema order
+
+    Read like a read-only dict of field ID to value. Repeatable fields with
+    their own fields hold a tuple of items, and other lists are tuples.
+    """
+
+    __slots__ = ('layout', 'values')
+
+    def __init__(self, layout, values):
+        self.layout = layout
+        self.values = values
+
+    @property
+    def key(self):
+        """Value of the field identifying the item, from the field_map, or None"""
+        return self.get(self.layout.key) if self.layout.key else None
+
+    def __getitem__(self, field):
+        position = self.layout.index.get(field)
+        if position is None or self.values[position] is MISSING:
+            raise KeyError(field)
+        return self.values[position]
+
+    def get(self, field, default=None):
+        try:
+            return self[field]
+        except KeyError:
+            return default
+
+    def __contains__(self, field):
+        return self.get(field, MISSING) is not MISSING
+
+    def keys(self):
+        return [field for field, value in zip(self.layout.fields, self.values) if value is not MISSING]
+
+    def items(self):
+        return [(field, value) for field, value in zip(self.layout.fields, self.values) if value is not MISSING]
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return sum(1 for value in self.values if value is not MISSING)
+
+    def __eq__(self, other):
+        return isinstance(other, Item) and self.to_dict() == other.to_dict()
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.key!r})" if self.layout.key else f"{type(self).__name__}()"
+
+    def to_dict(self):
+        """Get the item as dicts and lists in schema order, as order_data orders them"""
+        return {field: _to_plain(value) for field, value in self.items()}
+
+class Specification(Item):
+    """A specification, with its datasets"""
+
+    __slots__ = ()
+
+    @property
+    def datasets(self):
+        return self.get('datasets', ())
+
+class Dataset(Item):
+    """A dataset of a specification, with its fields"""
+
+    __slots__ = ()
+
+    @property
+    def fields(self):
+        return self.get('fields', ())
+
+class Field(Item):
+    """A field of a dataset"""
+
+    __slots__ = ()
+
+# Field_map id of a level to the type its items are made as, Item if it isn't here
+ITEM_TYPES = {
+    'specification': Specification,
+    'dataset': Dataset,
+    'field': Field,
+}
+
+def _to_plain(value):
+    if isinstance(value, Item):
+        return value.to_dict()
+    if isinstance(value, tuple):
+        return [_to_plain(item) for item in value]
+    return value
+
+def _share(value, strings):
+    """Get a value with its strings replaced by equal ones already loaded, and lists as tuples"""
+    if isinstance(value, str):
+        return strings.setdefault(value, value)
+    if isinstance(value, list):
+        return tuple(_share(item, strings) for item in value)
+    if isinstance(value, dict):
+        return {sys.intern(str(key)): _share(item, strings) for key, item in value.items()}
+    return value
+
+def build_item(data, layout, strings=None):
+    """
+    Build an item from parsed YAML data
+
+    The values are read in schema order straight into the item's tuple, so
+    fields not in the schema are left out, as order_data leaves them out.
+
+    Args:
+        data: Dict of field ID to value
+        layout: Layout of the item's nesting level
+        strings: Dict of the strings loaded so far to themselves, shared
+            between the items built with it
+
+    Returns:
+        An Item of the layout's item_type
+    """
+    strings = {} if strings is None else strings
+    values = []
+    for field in layout.fields:
+        value = data.get(field, MISSING)
+        child = layout.children.get(field)
+        if child is not None and isinstance(value, list):
+            value = tuple(
+                build_item(item, child, strings) if isinstance(item, dict) else _share(item, strings)
+                for item in value
+            )
+        elif value is not MISSING:
+            value = _share(value, strings)
+        values.append(value)
+    return layout.item_type(layout, tuple(values))
+
+def load_item(source, layout, strings=None):
+    """Load the data of a source YAML file as an item"""
+    with open(source, 'r') as f:
+        document = yaml.load(f)
+    data = document.get('data') if isinstance(document, dict) else None
+    return build_item(data if isinstance(data, dict) else {}, layout, strings)
+
+def load_collection(config, collection_id, sources=None, strings=None):
+    """
+    Load every source of an exported collection
+
+    Args:
+        config: Parsed config
+        collection_id: ID of the collection
+        sources: Source YAML paths to load, every source of the collection if not given
+        strings: Dict of the strings loaded so far, to share them with other collections
+
+    Returns:
+        Dict of each item's key (or its source file name, if it has no key)
+        to the item, in source order
+    """
+    from src.specifications.update_specifications import compile_schema, get_file_mapping
+
+    layout = Layout(compile_schema(config, collection_id))
+    strings = {} if strings is None else strings
+    if sources is None:
+        sources = list(get_file_mapping(config, collection_id))
+
+    items = {}
+    for source in sources:
+        item = load_item(source, layout, strings)
+        key = item.key
+        items[str(key) if key is not None else os.path.splitext(os.path.basename(source))[0]] = item
+    return items
+
+def load_collections(config, collection_ids=None):
+    """
+    Load several exported collections, sharing repeated strings between them
+
+    Args:
+        config: Parsed config
+        collection_ids: IDs of the collections, every exported collection if not given
+
+    Returns:
+        Dict of collection ID to its items (see load_collection)
+    """
+    from src.specifications.discovery import get_exported_collections
+
+    # Only needed while loading, the strings stay shared once it is dropped
+    strings = {}
+    return {
+        collection_id: load_collection(config, collection_id, strings=strings)
+        for collection_id in collection_ids or get_exported_collections(config)
+    }
@@ -0,0 +1,665 @@
+#!/usr/bin/env python3
+
+import os
+import json
+import base64
+import hashlib
+import subprocess
+from types import SimpleNamespace
+
+# Trailer recording the commit of this repository a sync was made from
+SOURCE_COMMIT_TRAILER = "Mini-CMS-Source-Commit"
+
+# Contents API requests in flight at once, within the pool of connections the client keeps open
+CONTENTS_CONCURRENCY = 8
+
+def git(*args, cwd=None, input=None, env=None):
+    """Run a git command and return its output"""
+    result = subprocess.run(
+        ['git', *args],
+        cwd=cwd,
+        input=input,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True
+    )
+    return result.stdout.strip()
+
+def git_blob_sha(content):
+    """Get the git blob SHA of file content, as GitHub reports it for a file"""
+    data = content.encode('utf-8')
+    return hashlib.sha1(b"blob %d\0" % len(data) + data).hexdigest()
+
+def add_source_commit_trailer(message, source_commit):
+    """Add the source commit trailer to a commit message"""
+    if not source_commit:
+        return message
+    return f"{message}\n\n{SOURCE_COMMIT_TRAILER}: {source_commit}"
+
+def get_source_commit_trailer(message):
+    """Get the source commit from a commit message trailer, or None if it has none"""
+    prefix = f"{SOURCE_COMMIT_TRAILER}: "
+    for line in reversed(message.splitlines()):
+        if line.startswith(prefix):
+            return line[len(prefix):].strip()
+    return None
+
+def commit_files_in_branch(repo, branch_name, files, message="Update specifications from the Mini CMS",
+                           parent_sha=None):
+    """
+    Commit files to a GitHub repository branch as a single commit using the Git Data API
+
+    The API calls made are the same however many files there are: the file
+    contents go inline in one tree, which GitHub stores as blobs.
+
+    Args:
+        repo: GitHub repository to commit to
+        branch_name: Name of the existing branch to commit to
+        files: Dict of destination path to file content
+        message: Commit message
+        parent_sha: Commit to build on instead of the head of the branch,
+            which is then force-updated to the new commit
+
+    Returns:
+        The new GitCommit
+    """
+    from github import InputGitTreeElement
+
+    ref = repo.get_git_ref(f"heads/{branch_name}")
+    parent = repo.get_git_commit(parent_sha or ref.object.sha)
+
+    tree = repo.create_git_tree(
+        [
+            InputGitTreeElement(path=destination, mode='100644', type='blob', content=content)
+            for destination, content in files.items()
+        ],
+        base_tree=parent.tree
+    )
+    commit = repo.create_git_commit(message, tree, [parent])
+    if parent_sha:
+        ref.edit(sha=commit.sha, force=True)
+    else:
+        ref.edit(sha=commit.sha)
+
+    return commit
+
+async def get_file_shas(repo, branch, paths, concurrency=CONTENTS_CONCURRENCY):
+    """
+    Get the blob SHA of files on a GitHub repository branch using the Contents API
+
+    The files are read concurrently, each in a thread making a blocking
+    PyGithub call, so the client's pool of connections is shared.
+
+    Args:
+        repo: GitHub repository to read from
+        branch: Name of the branch to read
+        paths: Paths of the files to read
+        concurrency: Most requests to have in flight at once
+
+    Returns:
+        Dict of path to blob SHA, or None if the file doesn't exist
+    """
+    import asyncio
+    from github import UnknownObjectException
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def get_sha(path):
+        async with semaphore:
+            # Only a 404 means the file doesn't exist, anything else is a failure to report
+            try:
+                file = await asyncio.to_thread(repo.get_contents, path, ref=branch)
+            except UnknownObjectException:
+                return None
+            except Exception as e:
+                print(f"Error reading {path}: {str(e)}")
+                raise
+        return file.sha
+
+    shas = await asyncio.gather(*(get_sha(path) for path in paths))
+    return dict(zip(paths, shas))
+
+async def publish_files_async(repo, branch, files, source_commit=None, concurrency=CONTENTS_CONCURRENCY,
+                              on_published=None):
+    """
+    Commit files to a GitHub repository branch one at a time using the Contents API
+
+    For tokens without Git Data API access. The SHAs of the existing files
+    are all read concurrently first, as reading is where the time goes. Each
+    write is a commit that moves the branch, so writes are made one after
+    another in path order, where concurrent writes would conflict. A write
+    rejected because its file changed since it was read is read and tried again once.
+
+    Args:
+        repo: GitHub repository to commit to
+        branch: Name of the existing branch to commit to
+        files: Dict of destination path to file content
+        source_commit: Commit the files were rendered from, recorded as a trailer
+        concurrency: Most reads to have in flight at once
+        on_published: Called with the destination and content of each file
+            once it is committed to the branch
+    """
+    import asyncio
+    from github import GithubException
+
+    destinations = sorted(files)
+    shas = await get_file_shas(repo, branch, destinations, concurrency)
+
+    for destination in destinations:
+        content = files[destination]
+        try:
+            try:
+                await asyncio.to_thread(_write_file, repo, branch, destination, content, shas[destination],
+                                        source_commit)
+            except GithubException as e:
+                # 409 if the file changed since it was read, 422 if it was created since
+                if e.status not in (409, 422):
+                    raise
+                sha = (await get_file_shas(repo, branch, [destination]))[destination]
+                await asyncio.to_thread(_write_file, repo, branch, destination, content, sha, source_commit)
+            print(f"Successfully updated {destination}")
+        except Exception as e:
+            print(f"Error updating {destination}: {str(e)}")
+            raise
+
+        _notify(on_published, destination, content)
+
+def _write_file(repo, branch, destination, content, sha, source_commit):
+    """Update a file with the Contents API, or create it if it has no SHA"""
+    if sha is not None:
+        repo.update_file(
+            path=destination,
+            message=add_source_commit_trailer(f"Update {destination}", source_commit),
+            content=content,
+            sha=sha,
+            branch=branch
+        )
+    else:
+        repo.create_file(
+            path=destination,
+            message=add_source_commit_trailer(f"Create {destination}", source_commit),
+            content=content,
+            branch=branch
+        )
+
+def _notify(on_published, destination, content):
+    if on_published is not None:
+        on_published(destination, content)
+
+class LocalPullRequest:
+    """Stand-in for a pull request made by a local publish backend, shaped like PyGithub's"""
+
+    def __init__(self, title, body, head, base, html_url, number=1, state="open"):
+        self.number = number
+        self.state = state
+        self.title = title
+        self.body = body
+        self.head = SimpleNamespace(ref=head)
+        self.base = SimpleNamespace(ref=base)
+        self.html_url = html_url
+
+    def edit(self, title=None, body=None, state=None):
+        if title is not None:
+            self.title = title
+        if body is not None:
+            self.body = body
+        if state is not None:
+            self.state = state
+
+class Publisher:
+    """
+    Backend that rendered files are published to
+
+    Subclasses implement each step of a sync so the same code path can
+    publish to GitHub or to a local directory or git repository. PyGithub is
+    only imported by the GitHub publisher's methods, so local publishing
+    doesn't load it.
+    """
+
+    def get_branch_sha(self, branch):
+        """Get the SHA of the head commit of a branch"""
+        raise NotImplementedError
+
+    def get_published_shas(self, sha):
+        """Get a dict of path to git blob SHA of every file published at a commit"""
+        raise NotImplementedError
+
+    def get_published_contents(self, sha, paths):
+        """Get a dict of path to content of the files among paths published at a commit"""
+        raise NotImplementedError
+
+    def get_last_synced_commit(self, paths, branch="main", max_commits=30):
+        """Get the source commit of the last sync on a branch touching paths, or None"""
+        raise NotImplementedError
+
+    def create_branch(self, branch, sha):
+        """Create a branch at a commit"""
+        raise NotImplementedError
+
+    def reset_branch(self, branch, sha):
+        """Force an existing branch to a commit"""
+        raise NotImplementedError
+
+    def publish(self, branch, files, source_commit=None, batch=True, base=None, on_published=None):
+        """
+        Publish files to a branch
+
+        Args:
+            branch: Name of the branch to publish to
+            files: Dict of destination path to file content
+            source_commit: Commit the files were rendered from, recorded as a trailer
+            batch: Publish every file in a single commit instead of one per file
+            base: Commit to publish on top of instead of the head of the
+                branch, which is force-updated
+            on_published: Called with the destination and content of each
+                file once it is committed to the branch
+        """
+        raise NotImplementedError
+
+    def create_pull_request(self, title, body, head, base="main"):
+        """Open a pull request from head into base"""
+        raise NotImplementedError
+
+    def find_pull_request(self, prefix, base="main"):
+        """Get an open pull request into base from a branch starting with prefix, or None"""
+        raise NotImplementedError
+
+    def update_pull_request(self, pr, title, body):
+        """Refresh the title and body of a pull request"""
+        raise NotImplementedError
+
+    def close_pull_request(self, pr):
+        """Close a pull request without merging it"""
+        raise NotImplementedError
+
+def _graphql_url(base_url):
+    """Get the GraphQL endpoint for a REST API base URL, which differs on GitHub Enterprise Server"""
+    if base_url.endswith('/api/v3'):
+        return base_url[:-len('/v3')] + '/graphql'
+    return '/graphql'
+
+class GitHubPublisher(Publisher):
+    """
+    Publishes to a GitHub repository
+
+    Args:
+        repo: GitHub repository to publish to
+        concurrency: Most Contents API requests to have in flight at once
+            when publishing without batching
+    """
+
+    # Files read per GraphQL query, well under the API's node limit
+    GRAPHQL_BATCH_SIZE = 100
+
+    def __init__(self, repo, concurrency=CONTENTS_CONCURRENCY):
+        self.repo = repo
+        self.concurrency = concurrency
+
+    def get_branch_sha(self, branch):
+        return self.repo.get_branch(branch).commit.sha
+
+    def get_published_shas(self, sha):
+        # One recursive tree listing rather than a request per file
+        tree = self.repo.get_git_tree(sha, recursive=True)
+        return {element.path: element.sha for element in tree.tree if element.type == 'blob'}
+
+    def get_published_contents(self, sha, paths):
+        contents = {}
+        paths = list(paths)
+        for start in range(0, len(paths), self.GRAPHQL_BATCH_SIZE):
+            contents.update(self._get_blobs(sha, paths[start:start + self.GRAPHQL_BATCH_SIZE]))
+        return contents
+
+    def _get_blobs(self, sha, paths):
+        """Read files at a commit with one GraphQL query, rather than a request per blob"""
+        owner, name = self.repo.full_name.split('/', 1)
+        objects = " ".join(
+            f"file{index}: object(expression: {json.dumps(f'{sha}:{path}')}) "
+            "{ ... on Blob { oid text isTruncated } }"
+            for index, path in enumerate(paths)
+        )
+        query = f"query($owner: String!, $name: String!) {{ repository(owner: $owner, name: $name) {{ {objects} }} }}"
+
+        requester = self.repo._requester
+        _, response = requester.requestJsonAndCheck(
+            "POST",
+            _graphql_url(requester.base_url),
+            input={'query': query, 'variables': {'owner': owner, 'name': name}},
+        )
+        if not response.get('data'):
+            from github import GithubException
+            raise GithubException(200, response, None)
+
+        contents = {}
+        for index, path in enumerate(paths):
+            blob = response['data']['repository'][f"file{index}"]
+            if not blob:
+                continue
+            if blob['isTruncated'] or blob['text'] is None:
+                # Large files are cut short in GraphQL, so read them in full
+                contents[path] = base64.b64decode(self.repo.get_git_blob(blob['oid']).content).decode('utf-8')
+            else:
+                contents[path] = blob['text']
+        return contents
+
+    def get_last_synced_commit(self, paths, branch="main", max_commits=30):
+        for path in paths:
+            for i, commit in enumerate(self.repo.get_commits(sha=branch, path=path)):
+                if i >= max_commits:
+                    break
+                source_commit = get_source_commit_trailer(commit.commit.message)
+                if source_commit:
+                    return source_commit
+        return None
+
+    def create_branch(self, branch, sha):
+        self.repo.create_git_ref(ref=f"refs/heads/{branch}", sha=sha)
+
+    def reset_branch(self, branch, sha):
+        self.repo.get_git_ref(f"heads/{branch}").edit(sha=sha, force=True)
+
+    def publish(self, branch, files, source_commit=None, batch=True, base=None, on_published=None):
+        if batch:
+            try:
+                message = add_source_commit_trailer("Update specifications from the Mini CMS", source_commit)
+                commit = commit_files_in_branch(self.repo, branch, files, message=message, parent_sha=base)
+            except Exception as e:
+                print(f"Error committing {len(files)} files: {str(e)}")
+                raise
+
+            for destination in files:
+                print(f"Successfully updated {destination}")
+                _notify(on_published, destination, files[destination])
+            print(f"Committed {len(files)} files in {commit.sha}")
+            return
+
+        # Like PyGithub, asyncio is only loaded by the commands that need it
+        import asyncio
+
+        if base is not None:
+            self.reset_branch(branch, base)
+
+        asyncio.run(publish_files_async(self.repo, branch, files, source_commit=source_commit,
+                                        concurrency=self.concurrency, on_published=on_published))
+
+    def create_pull_request(self, title, body, head, base="main"):
+        return self.repo.create_pull(title=title, body=body, head=head, base=base)
+
+    def find_pull_request(self, prefix, base="main"):
+        for pr in self.repo.get_pulls(state="open", base=base):
+            # Ignore branches of the same name on forks
+            if pr.head.ref.startswith(prefix) and pr.head.repo and pr.head.repo.full_name == self.repo.full_name:
+                return pr
+        return None
+
+    def update_pull_request(self, pr, title, body):
+        pr.edit(title=title, body=body)
+
+    def close_pull_request(self, pr):
+        pr.edit(state="closed")
+
+class DirectoryPublisher(Publisher):
+    """
+    Publishes by writing files into a local directory
+
+    Branches aren't modelled: every branch is the directory itself, and the
+    source commit of the last sync is kept in a file alongside the output.
+    """
+
+    SOURCE_COMMIT_FILE = ".mini-cms-source-commit"
+
+    def __init__(self, path):
+        self.path = path
+
+    def get_branch_sha(self, branch):
+        return None
+
+    def get_published_shas(self, sha):
+        shas = {}
+        for root, _, filenames in os.walk(self.path):
+            for filename in filenames:
+                path = os.path.join(root, filename)
+                destination = os.path.relpath(path, self.path).replace(os.sep, '/')
+                if destination == self.SOURCE_COMMIT_FILE:
+                    continue
+                # Without newline='' carriage returns in rendered bodies would be read as plain line feeds
+                with open(path, 'r', newline='') as f:
+                    shas[destination] = git_blob_sha(f.read())
+        return shas
+
+    def get_published_contents(self, sha, paths):
+        contents = {}
+        for destination in paths:
+            try:
+                with open(os.path.join(self.path, destination), 'r', newline='') as f:
+                    contents[destination] = f.read()
+            except FileNotFoundError:
+                pass
+        return contents
+
+    def get_last_synced_commit(self, paths, branch="main", max_commits=30):
+        try:
+            with open(os.path.join(self.path, self.SOURCE_COMMIT_FILE), 'r') as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def create_branch(self, branch, sha):
+        os.makedirs(self.path, exist_ok=True)
+
+    def reset_branch(self, branch, sha):
+        pass
+
+    def publish(self, branch, files, source_commit=None, batch=True, base=None, on_published=None):
+        for destination, content in files.items():
+            path = os.path.join(self.path, destination)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'w', newline='') as f:
+                f.write(content)
+            print(f"Successfully updated {destination}")
+            _notify(on_published, destination, content)
+
+        if source_commit:
+            with open(os.path.join(self.path, self.SOURCE_COMMIT_FILE), 'w') as f:
+                f.write(f"{source_commit}\n")
+
+    def create_pull_request(self, title, body, head, base="main"):
+        return LocalPullRequest(title, body, head, base, f"file://{os.path.abspath(self.path)}")
+
+    def find_pull_request(self, prefix, base="main"):
+        # Every sync writes straight into the directory, there is nothing to reuse
+        return None
+
+    def update_pull_request(self, pr, title, body):
+        pr.edit(title=title, body=body)
+
+    def close_pull_request(self, pr):
+        pr.edit(state="closed")
+
+class GitPublisher(Publisher):
+    """
+    Publishes by committing to a local git repository, which may be bare
+
+    Commits are made with git plumbing on a temporary index, so a bare
+    repository or one with a checkout both work and no working tree is touched.
+    Pull requests are recorded in a JSON file in the git directory.
+    """
+
+    PULL_REQUESTS_FILE = "mini-cms-pull-requests.json"
+
+    def __init__(self, path):
+        self.path = path
+
+    def _git(self, *args, input=None, env=None):
+        return git(*args, cwd=self.path, input=input, env=env)
+
+    def get_branch_sha(self, branch):
+        return self._git('rev-parse', '--verify', f"refs/heads/{branch}^{{commit}}")
+
+    def get_published_shas(self, sha):
+        shas = {}
+        for line in self._git('ls-tree', '-r', '-z', sha).split('\0'):
+            if not line:
+                continue
+            info, path = line.split('\t', 1)
+            _, object_type, object_sha = info.split()
+            if object_type == 'blob':
+                shas[path] = object_sha
+        return shas
+
+    def get_published_contents(self, sha, paths):
+        # One cat-file process reads every file
+        paths = list(paths)
+        result = subprocess.run(
+            ['git', 'cat-file', '--batch'],
+            cwd=self.path,
+            input=b"".join(f"{sha}:{path}\n".encode('utf-8') for path in paths),
+            capture_output=True,
+            check=True
+        )
+
+        contents = {}
+        output = result.stdout
+        position = 0
+        for path in paths:
+            end = output.index(b"\n", position)
+            header = output[position:end].split()
+            position = end + 1
+            if header[-1] == b"missing":
+                continue
+            size = int(header[2])
+            if header[1] == b"blob":
+                contents[path] = output[position:position + size].decode('utf-8')
+            position += size + 1
+        return contents
+
+    def get_last_synced_commit(self, paths, branch="main", max_commits=30):
+        log = self._git('log', f"-n{max_commits}", '--format=%B%x00', f"refs/heads/{branch}", '--', *paths)
+        for message in log.split('\0'):
+            source_commit = get_source_commit_trailer(message)
+            if source_commit:
+                return source_commit
+        return None
+
+    def create_branch(self, branch, sha):
+        self._git('update-ref', f"refs/heads/{branch}", sha, '0' * 40)
+
+    def reset_branch(self, branch, sha):
+        self._git('update-ref', f"refs/heads/{branch}", sha)
+
+    def _commit(self, branch, files, message, parent=None):
+        """Commit files on top of a branch, or of parent, and move the branch to the new commit"""
+        head = self.get_branch_sha(branch)
+        parent = parent or head
+        index_file = os.path.join(self._git('rev-parse', '--absolute-git-dir'), f"mini-cms-index-{os.getpid()}")
+        env = {
+            **os.environ,
+            'GIT_INDEX_FILE': index_file,
+            'GIT_AUTHOR_NAME': os.environ.get('GIT_AUTHOR_NAME', 'Mini CMS'),
+            'GIT_AUTHOR_EMAIL': os.environ.get('GIT_AUTHOR_EMAIL', 'mini-cms@localhost'),
+            'GIT_COMMITTER_NAME': os.environ.get('GIT_COMMITTER_NAME', 'Mini CMS'),
+            'GIT_COMMITTER_EMAIL': os.environ.get('GIT_COMMITTER_EMAIL', 'mini-cms@localhost'),
+        }
+
+        try:
+            self._git('read-tree', parent, env=env)
+            for destination, content in files.items():
+                sha = self._git('hash-object', '-w', '--stdin', input=content)
+                self._git('update-index', '--add', '--cacheinfo', f"100644,{sha},{destination}", env=env)
+            tree = self._git('write-tree', env=env)
+            commit = self._git('commit-tree', tree, '-p', parent, '-F', '-', input=message, env=env)
+            self._git('update-ref', f"refs/heads/{branch}", commit, head)
+        finally:
+            if os.path.exists(index_file):
+                os.remove(index_file)
+
+        return commit
+
+    def publish(self, branch, files, source_commit=None, batch=True, base=None, on_published=None):
+        if batch:
+            message = add_source_commit_trailer("Update specifications from the Mini CMS", source_commit)
+            commit = self._commit(branch, files, message, parent=base)
+            for destination in files:
+                print(f"Successfully updated {destination}")
+                _notify(on_published, destination, files[destination])
+            print(f"Committed {len(files)} files in {commit}")
+            return
+
+        if base is not None:
+            self.reset_branch(branch, base)
+
+        published = self.get_published_shas(self.get_branch_sha(branch))
+        for destination, content in files.items():
+            action = "Update" if destination in published else "Create"
+            message = add_source_commit_trailer(f"{action} {destination}", source_commit)
+            self._commit(branch, {destination: content}, message)
+            print(f"Successfully updated {destination}")
+            _notify(on_published, destination, content)
+
+    def _pull_requests_path(self):
+        return os.path.join(self._git('rev-parse', '--absolute-git-dir'), self.PULL_REQUESTS_FILE)
+
+    def get_pull_requests(self):
+        """Get every pull request recorded in the repository"""
+        try:
+            with open(self._pull_requests_path(), 'r') as f:
+                records = json.load(f)
+        except FileNotFoundError:
+            return []
+
+        return [
+            LocalPullRequest(
+                record['title'],
+                record['body'],
+                record['head'],
+                record['base'],
+                f"file://{os.path.abspath(self.path)}#{record['head']}",
+                number=record['number'],
+                state=record['state']
+            )
+            for record in records
+        ]
+
+    def _save_pull_requests(self, pulls):
+        records = [
+            {
+                'number': pr.number,
+                'state': pr.state,
+                'title': pr.title,
+                'body': pr.body,
+                'head': pr.head.ref,
+                'base': pr.base.ref,
+            }
+            for pr in pulls
+        ]
+        with open(self._pull_requests_path(), 'w') as f:
+            json.dump(records, f, indent=2)
+
+    def create_pull_request(self, title, body, head, base="main"):
+        pulls = self.get_pull_requests()
+        pr = LocalPullRequest(
+            title,
+            body,
+            head,
+            base,
+            f"file://{os.path.abspath(self.path)}#{head}",
+            number=len(pulls) + 1
+        )
+        self._save_pull_requests(pulls + [pr])
+        return pr
+
+    def find_pull_request(self, prefix, base="main"):
+        # Most recent first, as GitHub lists them
+        for pr in reversed(self.get_pull_requests()):
+            if pr.state == "open" and pr.base.ref == base and pr.head.ref.startswith(prefix):
+                return pr
+        return None
+
+    def update_pull_request(self, pr, title, body):
+        pr.edit(title=title, body=body)
+        self._save_pull_requests([pr if saved.number == pr.number else saved for saved in self.get_pull_requests()])
+
+    def close_pull_request(self, pr):
+        pr.edit(state="closed")
+        self._save_pull_requests([pr if saved.number == pr.number else saved for saved in self.get_pull_requests()])
@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+
+import re
+from io import StringIO
+from ruamel.yaml.comments import CommentedMap, CommentedSeq, Comment, Anchor, Tag, merge_attrib
+from ruamel.yaml.emitter import Emitter
+from ruamel.yaml.nodes import ScalarNode
+from ruamel.yaml.scalarstring import (
+    PlainScalarString,
+    LiteralScalarString,
+    SingleQuotedScalarString,
+    DoubleQuotedScalarString,
+)
+
+STR_TAG = 'tag:yaml.org,2002:str'
+
+# Characters only double quoted scalars can hold, other than line breaks
+NOT_PRINTABLE = re.compile('[^\n\x20-\x7E\x85\xA0-\uD7FF\uE000-\uFFFD\U00010000-\U0010FFFF]|\uFEFF')
+
+# Characters escaped in double quoted scalars
+DOUBLE_QUOTED_ESCAPE = re.compile('["\\\\\n\x85\u2028\u2029\uFEFF]|' + NOT_PRINTABLE.pattern)
+
+# Line breaks other than \n, which the emitter writes as they are and breaks lines on
+OTHER_BREAKS = re.compile('[\x85\u2028\u2029]')
+
+# Spaces next to a line break, which single quoted scalars can't keep
+SPACE_AROUND_BREAK = re.compile(' \n|\n ')
+
+LINE_BREAKS = re.compile('\n+')
+
+# Anything that stops a single line string being written as a plain scalar in block context
+PLAIN_UNSAFE = re.compile(r"\A(?:---|\.\.\.)|\A[#,\[\]{}&*!|>'\"%@`]|\A[?:-](?:[ \t]|\Z)|:(?:[ \t]|\Z)|[ \t]#|\A | \Z")
+
+# Keys longer than this aren't written as simple keys
+MAX_SIMPLE_KEY_LENGTH = 128
+
+# Strings whose resolved type is remembered at once, so memory stays bounded however much is dumped
+MAX_REMEMBERED = 1000
+
+class Unsupported(Exception):
+    """Raised for data the fast path can't be sure of writing exactly as ruamel would"""
+
+def _escape(match):
+    ch = match.group()
+    if ch in Emitter.ESCAPE_REPLACEMENTS:
+        return '\\' + Emitter.ESCAPE_REPLACEMENTS[ch]
+    if ch <= '\xFF':
+        return '\\x%02X' % ord(ch)
+    if ch <= '\uFFFF':
+        return '\\u%04X' % ord(ch)
+    return '\\U%08X' % ord(ch)
+
+class FrontmatterSerializer:
+    """
+    Writes ordered specification data exactly as the round trip YAML instance would
+
+    Ruamel's emitter analyses every scalar character by character, which is
+    most of the time spent rendering guidance heavy files. This writes the
+    block mappings, sequences and scalars the exporter produces directly,
+    following the same rules for choosing plain, quoted and literal styles.
+    Anything else, such as floats, dates, comments or flow style, falls back
+    to dumping the whole document with ruamel, so the output is always the
+    same byte for byte.
+
+    Only the layout the exporter configures is supported: mappings indented
+    by 2, sequences by 4 with the dash offset by 2, and `str_presenter`
+    writing multi-line strings as literal blocks.
+    """
+
+    def __init__(self, yaml):
+        self.yaml = yaml
+        self.width = yaml.width
+        self.resolver = yaml.resolver
+        self._resolves_to_str = {}
+        self._open_ended_at = None
+
+    def dump(self, data):
+        """
+        Dump data as YAML
+
+        Args:
+            data: Data to dump, usually the output of order_data
+
+        Returns:
+            The YAML as a string
+        """
+        try:
+            return self.fast_dump(data)
+        except Unsupported:
+            buffer = StringIO()
+            self.yaml.dump(data, buffer)
+            return buffer.getvalue()
+
+    def fast_dump(self, data):
+        """Dump data as YAML without falling back, raising Unsupported for data the fast path can't write"""
+        text, open_ended = self.dump_block(data)
+
+        # A document ending in a literal block that keeps its trailing line breaks is closed explicitly
+        if open_ended:
+            text += "...\n"
+        return text
+
+    def dump_block(self, data, indent=0, first_prefix=''):
+        """
+        Dump a mapping as it is written nested in a document, without falling back
+
+        Args:
+            data: Mapping to dump
+            indent: Column its keys start at
+            first_prefix: Written before the first key instead of the
+                indentation, such as the dash of a sequence item
+
+        Returns:
+            Tuple of the YAML and whether it ends in a literal block keeping
+            its trailing line breaks
+
+        Raises:
+            Unsupported: For data the fast path can't write
+        """
+        if not isinstance(data, dict) or not data:
+            raise Unsupported(type(data).__name__)
+
+        lines = []
+        self._open_ended_at = None
+        self._mapping(data, indent, first_prefix, lines)
+        return ''.join(lines), self._open_ended_at == len(lines)
+
+    def _mapping(self, mapping, indent, first_prefix, lines):
+        """
+        Write a block mapping whose keys start at the column indent
+
+        The first key is written after first_prefix, which is the dash of a
+        sequence item or indentation.
+        """
+        _check_container(mapping)
+
+        prefix = first_prefix
+        for key, value in mapping.items():
+            key = self._key(key)
+            start = f"{prefix}{key}:"
+            prefix = ' ' * indent
+
+            if isinstance(value, dict):
+                if not value:
+                    _check_container(value)
+                    lines.append(f"{start} {{}}\n")
+                else:
+                    lines.append(start + "\n")
+                    self._mapping(value, indent + 2, ' ' * (indent + 2), lines)
+            elif isinstance(value, list):
+                if not value:
+                    _check_container(value)
+                    lines.append(f"{start} []\n")
+                else:
+                    lines.append(start + "\n")
+                    self._sequence(value, indent + 2, lines)
+            elif value is None:
+                lines.append(start + "\n")
+            else:
+                self._scalar(value, start, indent + 2, lines)
+
+    def _sequence(self, sequence, indent, lines):
+        """Write a block sequence whose dashes are at the column indent"""
+        _check_container(sequence)
+
+        dash = ' ' * indent + '- '
+        for item in sequence:
+            if isinstance(item, dict) and item:
+                self._mapping(item, indent + 2, dash, lines)
+            elif isinstance(item, (dict, list)) or item is None:
+                raise Unsupported("nested sequence or empty item")
+            else:
+                scalar = self._inline_scalar(item, indent + 2, indent + 2)
+                if scalar is None:
+                    raise Unsupported("block scalar in a sequence")
+                lines.append(f"{dash}{scalar}\n")
+
+    def _key(self, key):
+        """Get a key as written, which must be a plain scalar"""
+        if type(key) not in (str, PlainScalarString):
+            raise Unsupported(f"{type(key).__name__} key")
+        if (
+            not key
+            or len(key) >= MAX_SIMPLE_KEY_LENGTH
+            or NOT_PRINTABLE.search(key)
+            or '\n' in key
+            or OTHER_BREAKS.search(key)
+            or PLAIN_UNSAFE.search(key)
+            or not self._is_implicit_str(key)
+        ):
+            raise Unsupported(f"key {key!r}")
+        return key
+
+    def _scalar(self, value, start, indent, lines):
+        """Write a scalar mapping value after start, continuing any further lines at the column indent"""
+        inline = self._inline_scalar(value, len(start) + 1, indent)
+        if inline is not None:
+            lines.append(f"{start} {inline}\n")
+            return
+
+        if OTHER_BREAKS.search(value) or not value:
+            raise Unsupported("literal block")
+
+        hints = _block_hints(value)
+        lines.append(f"{start} |{hints}\n")
+        content = ' ' * indent
+        if value[-1] != '\n':
+            value += '\n'
+        for line in value.split('\n')[:-1]:
+            lines.append(f"{content}{line}\n" if line else "\n")
+
+        if hints.endswith('+'):
+            self._open_ended_at = len(lines)
+
+    def _inline_scalar(self, value, column, indent):
+        """
+        Get a scalar as written from the column it starts at
+
+        Single quoted scalars can run over several lines, which continue at
+        the column indent. Returns None if the value is written as a literal
+        block instead.
+        """
+        value_type = type(value)
+
+        if value_type is bool:
+            return 'true' if value else 'false'
+        if value_type is int:
+            return str(value)
+
+        if value_type is str:
+            style = '|' if '\n' in value else None
+        elif value_type is PlainScalarString:
+            style = None
+        elif value_type is LiteralScalarString:
+            style = '|'
+        elif value_type is SingleQuotedScalarString:
+            style = "'"
+        elif value_type is DoubleQuotedScalarString:
+            style = '"'
+        else:
+            raise Unsupported(value_type.__name__)
+
+        if value_type is not str:
+            anchor = getattr(value, Anchor.attrib, None)
+            if (anchor is not None and anchor.value is not None) or getattr(value, 'comment', None) is not None:
+                raise Unsupported("anchor or comment")
+
+        if style == '|':
+            return None
+
+        if style != '"':
+            multiline = '\n' in value
+            if OTHER_BREAKS.search(value):
+                raise Unsupported("line break other than \\n")
+            if NOT_PRINTABLE.search(value) or (multiline and SPACE_AROUND_BREAK.search(value)):
+                # Only double quotes can keep these
+                style = '"'
+            elif style is None:
+                if not multiline and not PLAIN_UNSAFE.search(value) and self._is_implicit_str(value):
+                    style = ''
+                elif multiline or "'" in value:
+                    style = '"'
+                else:
+                    style = "'"
+
+        if style == '':
+            written = value
+        elif style == "'":
+            written = "'" + value.replace("'", "''") + "'"
+            if '\n' in written:
+                # Each run of line breaks is written with an extra one, as a single break reads back as a space
+                continuation = ' ' * indent
+                written = LINE_BREAKS.sub(lambda match: match.group() + "\n" + continuation, written)
+        else:
+            written = '"' + DOUBLE_QUOTED_ESCAPE.sub(_escape, value) + '"'
+
+        # Long lines are folded by the emitter
+        first_line, _, rest = written.partition('\n')
+        if column + len(first_line) > self.width or (rest and max(map(len, rest.split('\n'))) > self.width):
+            raise Unsupported("line longer than the width")
+        return written
+
+    def _is_implicit_str(self, value):
+        """Check a plain scalar would be read back as a string, not e.g. a number or date"""
+        resolves = self._resolves_to_str.get(value)
+        if resolves is None:
+            if len(self._resolves_to_str) >= MAX_REMEMBERED:
+                self._resolves_to_str.clear()
+            resolves = self.resolver.resolve(ScalarNode, value, (True, False)) == STR_TAG
+            self._resolves_to_str[value] = resolves
+        return resolves
+
+def _check_container(container):
+    """Raise Unsupported for round trip mappings and sequences carrying comments, anchors, tags or flow style"""
+    if type(container) in (dict, list):
+        return
+    if type(container) not in (CommentedMap, CommentedSeq):
+        raise Unsupported(type(container).__name__)
+
+    comment = getattr(container, Comment.attrib, None)
+    if comment is not None and (comment.comment or comment.items or comment.end):
+        raise Unsupported("comments")
+    anchor = getattr(container, Anchor.attrib, None)
+    tag = getattr(container, Tag.attrib, None)
+    if (
+        (anchor is not None and anchor.value is not None)
+        or (tag is not None and tag.value is not None)
+        or getattr(container, merge_attrib, None)
+        or container.fa.flow_style(False)
+    ):
+        raise Unsupported("anchor, tag, merge or flow style")
+
+def _block_hints(text):
+    """Get the indentation and chomping indicators of a literal block"""
+    hints = '2' if text[0] in ' \n' else ''
+    if text[-1] != '\n':
+        hints += '-'
+    elif len(text) == 1 or text[-2] == '\n':
+        hints += '+'
+    return hints
@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+
+"""
+Render source files without loading them whole, for very large specifications
+
+render_file parses a whole source before ordering and writing it, so the
+memory it takes grows with the file. Here a source is read line by line to
+find where each key and sequence item of its data starts and ends, and one
+value at a time is parsed, ordered and written out:
+
+    with open('/tmp/listed-building.md', 'w') as out:
+        stream_render('data/collections/specifications/listed-building.yml', schema, out)
+
+The sequences of repeatable fields with their own fields, such as datasets
+and their fields, are written an item at a time, so memory is bounded by the
+largest single field rather than the whole file. The output is the same as
+render_file's byte for byte. Sources laid out in ways this doesn't follow,
+such as comments between keys, quoted keys or flow style sequences, raise
+Unsupported, and render_to_file renders those whole instead.
+"""
+
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from ruamel.yaml.error import YAMLError
+from ruamel.yaml.nodes import ScalarNode
+from ruamel.yaml.scalarstring import PlainScalarString
+from src.specifications.serializer import Unsupported, STR_TAG
+from src.specifications.update_specifications import yaml, serializer, order_item, render_file
+
+# A block mapping key, with what follows it on the line
+KEY_LINE = re.compile(rb"([A-Za-z_][\w.-]*):(?:[ \t]+(.*)|[ \t]*)$")
+
+def _lines(f, start, end):
+    """Yield the offset and bytes of each line of a file from start up to end"""
+    position = start
+    while position < end:
+        # Seeking each time lets scans of nested ranges of the same file interleave
+        f.seek(position)
+        line = f.readline()
+        if not line:
+            return
+        yield position, line
+        position += len(line)
+
+def _content(line):
+    """Get a line's column and text after its indentation, or None for a blank line"""
+    text = line.lstrip(b' ')
+    if not text.strip():
+        return None
+    if b'\r' in text or text.startswith(b'\t'):
+        raise Unsupported("carriage return or tab indentation")
+    return len(line) - len(text), text
+
+def _is_dash(text):
+    return text.startswith(b'- ') or text.rstrip(b'\n') == b'-'
+
+def _scan_mapping(f, start, end, column, item=False):
+    """
+    Find where each key of a block mapping starts and ends
+
+    Args:
+        f: Source file opened in binary mode
+        start: Offset of the mapping's first line
+        end: Offset the mapping ends at
+        column: Column its keys start at
+        item: Whether the mapping is a sequence item, its first line starting with the dash
+
+    Returns:
+        Dict of key to the offsets its line starts and its value starts and
+        ends at, and the text after the key on its line
+    """
+    keys = {}
+    current = None
+    for position, line in _lines(f, start, end):
+        if item and position == start:
+            line = line.replace(b'-', b' ', 1)
+        content = _content(line)
+        if content is None:
+            continue
+        indentation, text = content
+
+        # Deeper lines, and the dashes of a sequence indented no more than its key, belong to the last key
+        if indentation > column or (indentation == column and _is_dash(text)):
+            if current is None:
+                raise Unsupported("value before the first key")
+            continue
+        if indentation < column or text.startswith(b'#'):
+            raise Unsupported("comment or unexpected indentation")
+
+        match = KEY_LINE.match(text.rstrip(b'\n'))
+        if match is None:
+            raise Unsupported(f"key line {text!r}")
+        key = match.group(1).decode()
+        if key in keys or (current and current[0] == key) or not _is_str(key):
+            raise Unsupported(f"key {key!r}")
+
+        if current:
+            keys[current[0]] = current[1:3] + (position, current[3])
+        current = (key, position, position + len(line), (match.group(2) or b'').strip())
+
+    if current:
+        keys[current[0]] = current[1:3] + (end, current[3])
+    return keys
+
+def _scan_sequence(f, start, end):
+    """
+    Find where each item of a block sequence starts and ends, yielding them as they're found
+
+    Yields:
+        Tuple of the offsets an item starts and ends at and the column its content starts at
+    """
+    column = None
+    item = None
+    for position, line in _lines(f, start, end):
+        content = _content(line)
+        if content is None:
+            continue
+        indentation, text = content
+
+        if column is None:
+            column = indentation
+        if indentation > column:
+            continue
+        if indentation < column or not text.startswith(b'- ') or not text[2:].strip():
+            raise Unsupported("not a block sequence of inline items")
+
+        if item is not None:
+            yield item + (position,)
+        rest = text[1:]
+        item = (position, column + 1 + len(rest) - len(rest.lstrip(b' ')))
+
+    if item is not None:
+        yield item + (end,)
+
+def _first_content(f, start, end):
+    """Get the column and text of the first line from start up to end that isn't blank, or None"""
+    for _, line in _lines(f, start, end):
+        content = _content(line)
+        if content is not None:
+            return content
+    return None
+
+# Key to whether it's read back as a string
+_str_keys = {}
+
+def _is_str(key):
+    resolves = _str_keys.get(key)
+    if resolves is None:
+        resolves = _str_keys[key] = yaml.resolver.resolve(ScalarNode, key, (True, False)) == STR_TAG
+    return resolves
+
+def _load(f, start, end, column, item=False):
+    """Load the YAML from start up to end, moved left so column is the first"""
+    f.seek(start)
+    text = f.read(end - start).decode('utf-8')
+    if item:
+        text = text.replace('-', ' ', 1)
+
+    margin = ' ' * column
+    lines = []
+    for line in text.split('\n'):
+        if line.startswith(margin):
+            lines.append(line[column:])
+        elif not line.strip(' '):
+            lines.append('')
+        else:
+            raise Unsupported("unexpected indentation")
+    try:
+        return yaml.load('\n'.join(lines))
+    finally:
+        # Each load adds to the document info ruamel keeps, which would grow with the number of values
+        del yaml.doc_infos[:]
+
+class _Writer:
+    """Writes frontmatter a piece at a time, holding back the last so it can be ended as dump_frontmatter ends it"""
+
+    def __init__(self, out):
+        self.out = out
+        self.last = None
+        self.open_ended = False
+
+    def write(self, text, open_ended=False):
+        if self.last is not None:
+            self.out.write(self.last)
+        self.last = text
+        self.open_ended = open_ended
+
+    def close(self):
+        if self.last is None:
+            raise Unsupported("empty frontmatter")
+        # dump_frontmatter strips the dump, which keeps the end marker after an open ended literal block
+        self.out.write(self.last + "..." if self.open_ended else self.last.rstrip())
+        self.out.write("\n---\n")
+
+def _write_mapping(f, keys, column, schema, writer, indent, first_prefix, item_start=None, skip=None):
+    """
+    Write the keys of a mapping found by _scan_mapping in schema order, as order_item orders them
+
+    The first key of a sequence item starts at item_start, on the line with its dash.
+    """
+    prefix = first_prefix
+    written = False
+    for field in schema.order:
+        if field not in keys or field == skip:
+            continue
+        start, value_start, end, rest = keys[field]
+        child = schema.children.get(field)
+        first = _first_content(f, value_start, end) if child is not None and not rest else None
+
+        if first is not None and _is_dash(first[1]):
+            # Written as the key of a non-empty sequence, which also checks the key can be written plain
+            writer.write(serializer.dump_block({PlainScalarString(field): None}, indent, prefix)[0])
+            _write_sequence(f, value_start, end, child, writer, indent + 2)
+        else:
+            value = _load(f, start, end, column, item=start == item_start)
+            writer.write(*serializer.dump_block(order_item(value, schema), indent, prefix))
+        prefix = ' ' * indent
+        written = True
+
+    if not written:
+        raise Unsupported("no fields in the schema")
+
+def _write_sequence(f, start, end, schema, writer, indent):
+    """Write the items of a repeatable field an item at a time, with their dashes at the column indent"""
+    dash = ' ' * indent + '- '
+    for item_start, column, item_end in _scan_sequence(f, start, end):
+        if schema.children:
+            keys = _scan_mapping(f, item_start, item_end, column, item=True)
+            _write_mapping(f, keys, column, schema, writer, indent + 2, dash, item_start)
+        else:
+            item = _load(f, item_start, item_end, column, item=True)
+            if not isinstance(item, dict):
+                raise Unsupported(type(item).__name__)
+            writer.write(*serializer.dump_block(order_item(item, schema), indent + 2, dash))
+
+def stream_render(source, schema, out, body_field=None):
+    """
+    Render a source YAML file as ordered markdown frontmatter, without loading it whole
+
+    Args:
+        source: Path of the source YAML file
+        schema: Compiled Schema of the source's collection
+        out: Text file to write the markdown to
+        body_field: Field written as the markdown body after the frontmatter
+            instead of in it
+
+    Raises:
+        Unsupported: For sources this can't be sure of rendering as
+            render_file would, after writing part of the markdown
+    """
+    with open(source, 'rb') as f:
+        if f.read(3) == b'\xef\xbb\xbf':
+            raise Unsupported("byte order mark")
+        document = _scan_mapping(f, 0, os.fstat(f.fileno()).st_size, 0)
+        if 'data' not in document or document['data'][3]:
+            raise Unsupported("no block mapping of data")
+
+        _, data_start, data_end, _ = document['data']
+        first = _first_content(f, data_start, data_end)
+        if first is None or _is_dash(first[1]):
+            raise Unsupported("no block mapping of data")
+        column = first[0]
+        keys = _scan_mapping(f, data_start, data_end, column)
+
+        out.write("---\n")
+        writer = _Writer(out)
+        _write_mapping(f, keys, column, schema, writer, 0, '', skip=body_field)
+        writer.close()
+
+        if body_field and body_field in keys and body_field in schema.order:
+            start, _, end, _ = keys[body_field]
+            body = _load(f, start, end, column)[body_field]
+            if body:
+                out.write(f"\n{body.strip()}\n")
+
+def render_to_file(source, destination, schema, body_field=None):
+    """
+    Render a source YAML file into a file, streaming it if it can be
+
+    Args:
+        source: Path of the source YAML file
+        destination: Path of the markdown file to write
+        schema: Compiled Schema of the source's collection
+        body_field: Field written as the markdown body
+
+    Returns:
+        True if the source was streamed, False if it was rendered whole
+    """
+    with open(destination, 'w', newline='') as out:
+        try:
+            stream_render(source, schema, out, body_field)
+            return True
+        except (Unsupported, YAMLError, ValueError):
+            out.seek(0)
+            out.truncate()
+            out.write(render_file(source, schema, body_field))
+            return False
+
+def render_to_directory(jobs, output_dir, workers=1):
+    """
+    Render (source, destination, schema, body field) jobs into a directory, streaming each source
+
+    Args:
+        jobs: Jobs to render, as get_render_jobs lists them
+        output_dir: Directory the destinations are relative to
+        workers: Number of processes to render with, 0 for one per CPU
+
+    Returns:
+        Dict of each destination to whether it was streamed, in job order
+    """
+    paths = []
+    for _, destination, _, _ in jobs:
+        path = os.path.join(output_dir, destination)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        paths.append(path)
+
+    arguments = ([source for source, _, _, _ in jobs], paths,
+                 [schema for _, _, schema, _ in jobs], [body_field for _, _, _, body_field in jobs])
+    if workers != 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=workers or None) as executor:
+            streamed = list(executor.map(render_to_file, *arguments))
+    else:
+        streamed = list(map(render_to_file, *arguments))
+
+    return {destination: result for (_, destination, _, _), result in zip(jobs, streamed)}
@@ -1,18 +1,28 @@
 #!/usr/bin/env python3
 
 import os
-from github import Github
+import subprocess
+import time
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 from ruamel.yaml import YAML
+from ruamel.yaml.representer import RoundTripRepresenter
 from ruamel.yaml.scalarstring import PlainScalarString
 from ruamel.yaml.nodes import ScalarNode
-from io import StringIO
-
-yaml = YAML()
-yaml.preserve_quotes = True
-yaml.default_flow_style = False
-yaml.indent(mapping=2, sequence=4, offset=2)
-yaml.width = 4096  # Allow for long lines
+from functools import partial
+from contextlib import nullcontext
+from src.specifications.publishers import (
+    Publisher,
+    GitHubPublisher,
+    git,
+    git_blob_sha,
+    CONTENTS_CONCURRENCY,
+)
+from src.specifications.instrumentation import InstrumentedRepo
+from src.specifications.serializer import FrontmatterSerializer
+from src.specifications.discovery import get_export_rule, get_exported_collections, discover_sources
+from src.specifications.validator import validate, get_errors
+from src.specifications.diff import describe_file_changes, add_changes_to_body
 
 # Add custom representer for multi-line strings
 def str_presenter(dumper, data):
@@ -20,90 +30,231 @@ def str_presenter(dumper, data):
         return dumper.represent_scalar('tag:yaml.org,2002:str', data, style='|')
     return dumper.represent_scalar('tag:yaml.org,2002:str', data)
 
-yaml.representer.add_representer(str, str_presenter)
-
 def quoted_key_representer(dumper, data):
     return ScalarNode(tag='tag:yaml.org,2002:str', value=data, style=None)
 
-yaml.representer.add_representer(PlainScalarString, quoted_key_representer)
+class FrontmatterRepresenter(RoundTripRepresenter):
+    """
+    Round trip representer writing multi-line strings as literal blocks
+
+    Representers are registered on this subclass rather than on ruamel's
+    own, so importing this module doesn't change how other YAML instances dump.
+    """
+
+FrontmatterRepresenter.add_representer(str, str_presenter)
+FrontmatterRepresenter.add_representer(PlainScalarString, quoted_key_representer)
+
+yaml = YAML()
+yaml.Representer = FrontmatterRepresenter
+yaml.preserve_quotes = True
+yaml.default_flow_style = False
+yaml.indent(mapping=2, sequence=4, offset=2)
+yaml.width = 4096  # Allow for long lines
+
+# Loader for YAML that is only read, such as the config file. Round trip
+# loading is kept for source files, as the quoting they use is carried into
+# the rendered markdown. This is C-backed when ruamel.yaml.clib is installed.
+safe_yaml = YAML(typ='safe')
+
+# Writes the same output as yaml.dump for ordered data, much faster
+serializer = FrontmatterSerializer(yaml)
+
+def dump_frontmatter(data):
+    """Dump ordered data as markdown frontmatter"""
+    return f"---\n{serializer.dump(data).strip()}\n---\n"
 
 # GitHub repository details
 REPO_NAME = "digital-land/specification"
-BRANCH_NAME = f"mini-cms/update-specifications-{datetime.now().strftime('%Y-%m-%d--%H-%M-%S')}"
-FILE_MAPPING = {
-    "data/collections/specifications/article-4-direction.yml": "content/specification/article-4-direction.md",
-    "data/collections/specifications/brownfield-land.yml": "content/specification/brownfield-land.md",
-    "data/collections/specifications/conservation-area.yml": "content/specification/conservation-area.md",
-    "data/collections/specifications/listed-building.yml": "content/specification/listed-building.md",
-    "data/collections/specifications/tree-preservation-order.yml": "content/specification/tree-preservation-order.md"
-}
-
-def order_data(data):
-    """Order data according to schema"""
-    ordered_data = {}
-    data_order = get_data_order()
-
-    # Order top-level fields
-    for field in data_order:
-        if field in data:
-            if field == 'datasets' and isinstance(data[field], list):
-                # Handle datasets array - order each dataset according to its schema
-                ordered_datasets = []
-                for dataset in data[field]:
-                    ordered_dataset = order_dataset(dataset)
-                    ordered_datasets.append(ordered_dataset)
-                ordered_data[PlainScalarString(field)] = ordered_datasets
-            else:
-                ordered_data[PlainScalarString(field)] = data[field]
-
-    return ordered_data
+BRANCH_PREFIX = "mini-cms/"
+COLLECTION_ID = "specifications"
 
-def get_data_order():
-    """Get the order of fields from the config file"""
-    with open('config.yml', 'r') as f:
-        config = yaml.load(f)
+def get_branch_prefix(collection_ids=None):
+    """Get the start of the names of the sync branches for a set of collections, e.g. 'mini-cms/update-specifications-'"""
+    # Joined with + so the prefix for one collection doesn't also match branches for several
+    return f"{BRANCH_PREFIX}update-{'+'.join(sorted(collection_ids or [COLLECTION_ID]))}-"
+
+def get_branch_name(now=None, collection_ids=None):
+    """Get the name of a new sync branch, from the collections it syncs and the time the sync started"""
+    now = now or datetime.now()
+    return f"{get_branch_prefix(collection_ids)}{now.strftime('%Y-%m-%d--%H-%M-%S')}"
+
+class Schema:
+    """
+    Compiled field ordering for one nesting level of a collection in the config file
+
+    Each repeatable field with its own `fields` gets a child Schema, so the
+    whole collection is compiled from a single parse of the config file.
+    """
+
+    def __init__(self, fields=None, key=None, label=None):
+        fields = [field for field in fields or [] if isinstance(field, dict) and 'id' in field]
+        self.order = [field['id'] for field in fields]
+        # Field identifying each item at this level, from the field_map, and what an item is called
+        self.key = key
+        self.label = label
+        self.children = {
+            field['id']: Schema(field['fields'], (field.get('field_map') or {}).get('id'), field.get('label_single'))
+            for field in fields
+            if isinstance(field.get('fields'), list)
+        }
+
+    def get(self, path):
+        """
+        Get the schema for a nested level
+
+        Args:
+            path: List of field IDs to traverse (e.g., ['datasets'] or ['datasets', 'fields'])
+
+        Returns:
+            The Schema at that level, or an empty Schema if the path doesn't exist
+        """
+        schema = self
+        for field_id in path:
+            schema = schema.children.get(field_id)
+            if schema is None:
+                return Schema()
+        return schema
+
+def load_config(path='config.yml'):
+    """Load the config file"""
+    with open(path, 'r') as f:
+        return safe_yaml.load(f)
+
+def compile_schema(config=None, collection_id=COLLECTION_ID):
+    """
+    Compile the field ordering of a collection from the config file
+
+    Args:
+        config: Parsed config, loaded from config.yml if not given
+        collection_id: ID of the collection to compile
+
+    Returns:
+        Schema for the top level of the collection
+    """
+    if config is None:
+        config = load_config()
 
-    # Find the specifications collection
     for collection in config['collections']:
-        if collection['id'] == 'specifications':
-            # Extract field IDs from the fields section
-            return [field['id'] for field in collection['fields'] if isinstance(field, dict) and 'id' in field]
+        if collection['id'] == collection_id:
+            return Schema(collection['fields'], (collection.get('field_map') or {}).get('id'),
+                          collection.get('label_single'))
+
+    return Schema()
+
+def get_file_mapping(config=None, collection_id=COLLECTION_ID):
+    """
+    Get the source files of a collection and where each is published
+
+    Sources are discovered from the collection's export in the config file.
+
+    Args:
+        config: Parsed config, loaded from config.yml if not given
+        collection_id: ID of the collection
+
+    Returns:
+        Dict of source path to destination path
+
+    Raises:
+        ValueError: If the collection has no export configured
+    """
+    if config is None:
+        config = load_config()
+
+    rule = get_export_rule(config, collection_id)
+    if rule is None:
+        raise ValueError(f"No export is configured for the {collection_id} collection in config.yml")
 
-    return []
+    return discover_sources(rule['source'], rule['destination'])
 
-def order_dataset(dataset):
+def get_collections_mapping(config, collection_ids):
+    """Get the file mapping of several collections as one dict of source path to destination path"""
+    mapping = {}
+    for collection_id in collection_ids:
+        mapping.update(get_file_mapping(config, collection_id))
+    return mapping
+
+def get_targets(config, collection_ids=None):
+    """
+    Group exported collections by the repository they are published to
+
+    Collections without a repository in their export are published to the
+    specification repository.
+
+    Args:
+        config: Parsed config
+        collection_ids: IDs of the collections to export, every exported
+            collection if not given
+
+    Returns:
+        Dict of repository name to list of collection IDs, in config order
+    """
+    if collection_ids is None:
+        collection_ids = get_exported_collections(config)
+
+    targets = {}
+    for collection_id in collection_ids:
+        rule = get_export_rule(config, collection_id)
+        if rule is None:
+            raise ValueError(f"No export is configured for the {collection_id} collection in config.yml")
+        targets.setdefault(rule['repository'] or REPO_NAME, []).append(collection_id)
+    return targets
+
+def describe_collections(config, collection_ids):
+    """Describe collections for a pull request title, e.g. 'guidance pages, specifications'"""
+    labels = {collection['id']: collection.get('label', collection['id']) for collection in config['collections']}
+    return ", ".join(labels.get(collection_id, collection_id).lower() for collection_id in collection_ids)
+
+def order_item(item, schema):
+    """
+    Order an item's fields according to schema
+
+    The items of repeatable fields with their own fields, such as datasets
+    and their fields, are ordered by the nested schema.
+
+    Args:
+        item: Dict of field ID to value
+        schema: Schema for the item's nesting level
+
+    Returns:
+        Dict of the item's fields in schema order, without fields not in the schema
+    """
+    ordered_item = {}
+
+    for field in schema.order:
+        if field in item:
+            value = item[field]
+            child = schema.children.get(field)
+            if child is not None and isinstance(value, list):
+                value = [order_item(child_item, child) if isinstance(child_item, dict) else child_item
+                         for child_item in value]
+            ordered_item[PlainScalarString(field)] = value
+
+    return ordered_item
+
+def order_data(data, schema=None):
+    """Order data according to schema"""
+    if schema is None:
+        schema = compile_schema()
+
+    return order_item(data, schema)
+
+def get_data_order():
+    """Get the order of fields from the config file"""
+    return compile_schema().order
+
+def order_dataset(dataset, schema=None):
     """Order dataset fields according to schema"""
-    ordered_dataset = {}
-
-    # Get dataset field order from config
-    dataset_field_order = get_dataset_field_order()
-
-    for field in dataset_field_order:
-        if field in dataset:
-            if field == 'fields' and isinstance(dataset[field], list):
-                # Handle fields array - order each field according to its schema
-                ordered_fields = []
-                for field_item in dataset[field]:
-                    ordered_field = order_field(field_item)
-                    ordered_fields.append(ordered_field)
-                ordered_dataset[PlainScalarString(field)] = ordered_fields
-            else:
-                ordered_dataset[PlainScalarString(field)] = dataset[field]
-
-    return ordered_dataset
-
-def order_field(field_item):
-    """Order field properties according to schema"""
-    ordered_field = {}
+    if schema is None:
+        schema = compile_schema()
 
-    # Get field property order from config
-    field_property_order = get_field_property_order()
+    return order_item(dataset, schema.get(['datasets']))
 
-    for prop in field_property_order:
-        if prop in field_item:
-            ordered_field[PlainScalarString(prop)] = field_item[prop]
+def order_field(field_item, schema=None):
+    """Order field properties according to schema"""
+    if schema is None:
+        schema = compile_schema()
 
-    return ordered_field
+    return order_item(field_item, schema.get(['datasets', 'fields']))
 
 def get_field_order_from_config(path):
     """
@@ -115,28 +266,7 @@ def get_field_order_from_config(path):
     Returns:
         List of field IDs in the order they appear in the config
     """
-    with open('config.yml', 'r') as f:
-        config = yaml.load(f)
-
-    # Find the specifications collection
-    for collection in config['collections']:
-        if collection['id'] == 'specifications':
-            # Traverse the path to find the target field
-            current_fields = collection['fields']
-
-            for field_id in path:
-                for field in current_fields:
-                    if isinstance(field, dict) and field.get('id') == field_id:
-                        current_fields = field.get('fields', [])
-                        break
-                else:
-                    # If we can't find the field, return empty list
-                    return []
-
-            # Extract field IDs from the final level
-            return [f['id'] for f in current_fields if isinstance(f, dict) and 'id' in f]
-
-    return []
+    return compile_schema().get(path).order
 
 def get_dataset_field_order():
     """Get the order of dataset fields from the config file"""
@@ -146,96 +276,572 @@ def get_field_property_order():
     """Get the order of field properties from the config file"""
     return get_field_order_from_config(['datasets', 'fields'])
 
-def update_files_in_branch(repo, branch_name):
+def render_file(source, schema, body_field=None):
     """
-    Update files in the GitHub repository branch based on the file mapping
+    Render a source YAML file as ordered markdown frontmatter
+
+    Args:
+        source: Path of the source YAML file in this repository
+        schema: Compiled Schema of the source's collection
+        body_field: Field written as the markdown body after the frontmatter
+            instead of in it
+
+    Returns:
+        The markdown content for the destination file
     """
-    for source, destination in FILE_MAPPING.items():
-        try:
-            # Read the source file from the current repository
-            with open(source, 'r') as f:
-                source_content = f.read()
+    return render_file_timed(source, schema, body_field)[0]
+
+def render_file_timed(source, schema, body_field=None):
+    """
+    Render a source YAML file as ordered markdown frontmatter, timing each step
+
+    Args:
+        source: Path of the source YAML file in this repository
+        schema: Compiled Schema of the source's collection
+        body_field: Field written as the markdown body after the frontmatter
+            instead of in it
+
+    Returns:
+        Tuple of the markdown content and a dict of step to seconds taken
+    """
+    timings = {}
+
+    # Read the source file from the current repository
+    started = time.perf_counter()
+    with open(source, 'r') as f:
+        source_content = f.read()
+
+    # Load YAML content
+    yaml_content = yaml.load(source_content)
+    content = yaml_content["data"]
+    timings['parse'] = time.perf_counter() - started
+
+    # Get specification type and order data
+    started = time.perf_counter()
+    content = order_data(content, schema)
+    body = content.pop(body_field, None) if body_field else None
+    timings['order'] = time.perf_counter() - started
+
+    # Dump YAML with ordered data and frontmatter markers
+    started = time.perf_counter()
+    content = dump_frontmatter(content)
+    if body:
+        content += f"\n{body.strip()}\n"
+    timings['render'] = time.perf_counter() - started
+
+    return content, timings
+
+def render_files(schema=None, sources=None, workers=1, instrumentation=None, mapping=None, body_field=None):
+    """
+    Render source files in the file mapping
 
-            # Load YAML content
-            yaml_content = yaml.load(source_content)
-            content = yaml_content["data"]
+    Parsing, ordering and dumping are CPU bound, so with more than one worker
+    the files are rendered across a process pool. The output is the same
+    either way.
 
-            # Get specification type and order data
-            content = order_data(content)
+    Args:
+        schema: Compiled Schema of the specifications collection, compiled
+            from config.yml if not given
+        sources: Source paths to render, every source in the file mapping if not given
+        workers: Number of processes to render with, 1 to render serially
+            or 0 for one per CPU
+        instrumentation: Instrumentation to record each file's parse, order
+            and render time to
+        mapping: Dict of source path to destination path, discovered from
+            config.yml if not given
+        body_field: Field written as the markdown body (see render_file)
+
+    Returns:
+        Dict of destination path to markdown content, in file mapping order
+    """
+    # Parse the config once for every file in the mapping
+    if schema is None or mapping is None:
+        config = load_config()
+        if schema is None:
+            schema = compile_schema(config)
+        if mapping is None:
+            mapping = get_file_mapping(config)
+
+    jobs = [
+        (source, destination, schema, body_field)
+        for source, destination in mapping.items()
+        if sources is None or source in sources
+    ]
+    return _render_jobs(jobs, workers, instrumentation)
+
+def render_collections(config, collection_ids, sources=None, workers=1, instrumentation=None):
+    """
+    Render the source files of several collections
+
+    Every collection's files are rendered across the same process pool.
 
-            # Dump YAML with ordered data and frontmatter markers
-            buffer = StringIO()
-            yaml.dump(content, buffer)
-            content = f"---\n{buffer.getvalue().strip()}\n---\n"
+    Args:
+        config: Parsed config
+        collection_ids: IDs of the exported collections to render
+        sources: Source paths to render, every source of the collections if not given
+        workers: Number of processes to render with (see render_files)
+        instrumentation: Instrumentation to record each file's parse, order
+            and render time to
+
+    Returns:
+        Dict of destination path to markdown content, in collection and file mapping order
+    """
+    return _render_jobs(get_render_jobs(config, collection_ids, sources), workers, instrumentation)
+
+def get_render_jobs(config, collection_ids, sources=None):
+    """
+    List what rendering several collections takes
 
-            # Get the file from GitHub repository if it exists
+    Args:
+        config: Parsed config
+        collection_ids: IDs of the exported collections to render
+        sources: Source paths to render, every source of the collections if not given
+
+    Returns:
+        List of (source, destination, schema, body field) jobs, in collection and file mapping order
+    """
+    jobs = []
+    for collection_id in collection_ids:
+        schema = compile_schema(config, collection_id)
+        body_field = get_export_rule(config, collection_id).get('body')
+        jobs += [
+            (source, destination, schema, body_field)
+            for source, destination in get_file_mapping(config, collection_id).items()
+            if sources is None or source in sources
+        ]
+    return jobs
+
+def _render_jobs(jobs, workers, instrumentation):
+    """Render (source, destination, schema, body field) jobs, serially or across a process pool"""
+    executor = None
+    if workers != 1 and len(jobs) > 1:
+        executor = ProcessPoolExecutor(max_workers=workers or None)
+        futures = [executor.submit(render_file_timed, source, schema, body_field)
+                   for source, _, schema, body_field in jobs]
+
+    files = {}
+    try:
+        # Collect results in file mapping order
+        for index, (source, destination, schema, body_field) in enumerate(jobs):
             try:
-                file = repo.get_contents(destination, ref=branch_name)
-                # Update existing file
-                repo.update_file(
-                    path=destination,
-                    message=f"Update {destination}",
-                    content=content,
-                    sha=file.sha,
-                    branch=branch_name
-                )
-            except:
-                # Create new file if it doesn't exist
-                repo.create_file(
-                    path=destination,
-                    message=f"Create {destination}",
-                    content=content,
-                    branch=branch_name
-                )
-
-            print(f"Successfully updated {destination}")
+                if executor:
+                    files[destination], timings = futures[index].result()
+                else:
+                    files[destination], timings = render_file_timed(source, schema, body_field)
+            except Exception as e:
+                print(f"Error rendering {destination}: {str(e)}")
+                raise
+
+            if instrumentation:
+                for step, seconds in timings.items():
+                    instrumentation.record_stage(step, seconds, file=source)
+    finally:
+        if executor:
+            executor.shutdown(cancel_futures=True)
+
+    return files
+
+def get_source_commit():
+    """Get the commit of this repository being synced, or None outside a git checkout"""
+    try:
+        return git('rev-parse', 'HEAD')
+    except (OSError, subprocess.CalledProcessError):
+        return None
 
-        except Exception as e:
-            print(f"Error updating {destination}: {str(e)}")
-            raise
+def get_last_synced_commit(publisher, branch="main", max_commits=30, mapping=None):
+    """
+    Get the source commit of the last sync published to a branch
+
+    Looks through the most recent commits touching the published files for one
+    with the source commit trailer.
 
-def create_pull_request(token, title, body):
+    Args:
+        publisher: Publisher synced to
+        branch: Branch of the repository to look on
+        max_commits: Number of recent commits to look through
+        mapping: Dict of source path to destination path, discovered from
+            config.yml if not given
+
+    Returns:
+        The source commit SHA, or None if no sync was found
     """
-    Create a pull request on GitHub
+    if mapping is None:
+        mapping = get_file_mapping()
+
+    directories = sorted({os.path.dirname(destination) for destination in mapping.values()})
+    return publisher.get_last_synced_commit(directories, branch=branch, max_commits=max_commits)
+
+def get_changed_sources(since, mapping=None):
     """
+    Get the sources in the file mapping changed since a commit of this repository
+
+    Args:
+        since: Commit SHA to diff against
+        mapping: Dict of source path to destination path, discovered from
+            config.yml if not given
+
+    Returns:
+        Set of changed source paths, or None if every source needs rendering
+        because the commit isn't available or config.yml has changed
+    """
+    if mapping is None:
+        mapping = get_file_mapping()
+
     try:
-        # Initialize GitHub client
-        g = Github(token)
-        repo = g.get_repo(REPO_NAME)
+        git('cat-file', '-e', f"{since}^{{commit}}")
+        changed = set(git('diff', '--name-only', since, 'HEAD', '--', 'config.yml', *mapping).splitlines())
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+    if 'config.yml' in changed:
+        return None
+
+    return changed
+
+def get_changed_files(publisher, sha, files):
+    """
+    Get the files whose content differs from a published commit
+
+    The published SHAs come from a single listing of the commit's tree, and
+    are compared with the git blob SHA of each rendered file.
+
+    Args:
+        publisher: Publisher to compare against
+        sha: SHA of the commit to compare against
+        files: Dict of destination path to file content
+
+    Returns:
+        Dict of destination path to file content for files that are new or changed
+    """
+    published = publisher.get_published_shas(sha)
+
+    return {
+        destination: content
+        for destination, content in files.items()
+        if published.get(destination) != git_blob_sha(content)
+    }
 
+def describe_changes(publisher, sha, files, config, collection_ids):
+    """
+    Describe the changes to each file, dataset and field for a pull request body
+
+    The published files are read in one batch and their frontmatter compared
+    with the rendered files' using each collection's schema.
+
+    Args:
+        publisher: Publisher to compare against
+        sha: SHA of the commit to compare against
+        files: Dict of destination path to rendered content of changed files
+        config: Parsed config
+        collection_ids: IDs of the collections the files are in
+
+    Returns:
+        Markdown list of the changes
+    """
+    schemas = {}
+    for collection_id in collection_ids:
+        schema = compile_schema(config, collection_id)
+        for destination in get_file_mapping(config, collection_id).values():
+            schemas[destination] = schema
+
+    published = publisher.get_published_contents(sha, list(files))
+    return describe_file_changes(published, files, schemas)
+
+def update_files_in_branch(repo, branch_name, batch=False, files=None, source_commit=None, base=None,
+                           on_published=None):
+    """
+    Update files in the GitHub repository branch based on the file mapping
+
+    Args:
+        repo: GitHub repository or Publisher to update
+        branch_name: Name of the branch to update
+        batch: Commit every file in one Git Data API commit instead of
+            one Contents API commit per file
+        files: Dict of destination path to rendered content, rendered from
+            the file mapping if not given
+        source_commit: Commit of this repository the files were rendered
+            from, recorded as a trailer on each commit
+        base: Commit to publish on top of instead of the head of the branch,
+            which is force-updated
+        on_published: Called with the destination and content of each file
+            once it is committed to the branch
+    """
+    publisher = repo if isinstance(repo, Publisher) else GitHubPublisher(repo)
+
+    if files is None:
+        files = render_files()
+
+    publisher.publish(branch_name, files, source_commit=source_commit, batch=batch, base=base,
+                      on_published=on_published)
+
+def _stage(instrumentation, name, **labels):
+    """Time a stage if the run is instrumented"""
+    if instrumentation is None:
+        return nullcontext()
+    return instrumentation.stage(name, **labels)
+
+def sync_specifications(publisher, branch_name, title, body, batch=True, incremental=False, workers=1,
+                        instrumentation=None, reuse_pull_request=False, collections=None, config=None,
+                        check_schema=True, journal=None):
+    """
+    Publish changed specifications to a new branch and open a pull request
+
+    Only files whose rendered content differs from main are published, and
+    no branch or pull request is created if nothing has changed.
+
+    When reusing a pull request, an open one from a sync branch for the same
+    collections has its branch force-updated to a single new commit on main
+    and its title and body refreshed, instead of a new branch and pull
+    request being made. If nothing differs from main any more, because the
+    changes it held were reverted, it is closed.
+
+    With a journal, every file committed is recorded against the source
+    commit. If a run fails part way, a rerun from the same source commit
+    publishes only the files that are left to the same branch, and opens or
+    refreshes its pull request, instead of starting a new branch.
+
+    Args:
+        publisher: Publisher to sync to
+        branch_name: Name of the branch to create
+        title: Pull request title
+        body: Pull request body
+        batch: Publish all files in a single commit (see update_files_in_branch)
+        incremental: Only render sources changed since the last sync merged to main
+        workers: Number of processes to render with (see render_files)
+        instrumentation: Instrumentation to record the time of each stage to
+        reuse_pull_request: Update an open mini-cms pull request for the same collections if there is one
+        collections: IDs of the collections to publish together in one
+            commit, just the specifications if not given
+        config: Parsed config, loaded from config.yml if not given
+        check_schema: Validate the sources against config.yml before
+            publishing anything
+        journal: SyncJournal to record progress in and resume from
+
+    Returns:
+        The created or updated pull request, or None if nothing has changed
+
+    Raises:
+        ValueError: If a source doesn't match the schema in config.yml
+    """
+    if collections is None:
+        collections = [COLLECTION_ID]
+
+    with _stage(instrumentation, 'config'):
+        if config is None:
+            config = load_config()
+        mapping = get_collections_mapping(config, collections)
+
+    # Don't publish anything unless every source matches the schema
+    if check_schema:
+        with _stage(instrumentation, 'validate'):
+            violations = [
+                violation
+                for collection_id in collections
+                for violation in validate(config, list(get_file_mapping(config, collection_id)),
+                                          workers=workers, collection_id=collection_id)
+            ]
+        for violation in violations:
+            print(violation)
+        errors = get_errors(violations)
+        if errors:
+            raise ValueError(f"{len(errors)} schema violations found, not publishing")
+
+    # Only render sources changed since the last sync
+    source_commit = get_source_commit()
+    sources = None
+    if incremental:
+        with _stage(instrumentation, 'diff'):
+            last_synced_commit = get_last_synced_commit(publisher, mapping=mapping)
+            if last_synced_commit:
+                sources = get_changed_sources(last_synced_commit, mapping=mapping)
+        if sources is None:
+            print("No usable previous sync found, rendering all specifications")
+        else:
+            print(f"Rendering {len(sources)} specifications changed since {last_synced_commit}")
+
+    # Only publish files that differ from main
+    rendered = render_collections(config, collections, sources=sources, workers=workers,
+                                  instrumentation=instrumentation)
+    with _stage(instrumentation, 'compare'):
+        main_sha = publisher.get_branch_sha("main")
+        files = get_changed_files(publisher, main_sha, rendered)
+    journal_key = ",".join(sorted(collections))
+    if not files:
+        if reuse_pull_request:
+            with _stage(instrumentation, 'find_pull_request'):
+                pr = publisher.find_pull_request(get_branch_prefix(collections), base="main")
+            if pr is not None:
+                # The sources are back to what main has, so merging it would bring back reverted changes
+                with _stage(instrumentation, 'pull_request'):
+                    publisher.close_pull_request(pr)
+                print(f"Pull request closed, its changes are no longer in the sources: {pr.html_url}")
+        print("No specifications have changed, skipping pull request")
+        if journal is not None:
+            journal.finish(journal_key)
+        return None
+
+    # Summarise what changed in the pull request body
+    with _stage(instrumentation, 'describe'):
+        try:
+            body = add_changes_to_body(body, describe_changes(publisher, main_sha, files, config, collections))
+        except Exception as e:
+            print(f"Could not describe the changes, leaving them out of the pull request: {e}")
+
+    on_published = None
+    if journal is not None:
+        # Pick up where a failed run from the same source commit left off
+        resumable = journal.get_resumable(journal_key, source_commit)
+        if resumable is not None and _branch_exists(publisher, resumable['branch']):
+            pr = _resume_sync(publisher, journal, journal_key, resumable['branch'], files, title, body,
+                              batch, source_commit, instrumentation)
+            journal.finish(journal_key)
+            return pr
+
+        on_published = partial(journal.record, journal_key)
+
+    if reuse_pull_request:
+        with _stage(instrumentation, 'find_pull_request'):
+            # Only a pull request syncing the same collections, so one collection's sync doesn't reset another's
+            pr = publisher.find_pull_request(get_branch_prefix(collections), base="main")
+
+        if pr is not None:
+            branch_name = pr.head.ref
+
+            # Nothing to do if the branch already has exactly these files
+            with _stage(instrumentation, 'compare'):
+                outdated = get_changed_files(publisher, publisher.get_branch_sha(branch_name), rendered)
+            if not outdated:
+                print(f"Pull request is already up to date: {pr.html_url}")
+                if journal is not None:
+                    journal.finish(journal_key)
+                return pr
+
+            # Rebuild the branch as a single commit on main
+            with _stage(instrumentation, 'publish', files=len(files)):
+                if journal is not None:
+                    journal.start(journal_key, source_commit, branch_name)
+                update_files_in_branch(publisher, branch_name, batch=batch, files=files,
+                                       source_commit=source_commit, base=main_sha, on_published=on_published)
+
+            with _stage(instrumentation, 'pull_request'):
+                publisher.update_pull_request(pr, title, body)
+
+            print(f"Pull request updated successfully: {pr.html_url}")
+            if journal is not None:
+                journal.finish(journal_key)
+            return pr
+
+    with _stage(instrumentation, 'publish', files=len(files)):
         # Create a new branch
-        main_branch = repo.get_branch("main")
-        repo.create_git_ref(
-            ref=f"refs/heads/{BRANCH_NAME}",
-            sha=main_branch.commit.sha
-        )
+        publisher.create_branch(branch_name, main_sha)
+        if journal is not None:
+            journal.start(journal_key, source_commit, branch_name)
 
         # Update files in the branch
-        update_files_in_branch(repo, BRANCH_NAME)
+        update_files_in_branch(publisher, branch_name, batch=batch, files=files, source_commit=source_commit,
+                               on_published=on_published)
+
+    # Create pull request
+    with _stage(instrumentation, 'pull_request'):
+        pr = publisher.create_pull_request(title=title, body=body, head=branch_name, base="main")
 
-        # Create pull request
-        pr = repo.create_pull(
-            title=title,
-            body=body,
-            head=BRANCH_NAME,
-            base="main"
-        )
+    print(f"Pull request created successfully: {pr.html_url}")
+    if journal is not None:
+        journal.finish(journal_key)
+    return pr
+
+def _branch_exists(publisher, branch):
+    try:
+        publisher.get_branch_sha(branch)
+    except Exception:
+        return False
+    return True
+
+def _resume_sync(publisher, journal, key, branch_name, files, title, body, batch, source_commit, instrumentation):
+    """Publish the files a failed sync didn't get to, then open or refresh its pull request"""
+    pending = journal.get_pending(key, files)
+    print(f"Resuming the sync to {branch_name}, {len(files) - len(pending)} of {len(files)} files already published")
+
+    if pending:
+        with _stage(instrumentation, 'publish', files=len(pending)):
+            update_files_in_branch(publisher, branch_name, batch=batch, files=pending,
+                                   source_commit=source_commit, on_published=partial(journal.record, key))
+
+    # The failed run may have opened the pull request before it stopped
+    with _stage(instrumentation, 'find_pull_request'):
+        pr = publisher.find_pull_request(branch_name, base="main")
+
+    with _stage(instrumentation, 'pull_request'):
+        if pr is not None and pr.head.ref == branch_name:
+            publisher.update_pull_request(pr, title, body)
+            print(f"Pull request updated successfully: {pr.html_url}")
+        else:
+            pr = publisher.create_pull_request(title=title, body=body, head=branch_name, base="main")
+            print(f"Pull request created successfully: {pr.html_url}")
+    return pr
+
+def create_pull_request(token, title, body, batch=True, incremental=False, workers=1, instrumentation=None,
+                        reuse_pull_request=False, collections=None, config=None, repository=REPO_NAME,
+                        check_schema=True, journal=None, branch_name=None, concurrency=CONTENTS_CONCURRENCY):
+    """
+    Create a pull request on GitHub
 
-        print(f"Pull request created successfully: {pr.html_url}")
-        return pr
+    Args:
+        token: GitHub token
+        title: Pull request title
+        body: Pull request body
+        batch: Publish all files in a single commit (see update_files_in_branch)
+        incremental: Only render sources changed since the last sync merged to main
+        workers: Number of processes to render with (see render_files)
+        instrumentation: Instrumentation to record the time of each stage,
+            each GitHub call and the API requests made to
+        reuse_pull_request: Update an open mini-cms pull request for the same collections if there is one
+        collections: IDs of the collections to publish (see sync_specifications)
+        config: Parsed config, loaded from config.yml if not given
+        repository: Name of the repository to publish to
+        check_schema: Validate the sources before publishing (see sync_specifications)
+        journal: SyncJournal to record progress in and resume from (see sync_specifications)
+        branch_name: Name of the branch to create, named after the collections and the current time
+            if not given
+        concurrency: Most Contents API requests to have in flight at once
+            when not publishing in a batch
 
-    except Exception as e:
-        print(f"Error creating pull request: {str(e)}")
-        raise
+    Returns:
+        The created or updated PullRequest, or None if nothing has changed
+    """
+    # PyGithub is only loaded by the commands that talk to GitHub
+    from github import Github, Auth
+    from src.specifications.github_client import client_options
 
-if __name__ == "__main__":
-    # Get GitHub token from environment variable
-    token = os.getenv("GITHUB_TOKEN")
-    if not token:
-        raise ValueError("GITHUB_TOKEN environment variable is not set")
+    with instrumentation.instrument_github() if instrumentation else nullcontext():
+        try:
+            # Initialize GitHub client, retrying rate limits and transient failures
+            g = Github(auth=Auth.Token(token) if token else None, **client_options())
+            repo = g.get_repo(repository)
+            if instrumentation:
+                repo = InstrumentedRepo(repo, instrumentation)
+
+            return sync_specifications(
+                GitHubPublisher(repo, concurrency=concurrency),
+                branch_name or get_branch_name(collection_ids=collections),
+                title,
+                body,
+                batch=batch,
+                incremental=incremental,
+                workers=workers,
+                instrumentation=instrumentation,
+                reuse_pull_request=reuse_pull_request,
+                collections=collections,
+                config=config,
+                check_schema=check_schema,
+                journal=journal
+            )
 
-    # Create pull request
-    title = f"[Mini CMS] Update specifications {datetime.now().strftime('%Y-%m-%d--%H-%M-%S')}"
-    body = "This PR updates the specifications based on the latest changes from the Mini CMS."
+        except Exception as e:
+            print(f"Error creating pull request: {str(e)}")
+            raise
 
-    create_pull_request(token, title, body)
+if __name__ == "__main__":
+    import sys
+    from src.specifications.cli import main
+    sys.exit(main(['publish', *sys.argv[1:]]))
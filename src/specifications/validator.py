@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+
+import os
+import re
+import sys
+import glob
+from datetime import date, datetime
+from concurrent.futures import ProcessPoolExecutor
+from ruamel.yaml import YAML
+from src.specifications.discovery import COLLECTIONS_DIRECTORY
+
+# Sources are only read, so the safe loader is enough
+yaml = YAML(typ='safe')
+
+DATE_PATTERN = re.compile(r'\d{4}-\d{2}-\d{2}')
+
+class Violation:
+    """
+    A value in a source file that doesn't match the schema in config.yml
+
+    Warnings are reported without failing validation, for gaps editors can't
+    fix in the CMS.
+    """
+
+    def __init__(self, source, path, message, warning=False):
+        self.source = source
+        self.path = path
+        self.message = message
+        self.warning = warning
+
+    def __eq__(self, other):
+        return isinstance(other, Violation) and \
+            (self.source, self.path, self.message, self.warning) == \
+            (other.source, other.path, other.message, other.warning)
+
+    def __repr__(self):
+        warning = ", warning=True" if self.warning else ""
+        return f"Violation({self.source!r}, {self.path!r}, {self.message!r}{warning})"
+
+    def __str__(self):
+        return f"{self.source}: {self.path or '(file)'}: {self.message}{' (warning)' if self.warning else ''}"
+
+class FieldRule:
+    """Compiled checks for one field in the config file"""
+
+    def __init__(self, field):
+        self.id = field['id']
+        self.type = field.get('type')
+        self.required = bool(field.get('required'))
+        # Fields that aren't editable come from the specification data, the CMS can't fill them in
+        self.editable = field.get('editable', True) is not False
+        self.options = {option['value'] for option in field.get('options') or [] if isinstance(option, dict)}
+        self.checker = Checker(field['fields']) if isinstance(field.get('fields'), list) else None
+
+    def check(self, value, source, path):
+        """Yield a Violation for each way the value doesn't match the field"""
+        if _is_empty(value):
+            if self.required:
+                yield self.missing(source, path)
+            return
+
+        if self.type in ('string', 'text', 'govspeak'):
+            # Unquoted IDs such as GitHub discussion numbers are read as numbers
+            if not isinstance(value, (str, int, float)) or isinstance(value, bool):
+                yield Violation(source, path, f"should be {self.type}, not {_describe(value)}")
+        elif self.type == 'date':
+            if not _is_date(value):
+                yield Violation(source, path, f"should be a date written as YYYY-MM-DD, not {value!r}")
+        elif self.type == 'datetime':
+            if not _is_datetime(value):
+                yield Violation(source, path, f"should be a date and time written as YYYY-MM-DD HH:MM:SS, not {value!r}")
+        elif self.type == 'select':
+            if value not in self.options:
+                yield Violation(source, path, f"should be one of {', '.join(sorted(map(str, self.options)))}, not {value!r}")
+        elif self.type == 'repeatable':
+            if not isinstance(value, list):
+                yield Violation(source, path, f"should be a list, not {_describe(value)}")
+            elif self.checker is not None:
+                for index, item in enumerate(value):
+                    yield from self.checker.check(item, source, f"{path}[{index}]")
+
+    def missing(self, source, path):
+        """Get the Violation for the field being required but missing, a warning if it isn't editable"""
+        return Violation(source, path, "is required", warning=not self.editable)
+
+class Checker:
+    """
+    Compiled schema of one nesting level of a collection in the config file
+
+    Checks required fields are present, values have the field's type and
+    there are no fields the config doesn't declare, recursing into the
+    items of repeatable fields. Required fields that aren't editable are
+    only warned about when missing.
+    """
+
+    def __init__(self, fields):
+        self.rules = {
+            field['id']: FieldRule(field)
+            for field in fields or []
+            if isinstance(field, dict) and 'id' in field
+        }
+
+    def check(self, item, source, path=''):
+        """Yield a Violation for each way the item doesn't match the schema"""
+        if not isinstance(item, dict):
+            yield Violation(source, path, f"should be a mapping, not {_describe(item)}")
+            return
+
+        for field_id, rule in self.rules.items():
+            field_path = f"{path}.{field_id}" if path else field_id
+            if field_id in item:
+                yield from rule.check(item[field_id], source, field_path)
+            elif rule.required:
+                yield rule.missing(source, field_path)
+
+        for key in item:
+            if key not in self.rules:
+                yield Violation(source, f"{path}.{key}" if path else str(key), "is not a field in config.yml")
+
+def compile_validator(config):
+    """
+    Compile the schema of every collection in the config file
+
+    Args:
+        config: Parsed config
+
+    Returns:
+        Dict of collection ID to Checker
+    """
+    return {collection['id']: Checker(collection.get('fields')) for collection in config['collections']}
+
+def get_collection_id(source):
+    """Get the ID of the collection a source file is in, from its directory under data/collections"""
+    relative = os.path.relpath(source, COLLECTIONS_DIRECTORY)
+    if relative.startswith(os.pardir):
+        return None
+    parts = relative.split(os.sep)
+    return parts[0] if len(parts) > 1 else None
+
+def validate_file(source, checker):
+    """
+    Validate a source file against its collection's schema
+
+    Args:
+        source: Path of the source YAML file
+        checker: Checker of the source's collection
+
+    Returns:
+        List of Violations
+    """
+    try:
+        with open(source, 'r') as f:
+            content = yaml.load(f)
+    except Exception as e:
+        return [Violation(source, '', f"could not be read: {e}")]
+
+    if not isinstance(content, dict) or 'data' not in content:
+        return [Violation(source, '', "has no data")]
+
+    return list(checker.check(content['data'], source))
+
+def find_sources(directory=COLLECTIONS_DIRECTORY):
+    """Find every source YAML file under the collections directory"""
+    return sorted(
+        glob.glob(os.path.join(directory, '**', '*.yml'), recursive=True)
+        + glob.glob(os.path.join(directory, '**', '*.yaml'), recursive=True)
+    )
+
+def validate(config, sources=None, workers=1, collection_id=None):
+    """
+    Validate source files against the schema in the config file
+
+    The schema is compiled once, and with more than one worker the files are
+    validated across a process pool.
+
+    Args:
+        config: Parsed config
+        sources: Paths of the source files to validate, everything under
+            data/collections if not given
+        workers: Number of processes to validate with, 1 to validate
+            serially or 0 for one per CPU
+        collection_id: ID of the collection every source is in, found from
+            each source's directory under data/collections if not given
+
+    Returns:
+        List of Violations, including warnings, in source order
+    """
+    validator = compile_validator(config)
+    if sources is None:
+        sources = find_sources()
+
+    violations = []
+    jobs = []
+    for source in sources:
+        source_collection_id = collection_id or get_collection_id(source)
+        if source_collection_id not in validator:
+            violations.append(Violation(source, '', "is not in a collection in config.yml"))
+        else:
+            jobs.append((source, validator[source_collection_id]))
+
+    if workers != 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=workers or None) as executor:
+            results = list(executor.map(validate_file, *zip(*jobs)))
+    else:
+        results = [validate_file(source, checker) for source, checker in jobs]
+
+    for result in results:
+        violations.extend(result)
+    return violations
+
+def get_errors(violations):
+    """Get the violations that should fail validation, leaving out warnings"""
+    return [violation for violation in violations if not violation.warning]
+
+def _is_empty(value):
+    return value is None or value == '' or value == []
+
+def _is_date(value):
+    if isinstance(value, date) and not isinstance(value, datetime):
+        return True
+    if not isinstance(value, str) or not DATE_PATTERN.fullmatch(value):
+        return False
+    try:
+        date.fromisoformat(value)
+    except ValueError:
+        return False
+    return True
+
+def _is_datetime(value):
+    if isinstance(value, datetime):
+        return True
+    if not isinstance(value, str) or not DATE_PATTERN.match(value):
+        return False
+    try:
+        datetime.fromisoformat(value)
+    except ValueError:
+        return False
+    return True
+
+def _describe(value):
+    return type(value).__name__
+
+def main(argv=None):
+    # Parsed by the CLI, which defines the arguments of every command
+    from src.specifications.cli import main as cli_main
+    return cli_main(['validate', *(sys.argv[1:] if argv is None else argv)])
+
+if __name__ == "__main__":
+    sys.exit(main())
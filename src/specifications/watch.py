@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+
+"""
+Re-render collections into a local directory as their sources change
+
+    python -m src.specifications watch --output-dir /tmp/specification
+
+The schema compiled from config.yml and the mapping of sources to
+destinations are kept between changes, so a save only costs rendering the
+file that changed. Files are polled, which needs nothing beyond the standard
+library and works the same on every platform.
+"""
+
+import os
+import time
+from src.specifications.update_specifications import load_config, compile_schema, get_file_mapping, render_file
+from src.specifications.discovery import get_exported_collections, get_export_rule
+
+class Watcher:
+    """
+    Keeps rendered collections in a directory up to date with their sources
+
+    Each check stats config.yml and the sources of the watched collections,
+    so only new or changed sources are rendered again, and rendered files
+    are only written when their content changes. A change to config.yml
+    compiles the schemas again and renders everything.
+    """
+
+    def __init__(self, output_dir, collection_ids=None, config_path='config.yml'):
+        self.output_dir = output_dir
+        self.collection_ids = collection_ids
+        self.config_path = config_path
+        self.config_stat = None
+        # Collection ID to its config, compiled schema and body field
+        self.collections = {}
+        # Source path to its collection's schema, destination and body field
+        self.jobs = {}
+        # Source path to its (mtime, size) when last checked
+        self.stats = {}
+        # Destination path to its last rendered content
+        self.rendered = {}
+
+    def compile(self):
+        """
+        Load config.yml and compile the schema of each watched collection
+
+        Raises:
+            ValueError: If a watched collection has no export configured
+        """
+        # Recorded first, so a config that fails to load isn't retried until it's saved again
+        self.config_stat = _stat(self.config_path)
+        config = load_config(self.config_path)
+        collections = {}
+        for collection_id in self.collection_ids or get_exported_collections(config):
+            rule = get_export_rule(config, collection_id)
+            if rule is None:
+                raise ValueError(f"No export is configured for the {collection_id} collection in config.yml")
+            collections[collection_id] = (config, compile_schema(config, collection_id), rule['body'])
+        self.collections = collections
+
+    def discover(self):
+        """Get source path to (schema, destination, body field) of every watched source"""
+        jobs = {}
+        for collection_id, (config, schema, body_field) in self.collections.items():
+            for source, destination in get_file_mapping(config, collection_id).items():
+                jobs[source] = (schema, destination, body_field)
+        return jobs
+
+    def check(self):
+        """
+        Find what changed since the last check
+
+        Returns:
+            Dict with whether `config` changed, the set of `changed` source
+            paths and the set of destination paths whose source was
+            `removed`, or None if nothing changed
+        """
+        config_stat = _stat(self.config_path)
+        if config_stat != self.config_stat:
+            # Recorded here too, so the checks waiting for a quiet period after a save see it settle
+            self.config_stat = config_stat
+            return {'config': True, 'changed': set(), 'removed': set()}
+
+        jobs = self.discover()
+        stats = {source: _stat(source) for source in jobs}
+        changed = {source for source, stat in stats.items() if stat is not None and self.stats.get(source) != stat}
+        removed = {
+            destination for source, (_, destination, _) in self.jobs.items()
+            if source not in jobs or stats[source] is None
+        }
+
+        self.jobs = jobs
+        self.stats = stats
+        if not changed and not removed:
+            return None
+        return {'config': False, 'changed': changed, 'removed': removed}
+
+    def update(self, changes):
+        """
+        Render changed sources, and delete the output of removed ones
+
+        Returns:
+            List of the destination paths written or deleted
+        """
+        if changes['config']:
+            # The ordering, field map and even the sources may all have changed
+            try:
+                self.compile()
+            except Exception as e:
+                if not self.rendered:
+                    raise
+                print(f"Error loading {self.config_path}, still using the previous config: {str(e)}")
+                return []
+            previous = {destination for _, destination, _ in self.jobs.values()}
+            self.jobs = {}
+            self.stats = {}
+            changes = self.check() or {'changed': set(), 'removed': set()}
+            current = {destination for _, destination, _ in self.jobs.values()}
+            changes['removed'] = previous - current
+
+        updated = []
+        for destination in sorted(changes['removed']):
+            if self.rendered.pop(destination, None) is not None:
+                path = os.path.join(self.output_dir, destination)
+                if os.path.exists(path):
+                    os.remove(path)
+                updated.append(destination)
+
+        for source in sorted(changes['changed']):
+            if source not in self.jobs:
+                # Saved and then removed within one burst
+                continue
+            schema, destination, body_field = self.jobs[source]
+            try:
+                content = render_file(source, schema, body_field)
+            except Exception as e:
+                # Keep watching, a half saved file is usually fixed by the next save
+                print(f"Error rendering {source}: {str(e)}")
+                continue
+
+            if self.rendered.get(destination) != content:
+                path = os.path.join(self.output_dir, destination)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with open(path, 'w', newline='') as f:
+                    f.write(content)
+                self.rendered[destination] = content
+                updated.append(destination)
+
+        return updated
+
+    def start(self):
+        """Compile the config and render every watched source"""
+        return self.update({'config': True, 'changed': set(), 'removed': set()})
+
+    def run(self, interval=0.2, debounce=0.05, max_checks=None, sleep=time.sleep):
+        """
+        Render everything, then keep re-rendering changes until interrupted
+
+        Bursts of saves, such as an editor writing several files, are
+        rendered together once no more changes are seen for the debounce time.
+
+        Args:
+            interval: Seconds between checks for changes
+            debounce: Seconds without further changes to wait before rendering
+            max_checks: Stop after this many checks, to run for a while in tests
+            sleep: Function to wait with
+        """
+        started = time.perf_counter()
+        updated = self.start()
+        print(f"Rendered {len(updated)} files in {(time.perf_counter() - started) * 1000:.0f} ms, watching for changes")
+
+        checks = 0
+        try:
+            while max_checks is None or checks < max_checks:
+                sleep(interval)
+                checks += 1
+                changes = self.check()
+                if changes is None:
+                    continue
+
+                # Wait for a quiet period, merging in any further changes
+                while True:
+                    sleep(debounce)
+                    more = self.check()
+                    if more is None:
+                        break
+                    changes = _merge(changes, more)
+
+                started = time.perf_counter()
+                updated = self.update(changes)
+                elapsed = (time.perf_counter() - started) * 1000
+                for destination in updated:
+                    print(f"Updated {destination}")
+                print(f"Rendered {len(updated)} files in {elapsed:.0f} ms")
+        except KeyboardInterrupt:
+            pass
+
+def _merge(changes, more):
+    return {
+        'config': changes['config'] or more['config'],
+        'changed': changes['changed'] | more['changed'],
+        'removed': changes['removed'] | more['removed'],
+    }
+
+def _stat(path):
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
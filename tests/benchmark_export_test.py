@@ -0,0 +1,39 @@
+import json
+from benchmarks.synthetic import generate_specification, write_collection
+from benchmarks.export import main, STAGES
+from src.specifications.update_specifications import yaml
+
+def test_generate_specification_size():
+    """Test that the synthetic specification has the requested shape"""
+    specification = generate_specification(3, datasets=2, fields=7, guidance_length=200)
+
+    assert specification['data']['specification'] == 'synthetic-3'
+    assert len(specification['data']['datasets']) == 2
+    assert len(specification['data']['datasets'][0]['fields']) == 7
+    assert len(specification['data']['datasets'][0]['fields'][0]['guidance']) >= 200
+
+def test_generate_specification_deterministic():
+    """Test that the same arguments give the same specification"""
+    assert generate_specification(1) == generate_specification(1)
+    assert generate_specification(1, seed=1) != generate_specification(1, seed=2)
+
+def test_write_collection(tmp_path):
+    """Test that the written collection can be loaded back"""
+    mapping = write_collection(str(tmp_path), specifications=2, fields=3)
+
+    assert list(mapping.values()) == ['content/specification/synthetic-0.md', 'content/specification/synthetic-1.md']
+    with open(list(mapping.keys())[1]) as f:
+        assert yaml.load(f)['data']['specification'] == 'synthetic-1'
+
+def test_benchmark_writes_results(tmp_path):
+    """Test a small benchmark run writes machine-readable results for every stage"""
+    output = tmp_path / 'results.json'
+
+    main(['--specifications', '2', '--fields', '3', '--repeat', '1', '--output', str(output)])
+
+    results = json.loads(output.read_text())
+    assert results['files'] == 2
+    assert list(results['stages'].keys()) == STAGES
+    for stage in results['stages'].values():
+        assert stage['seconds'] > 0
+        assert stage['peak_memory_bytes'] > 0
@@ -0,0 +1,10 @@
+from benchmarks.model import benchmark, format_results
+
+def test_benchmark_model_memory():
+    """Test the model holds a collection in a fraction of the memory of round trip documents"""
+    results = benchmark(specifications=3, datasets=1, fields=5, guidance_length=100)
+
+    loaders = results['loaders']
+    assert list(loaders) == ['documents', 'ordered', 'model']
+    assert loaders['model']['held_bytes'] * 2 < loaders['documents']['held_bytes']
+    assert 'held vs model' in format_results(results)
@@ -0,0 +1,11 @@
+from benchmarks.serializer import main
+
+def test_benchmark_compares_serializer_with_ruamel():
+    """Test the benchmark checks the output matches and reports a time for each"""
+    results = main(['--specifications', '2', '--fields', '3', '--repeat', '1'])
+
+    assert set(results) == {'specifications', 'synthetic'}
+    for result in results.values():
+        assert result['ruamel_seconds'] > 0
+        assert result['serializer_seconds'] > 0
+        assert result['speedup'] > 1
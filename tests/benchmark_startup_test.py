@@ -0,0 +1,17 @@
+from benchmarks.startup import benchmark, format_results, COMMANDS
+
+def test_offline_commands_do_not_load_network_modules():
+    """Test the benchmark times each command and none of the offline ones load PyGithub"""
+    results = benchmark(repeat=1)
+
+    assert set(results) == set(COMMANDS)
+    for name, result in results.items():
+        assert result['seconds'] > 0
+        assert result['network_modules'] == [], name
+
+def test_format_results_compares():
+    """Test the change from previous results is shown"""
+    results = {'help': {'seconds': 0.05, 'network_modules': []}}
+    previous = {'help': {'seconds': 0.1, 'network_modules': ['github']}}
+
+    assert format_results(results, previous).splitlines()[1].endswith('0.50x')
@@ -0,0 +1,27 @@
+from benchmarks.streaming import benchmark, format_results
+from benchmarks.synthetic import write_large_specification
+
+def test_write_large_specification(tmp_path):
+    """Test a large specification is written up to its size, and loads"""
+    from src.specifications.update_specifications import yaml
+
+    path = tmp_path / 'large.yml'
+    fields = write_large_specification(str(path), 0.05, guidance_length=100)
+
+    assert path.stat().st_size >= 0.05e6
+    with open(path, 'r') as f:
+        datasets = yaml.load(f)['data']['datasets']
+    assert len(datasets) == 1
+    assert len(datasets[0]['fields']) == fields
+
+def test_benchmark_streaming_memory():
+    """Test streaming a larger specification takes little more memory, where rendering it whole takes more"""
+    results = benchmark(megabytes=(0.1, 1), whole_up_to=1)
+
+    small, large = results['sizes']
+    assert small['same_output'] and large['same_output']
+    assert large['stream']['max_rss_bytes'] < large['whole']['max_rss_bytes']
+    stream_growth = large['stream']['max_rss_bytes'] - small['stream']['max_rss_bytes']
+    whole_growth = large['whole']['max_rss_bytes'] - small['whole']['max_rss_bytes']
+    assert stream_growth < whole_growth / 2
+    assert 'stream MB' in format_results(results)
@@ -0,0 +1,160 @@
+import os
+import pytest
+from unittest.mock import patch
+from src.specifications.bundle import build_bundle, CollectionBundle, get_index_tree, get_references
+from src.specifications.update_specifications import load_config
+from src.specifications.validator import yaml
+
+CONFIG = {
+    'collections': [
+        {
+            'id': 'specifications',
+            'field_map': {'id': 'specification'},
+            'fields': [
+                {'id': 'specification'},
+                {'id': 'datasets', 'field_map': {'id': 'dataset'}, 'fields': [
+                    {'id': 'dataset'},
+                    {'id': 'fields', 'field_map': {'id': 'field'}, 'fields': [{'id': 'field'}]},
+                ]},
+            ],
+        },
+        {'id': 'pages', 'field_map': {'id': 'id'}, 'fields': [{'id': 'id'}, {'id': 'body'}]},
+    ]
+}
+
+@pytest.fixture
+def collections(tmp_path):
+    """A collections directory with two specifications and a page"""
+    directory = tmp_path / 'collections'
+    (directory / 'specifications').mkdir(parents=True)
+    (directory / 'pages').mkdir()
+    (directory / 'specifications' / 'tree.yml').write_text(
+        'data:\n'
+        '  specification: tree\n'
+        '  datasets:\n'
+        '    - dataset: tree\n'
+        '      fields:\n'
+        '        - field: reference\n'
+        '        - field: point\n'
+        '    - dataset: tree-preservation-zone\n'
+        '      fields:\n'
+        '        - field: reference\n'
+    )
+    (directory / 'specifications' / 'listed.yml').write_text(
+        'id: listed\n'
+        'data:\n'
+        '  specification: listed-building\n'
+        '  datasets:\n'
+        '    - dataset: listed-building-outline\n'
+        '      fields:\n'
+        '        - field: reference\n'
+    )
+    (directory / 'pages' / 'get-help.yml').write_text('data:\n  body: Email us\n')
+    return directory
+
+def test_get_references():
+    """Test nested items are found with the path of indexes leading to them"""
+    data = {'datasets': [{'dataset': 'a', 'fields': [{'field': 'x'}, {'field': 'y'}]}, {'fields': [{'field': 'x'}]}]}
+
+    assert get_references(data, get_index_tree(CONFIG['collections'][0]['fields'])) == {
+        'datasets': [['a', [0]]],
+        'datasets.fields': [['x', [0, 0]], ['y', [0, 1]], ['x', [1, 0]]],
+    }
+
+def test_build_and_read(collections, tmp_path):
+    """Test documents are read by key and nested items found without reading other documents"""
+    path = str(tmp_path / 'collections.bundle')
+
+    assert build_bundle(CONFIG, path, str(collections)) == {'parsed': 3, 'reused': 0}
+
+    with CollectionBundle(path) as bundle:
+        assert sorted(bundle.collections()) == ['pages', 'specifications']
+        assert sorted(bundle.keys('specifications')) == ['listed-building', 'tree']
+        # Documents without their key are keyed on the file name
+        assert bundle.keys('pages') == ['get-help']
+        assert bundle.get('specifications', 'listed-building') == {
+            'id': 'listed',
+            'data': {
+                'specification': 'listed-building',
+                'datasets': [{'dataset': 'listed-building-outline', 'fields': [{'field': 'reference'}]}],
+            },
+        }
+        assert bundle.get('specifications', 'missing') is None
+        assert bundle.get('missing', 'tree') is None
+
+        with patch('src.specifications.bundle.json.loads', wraps=__import__('json').loads) as loads:
+            assert bundle.find('specifications', 'datasets', 'tree-preservation-zone') == [
+                ('tree', {'dataset': 'tree-preservation-zone', 'fields': [{'field': 'reference'}]})
+            ]
+        assert loads.call_count == 1
+
+        assert sorted(bundle.find('specifications', 'datasets.fields', 'reference')) == [
+            ('listed-building', {'field': 'reference'}),
+            ('tree', {'field': 'reference'}),
+            ('tree', {'field': 'reference'}),
+        ]
+        assert bundle.find('specifications', 'datasets', 'missing') == []
+
+def test_build_incremental(collections, tmp_path):
+    """Test only new and changed sources are parsed again"""
+    path = str(tmp_path / 'collections.bundle')
+    build_bundle(CONFIG, path, str(collections))
+
+    changed = collections / 'specifications' / 'tree.yml'
+    changed.write_text(changed.read_text().replace('field: point', 'field: geometry'))
+    (collections / 'pages' / 'index.yml').write_text('data:\n  id: index\n')
+
+    with patch.object(yaml, 'load', wraps=yaml.load) as load:
+        assert build_bundle(CONFIG, path, str(collections)) == {'parsed': 2, 'reused': 2}
+    assert load.call_count == 2
+
+    with CollectionBundle(path) as bundle:
+        assert [key for key, _ in bundle.find('specifications', 'datasets.fields', 'geometry')] == ['tree']
+        assert bundle.find('specifications', 'datasets.fields', 'point') == []
+        assert bundle.get('specifications', 'listed-building')['id'] == 'listed'
+        assert sorted(bundle.keys('pages')) == ['get-help', 'index']
+
+    # Removed sources are dropped
+    os.remove(changed)
+    assert build_bundle(CONFIG, path, str(collections)) == {'parsed': 0, 'reused': 3}
+
+def test_build_config_changed(collections, tmp_path):
+    """Test everything is parsed again when the config changes"""
+    path = str(tmp_path / 'collections.bundle')
+    build_bundle(CONFIG, path, str(collections))
+
+    config = {'collections': CONFIG['collections'][:1]}
+
+    assert build_bundle(config, path, str(collections)) == {'parsed': 2, 'reused': 0}
+
+def test_build_duplicate_key(collections, tmp_path):
+    """Test two documents with the same key in a collection are rejected"""
+    (collections / 'specifications' / 'copy.yml').write_text('data:\n  specification: tree\n')
+
+    with pytest.raises(ValueError, match="both have the key 'tree'"):
+        build_bundle(CONFIG, str(tmp_path / 'collections.bundle'), str(collections))
+
+def test_not_a_bundle(tmp_path):
+    """Test files that aren't bundles are rejected, and replaced by a build"""
+    path = tmp_path / 'collections.bundle'
+    path.write_bytes(b'')
+    with pytest.raises(ValueError):
+        CollectionBundle(str(path))
+
+    path.write_text('data:\n')
+    with pytest.raises(ValueError):
+        CollectionBundle(str(path))
+
+    assert build_bundle(CONFIG, str(path), str(tmp_path)) == {'parsed': 0, 'reused': 0}
+
+def test_bundle_collections(tmp_path):
+    """Test bundling this repository's collections"""
+    path = str(tmp_path / 'collections.bundle')
+    build_bundle(load_config(), path)
+
+    with CollectionBundle(path) as bundle:
+        assert bundle.get('specifications', 'listed-building')['data']['name'] == 'Listed building outline'
+        assert 'get-help' in bundle.keys('guidance_pages')
+        assert ('listed-building', 'geometry') in [
+            (key, item['field']) for key, item in bundle.find('specifications', 'datasets.fields', 'geometry')
+        ]
@@ -0,0 +1,100 @@
+import os
+import sys
+import subprocess
+import pytest
+from unittest.mock import patch
+from src.specifications.cli import main, get_parser
+from src.specifications.publishers import GitPublisher, git, CONTENTS_CONCURRENCY
+
+def test_render(tmp_path, capsys):
+    """Test rendering a collection into a directory"""
+    assert main(['render', '--output-dir', str(tmp_path)]) == 0
+
+    assert (tmp_path / 'content/specification/listed-building.md').read_text().startswith('---\nspecification: ')
+    assert capsys.readouterr().out.splitlines()[-1] == 'Rendered 5 files'
+
+def test_render_stream(tmp_path, capsys):
+    """Test streaming every collection into a directory renders the same files"""
+    assert main(['render', '--all-collections', '--output-dir', str(tmp_path / 'whole')]) == 0
+    assert main(['render', '--all-collections', '--stream', '--output-dir', str(tmp_path / 'streamed')]) == 0
+
+    whole = sorted(path.relative_to(tmp_path / 'whole') for path in (tmp_path / 'whole').rglob('*.md'))
+    assert sorted(path.relative_to(tmp_path / 'streamed') for path in (tmp_path / 'streamed').rglob('*.md')) == whole
+    for path in whole:
+        assert (tmp_path / 'streamed' / path).read_text() == (tmp_path / 'whole' / path).read_text()
+    assert capsys.readouterr().out.splitlines()[-1] == f"Rendered {len(whole)} files"
+
+    with pytest.raises(SystemExit):
+        main(['render', '--stream'])
+
+def test_validate(tmp_path, capsys):
+    """Test the validate command reports violations with its exit code"""
+    assert main(['validate', 'data/collections/specifications/listed-building.yml']) == 0
+
+    config = tmp_path / 'config.yml'
+    config.write_text('collections:\n  - id: specifications\n    fields:\n      - id: specification\n')
+    assert main(['validate', '--config', str(config), 'data/collections/specifications/listed-building.yml']) == 1
+    assert 'violations found' in capsys.readouterr().out
+
+def test_diff_and_publish_git_dir(tmp_path, capsys):
+    """Test diffing against and publishing to a local git repository"""
+    work = tmp_path / 'work'
+    bare = tmp_path / 'specification.git'
+    git('init', '-q', '-b', 'main', str(work))
+    (work / 'README.md').write_text('# Specification\n')
+    git('add', 'README.md', cwd=work)
+    git('-c', 'user.name=Test', '-c', 'user.email=test@example.com', 'commit', '-q', '-m', 'Initial commit', cwd=work)
+    git('clone', '-q', '--bare', str(work), str(bare))
+
+    assert main(['diff', '--git-dir', str(bare)]) == 0
+    assert '- **`content/specification/listed-building.md`**: new specification' in capsys.readouterr().out
+
+    assert main(['publish', '--git-dir', str(bare), '--skip-validation']) == 0
+    [pr] = GitPublisher(str(bare)).get_pull_requests()
+    assert pr.head.ref.startswith('mini-cms/update-specifications-')
+    assert pr.title.startswith('[Mini CMS] Update specifications ')
+
+def test_publish_arguments():
+    """Test the publish command takes the arguments of the old update_specifications entry point"""
+    args = get_parser().parse_args(['publish', '--incremental', '--reuse-pr', '--workers', '0',
+                                    '--collection', 'specifications', '--journal', 'journal.json'])
+
+    assert (args.incremental, args.reuse_pr, args.workers, args.collections, args.journal) == \
+        (True, True, 0, ['specifications'], 'journal.json')
+
+    args = get_parser().parse_args(['publish', '--contents-api', '--concurrency', '4'])
+    assert (args.contents_api, args.concurrency) == (True, 4)
+    assert get_parser().parse_args(['publish']).concurrency == CONTENTS_CONCURRENCY
+
+def test_import_has_no_side_effects():
+    """Test importing the command line and the exporter doesn't load PyGithub or change ruamel"""
+    script = (
+        "import sys\n"
+        "from ruamel.yaml import YAML\n"
+        "import src.specifications.cli, src.specifications.update_specifications\n"
+        "YAML().dump({'a': 'x\\ny'}, sys.stdout)\n"
+        "print(sorted({'github', 'requests'} & set(sys.modules)))\n"
+    )
+    result = subprocess.run([sys.executable, '-c', script], capture_output=True, text=True, check=True,
+                            cwd=os.getcwd())
+
+    assert result.stdout == 'a: "x\\ny"\n[]\n'
+
+def test_bundle(tmp_path, capsys):
+    """Test building and then updating the collection bundle"""
+    output = str(tmp_path / 'collections.bundle')
+
+    assert main(['bundle', '--output', output]) == 0
+    assert main(['bundle', '--output', output]) == 0
+
+    assert capsys.readouterr().out.splitlines()[-1].endswith('0 parsed and 17 unchanged')
+
+def test_watch(tmp_path, capsys):
+    """Test watching renders the collections, here stopping after one check"""
+    with patch('src.specifications.watch.Watcher.run', autospec=True,
+               side_effect=lambda watcher, **kwargs: watcher.start()) as mock_run:
+        assert main(['watch', '--output-dir', str(tmp_path), '--interval', '1']) == 0
+
+    assert mock_run.call_args.kwargs == {'interval': 1.0, 'debounce': 0.05}
+    assert (tmp_path / 'content/specification/listed-building.md').exists()
+    assert not (tmp_path / 'content/guidance').exists()
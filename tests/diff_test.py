@@ -0,0 +1,166 @@
+from src.specifications.diff import (
+    split_frontmatter,
+    parse_frontmatter,
+    diff_items,
+    format_item_diff,
+    describe_file_changes,
+    add_changes_to_body,
+)
+from src.specifications.update_specifications import Schema, compile_schema, load_config
+
+SCHEMA = Schema([
+    {'id': 'specification'},
+    {'id': 'name'},
+    {'id': 'datasets', 'label_single': 'Dataset', 'field_map': {'id': 'dataset'}, 'fields': [
+        {'id': 'dataset'},
+        {'id': 'description'},
+        {'id': 'fields', 'label_single': 'Field', 'field_map': {'id': 'field'}, 'fields': [
+            {'id': 'field'},
+            {'id': 'description'},
+            {'id': 'guidance'},
+        ]},
+    ]},
+], 'specification', 'Specification')
+
+OLD = {
+    'specification': 'tree',
+    'name': 'Tree',
+    'datasets': [
+        {'dataset': 'tree', 'description': 'A tree', 'fields': [
+            {'field': 'reference', 'description': 'The reference'},
+            {'field': 'point', 'description': 'The location', 'guidance': 'A point'},
+            {'field': 'height'},
+        ]},
+        {'dataset': 'tree-preservation-zone', 'fields': [{'field': 'reference'}]},
+    ],
+}
+
+def new_version():
+    return {
+        'specification': 'tree',
+        'name': 'Trees',
+        'datasets': [
+            {'dataset': 'tree-preservation-order', 'fields': [{'field': 'reference'}]},
+            {'dataset': 'tree', 'description': 'A tree', 'fields': [
+                {'field': 'point', 'description': 'The location', 'guidance': 'A point in WGS84'},
+                {'field': 'reference', 'description': 'The reference'},
+                {'field': 'geometry'},
+            ]},
+        ],
+    }
+
+def test_split_frontmatter():
+    """Test splitting the frontmatter from the markdown body"""
+    assert split_frontmatter('---\nname: Tree\n---\n\n# Body\n') == ('name: Tree\n', '\n# Body\n')
+    assert split_frontmatter('---\nname: Tree\n') == ('name: Tree\n', '')
+    assert split_frontmatter('# Body\n') == ('', '# Body\n')
+
+def test_parse_frontmatter():
+    """Test reading the frontmatter and ignoring the markdown body"""
+    assert parse_frontmatter('---\nname: Tree\n---\n\n# Body\n\n---\n') == {'name': 'Tree'}
+    assert parse_frontmatter('---\nname: Tree\n') == {'name': 'Tree'}
+    assert parse_frontmatter('# No frontmatter\n') == {}
+    assert parse_frontmatter('') == {}
+
+def test_diff_items_unchanged():
+    """Test that equal items, in any list order, have no diff"""
+    new = dict(OLD, datasets=list(reversed(OLD['datasets'])))
+
+    assert diff_items(OLD, new, SCHEMA) is None
+
+def test_diff_items():
+    """Test that list items are matched on their key, not their position"""
+    diff = diff_items(OLD, new_version(), SCHEMA)
+
+    assert diff == {
+        'changed': ['name'],
+        'children': {
+            'datasets': {
+                'added': ['tree-preservation-order'],
+                'removed': ['tree-preservation-zone'],
+                'changed': {
+                    'tree': {
+                        'changed': [],
+                        'children': {
+                            'fields': {
+                                'added': ['geometry'],
+                                'removed': ['height'],
+                                'changed': {'point': {'changed': ['guidance'], 'children': {}}},
+                            },
+                        },
+                    },
+                },
+            },
+        },
+    }
+
+def test_diff_items_unknown_and_unkeyed():
+    """Test fields outside the schema and list items without a unique key"""
+    old = {'extra': 1, 'datasets': [{'description': 'a'}, {'dataset': 'x'}, {'dataset': 'x'}]}
+    new = {'datasets': [{'description': 'b'}, {'dataset': 'x'}, {'dataset': 'x', 'description': 'c'}]}
+
+    diff = diff_items(old, new, SCHEMA)
+
+    assert diff['changed'] == ['extra']
+    assert diff['children']['datasets'] == {
+        'added': [],
+        'removed': [],
+        'changed': {
+            '#1': {'changed': ['description'], 'children': {}},
+            '#3': {'changed': ['description'], 'children': {}},
+        },
+    }
+
+def test_format_item_diff():
+    """Test the changes are listed with the labels from the config"""
+    lines = format_item_diff(diff_items(OLD, new_version(), SCHEMA), SCHEMA)
+
+    assert lines == [
+        '- Changed `name`',
+        '- Dataset `tree-preservation-order` added',
+        '- Dataset `tree-preservation-zone` removed',
+        '- Dataset `tree` changed',
+        '  - Field `geometry` added',
+        '  - Field `height` removed',
+        '  - Field `point` changed',
+        '    - Changed `guidance`',
+    ]
+
+def test_describe_file_changes():
+    """Test describing new files, changed frontmatter and changes to the body only"""
+    old = '---\nspecification: tree\nname: Tree\n---\n'
+    published = {'tree.md': old, 'body.md': old}
+    rendered = {
+        'tree.md': '---\nspecification: tree\nname: Trees\n---\n',
+        'new.md': '---\nspecification: new\n---\n',
+        'body.md': old + '\nBody\n',
+    }
+    schemas = {destination: SCHEMA for destination in rendered}
+
+    assert describe_file_changes(published, rendered, schemas).splitlines() == [
+        '- **`tree.md`**',
+        '  - Changed `name`',
+        '- **`new.md`**: new specification',
+        '- **`body.md`**',
+        '  - Changed content outside the frontmatter',
+    ]
+
+def test_compiled_schema_keys_and_labels():
+    """Test the schema compiled from config.yml knows how to match and name datasets and fields"""
+    schema = compile_schema(load_config())
+
+    assert (schema.key, schema.label) == ('specification', 'Specification')
+    datasets = schema.children['datasets']
+    assert (datasets.key, datasets.label) == ('dataset', 'Dataset')
+    assert (datasets.children['fields'].key, datasets.children['fields'].label) == ('field', 'Field')
+
+def test_add_changes_to_body():
+    """Test the changes are added under a heading, and cut short at a line to fit"""
+    assert add_changes_to_body('Body', '- a') == 'Body\n\n### Changes\n\n- a'
+
+    changes = "\n".join(f"- change {index}" for index in range(100))
+    body = add_changes_to_body('Body', changes, max_length=200)
+
+    assert len(body) <= 200
+    assert body.startswith('Body\n\n### Changes\n\n- change 0\n')
+    assert body.endswith('\n\n_The list of changes was cut short, see the files changed for the rest._')
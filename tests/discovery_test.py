@@ -0,0 +1,93 @@
+import os
+import pytest
+from unittest.mock import patch
+from src.specifications.discovery import (
+    get_export_rule,
+    get_exported_collections,
+    discover_sources,
+    match_destination,
+    clear_cache,
+)
+
+CONFIG = {
+    'collections': [
+        {'id': 'specifications', 'export': {'destination': 'content/specification/{name}.md'}},
+        {'id': 'guidance_pages', 'export': {'source': 'pages', 'destination': 'content/{name}.md',
+                                            'repository': 'example/site', 'body': 'body'}},
+        {'id': 'data_design'},
+    ]
+}
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    clear_cache()
+    yield
+    clear_cache()
+
+def test_get_export_rule():
+    """Test the source directory defaults to the collection's directory under data/collections"""
+    assert get_export_rule(CONFIG, 'specifications') == {
+        'source': 'data/collections/specifications',
+        'destination': 'content/specification/{name}.md',
+        'repository': None,
+        'body': None,
+    }
+    assert get_export_rule(CONFIG, 'guidance_pages') == {
+        'source': 'pages',
+        'destination': 'content/{name}.md',
+        'repository': 'example/site',
+        'body': 'body',
+    }
+    assert get_export_rule(CONFIG, 'data_design') is None
+    assert get_export_rule(CONFIG, 'missing') is None
+
+def test_get_exported_collections():
+    """Test only collections with an export are listed"""
+    assert get_exported_collections(CONFIG) == ['specifications', 'guidance_pages']
+
+def test_discover_sources(tmp_path):
+    """Test YAML files in the directory are mapped in name order and anything else is skipped"""
+    for name in ('b.yml', 'a.yaml', 'notes.md'):
+        (tmp_path / name).write_text('data: {}\n')
+    (tmp_path / 'nested.yml').mkdir()
+
+    assert discover_sources(str(tmp_path), 'content/{name}.md') == {
+        os.path.join(str(tmp_path), 'a.yaml'): 'content/a.md',
+        os.path.join(str(tmp_path), 'b.yml'): 'content/b.md',
+    }
+
+def test_discover_sources_cached_by_mtime(tmp_path):
+    """Test the directory is only scanned again once its mtime changes"""
+    (tmp_path / 'a.yml').write_text('data: {}\n')
+    directory = str(tmp_path)
+
+    with patch('src.specifications.discovery.os.scandir', wraps=os.scandir) as mock_scandir:
+        first = discover_sources(directory, '{name}.md')
+        assert discover_sources(directory, '{name}.md') == first
+        assert mock_scandir.call_count == 1
+
+        # Adding a file changes the directory's mtime
+        (tmp_path / 'b.yml').write_text('data: {}\n')
+        stat = os.stat(directory)
+        os.utime(directory, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+
+        assert list(discover_sources(directory, '{name}.md').values()) == ['a.md', 'b.md']
+        assert mock_scandir.call_count == 2
+
+def test_discover_sources_returns_copy(tmp_path):
+    """Test changing a returned mapping doesn't change the cached one"""
+    (tmp_path / 'a.yml').write_text('data: {}\n')
+
+    discover_sources(str(tmp_path), '{name}.md').clear()
+
+    assert discover_sources(str(tmp_path), '{name}.md') == {os.path.join(str(tmp_path), 'a.yml'): 'a.md'}
+
+def test_match_destination():
+    """Test mapping a published path back to the name of its source file"""
+    destination = 'content/specification/{name}.md'
+
+    assert match_destination(destination, 'content/specification/listed-building.md') == 'listed-building'
+    assert match_destination(destination, 'content/specification/nested/listed-building.md') is None
+    assert match_destination(destination, 'content/specification/listed-building.mdx') is None
+    assert match_destination(destination, 'content/guidance/listed-building.md') is None
+    assert match_destination('content/{name}/index.md', 'content/tree/index.md') == 'tree'
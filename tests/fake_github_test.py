@@ -0,0 +1,148 @@
+import time
+import asyncio
+import pytest
+from github import GithubException
+from benchmarks.export import create_bare_repo
+from benchmarks.fake_github import FakeGitHub
+from src.specifications.publishers import GitHubPublisher, get_file_shas, git
+from src.specifications.update_specifications import sync_specifications
+
+SPECIFICATIONS = 5
+
+@pytest.fixture
+def fake(tmp_path):
+    """A fake GitHub serving a repository with an empty main branch"""
+    path = str(tmp_path / 'specification.git')
+    create_bare_repo(path)
+    with FakeGitHub(path) as fake:
+        yield fake
+
+def get_publisher(fake, **kwargs):
+    return GitHubPublisher(fake.client().get_repo(fake.repository), **kwargs)
+
+def test_batch_sync_calls(fake):
+    """Test a batched sync makes the same API calls however many files it publishes"""
+    publisher = get_publisher(fake)
+    fake.reset_calls()
+
+    pr = sync_specifications(publisher, 'mini-cms/test', 'Title', 'Body')
+
+    assert pr.number == 1
+    assert [f"{call['method']} {call['path'].split('/', 4)[-1]}" for call in fake.calls] == [
+        'GET branches/main',
+        f"GET git/trees/{publisher.get_branch_sha('main')}",
+        'POST graphql',
+        'POST git/refs',
+        'GET git/refs/heads/mini-cms/test',
+        f"GET git/commits/{publisher.get_branch_sha('main')}",
+        'POST git/trees',
+        'POST git/commits',
+        'PATCH git/refs/heads/mini-cms/test',
+        'POST pulls',
+    ]
+    files = git('ls-tree', '-r', '--name-only', 'mini-cms/test', cwd=fake.path).splitlines()
+    assert len(files) == SPECIFICATIONS
+    assert 'Mini-CMS-Source-Commit: ' in git('log', '-1', '--format=%B', 'mini-cms/test', cwd=fake.path)
+
+def test_contents_api_sync_calls(fake):
+    """Test publishing with the Contents API reads and writes each file once"""
+    publisher = get_publisher(fake)
+    fake.reset_calls()
+
+    sync_specifications(publisher, 'mini-cms/test', 'Title', 'Body', batch=False)
+
+    assert fake.count('GET', '/contents/') == SPECIFICATIONS
+    assert fake.count('PUT', '/contents/') == SPECIFICATIONS
+    assert all(call['status'] == 201 for call in fake.find_calls('PUT'))
+    # One commit per file on top of main
+    assert git('rev-list', '--count', 'mini-cms/test', cwd=fake.path) == str(SPECIFICATIONS + 1)
+
+def test_contents_api_updates_existing_files(fake):
+    """Test files already on the branch are updated with their SHA"""
+    publisher = get_publisher(fake)
+    publisher.create_branch('mini-cms/test', publisher.get_branch_sha('main'))
+    publisher.publish('mini-cms/test', {'a.md': 'one\n', 'b.md': 'one\n'}, batch=False)
+
+    publisher.publish('mini-cms/test', {'a.md': 'two\n', 'b.md': 'one\n'}, batch=False)
+
+    assert [call['status'] for call in fake.find_calls('PUT')] == [201, 201, 200, 200]
+    assert git('show', 'mini-cms/test:a.md', cwd=fake.path) == 'two'
+
+def test_contents_api_reads_concurrently(fake):
+    """Test the latency of reading file SHAs is paid concurrently"""
+    repo = fake.client().get_repo(fake.repository)
+    paths = [f"{index}.md" for index in range(8)]
+    fake.latency = 0.1
+
+    started = time.perf_counter()
+    shas = asyncio.run(get_file_shas(repo, 'main', paths, concurrency=8))
+    elapsed = time.perf_counter() - started
+
+    assert shas == dict.fromkeys(paths)
+    # Read one after another, they would take at least 0.8 seconds
+    assert elapsed < 0.6
+
+def test_rate_limited_write_retried(fake):
+    """Test a write refused by the rate limit is retried once the limit resets"""
+    publisher = get_publisher(fake)
+    publisher.create_branch('mini-cms/test', publisher.get_branch_sha('main'))
+    fake.rate_limit(method='PUT')
+
+    publisher.publish('mini-cms/test', {'a.md': 'one\n'}, batch=False)
+
+    assert [call['status'] for call in fake.find_calls('PUT')] == [403, 201]
+    assert git('show', 'mini-cms/test:a.md', cwd=fake.path) == 'one'
+
+def test_server_error_on_read_retried(fake):
+    """Test a GET failing with a server error is retried"""
+    publisher = get_publisher(fake)
+    fake.fail(502, method='GET', path='/branches/', times=2)
+
+    assert publisher.get_branch_sha('main') == git('rev-parse', 'main', cwd=fake.path)
+    assert [call['status'] for call in fake.find_calls('GET', '/branches/')] == [502, 502, 200]
+
+def test_server_error_on_commit_not_retried(fake):
+    """Test a POST failing with a server error is reported rather than sent again"""
+    publisher = get_publisher(fake)
+    fake.fail(502, method='POST', path='/git/commits')
+
+    with pytest.raises(GithubException) as exc_info:
+        sync_specifications(publisher, 'mini-cms/test', 'Title', 'Body')
+
+    assert exc_info.value.status == 502
+    assert fake.count('POST', '/git/commits') == 1
+    assert fake.count('POST', '/pulls') == 0
+
+def test_create_branch_exists(fake):
+    """Test creating a branch that exists fails as it does on GitHub"""
+    publisher = get_publisher(fake)
+    publisher.create_branch('mini-cms/test', publisher.get_branch_sha('main'))
+
+    with pytest.raises(GithubException) as exc_info:
+        publisher.create_branch('mini-cms/test', publisher.get_branch_sha('main'))
+
+    assert exc_info.value.status == 422
+
+def test_commits_paginated(fake):
+    """Test the last synced commit is found across pages of commits"""
+    publisher = GitHubPublisher(fake.client(per_page=2).get_repo(fake.repository))
+    publisher.create_branch('mini-cms/test', publisher.get_branch_sha('main'))
+    publisher.publish('mini-cms/test', {'a.md': 'one\n'}, source_commit='abc123', batch=False)
+    for index in range(4):
+        publisher.publish('mini-cms/test', {'a.md': f"{index}\n"}, batch=False)
+
+    assert publisher.get_last_synced_commit(['a.md'], branch='mini-cms/test') == 'abc123'
+    assert fake.count('GET', '/commits$') == 3
+
+def test_reuse_pull_request(fake):
+    """Test a second sync finds the open pull request, which already has the rendered files"""
+    publisher = get_publisher(fake)
+    sync_specifications(publisher, 'mini-cms/update-specifications-1', 'First', 'First body', reuse_pull_request=True)
+
+    pr = sync_specifications(publisher, 'mini-cms/update-specifications-2', 'Second', 'Second body',
+                             reuse_pull_request=True)
+
+    assert pr.number == 1
+    assert fake.count('POST', '/pulls') == 1
+    assert fake.count('POST', '/git/commits') == 1
+    assert fake.count('GET', '/pulls') == 2
@@ -0,0 +1,108 @@
+import json
+import threading
+import pytest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib3.util.retry import RequestHistory
+from github import Github, GithubException
+from src.specifications.github_client import SyncRetry, client_options
+
+class FlakyHandler(BaseHTTPRequestHandler):
+    """Answers each path with the next queued status, then 200"""
+
+    def respond(self):
+        self.server.requests.append((self.command, self.path))
+        queue = self.server.responses.get(self.path, [])
+        status, headers = queue.pop(0) if queue else (200, {})
+        body = json.dumps({'message': 'error'} if status >= 400 else {'full_name': 'digital-land/specification'})
+
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for header, value in headers.items():
+            self.send_header(header, value)
+        self.end_headers()
+        self.wfile.write(body.encode('utf-8'))
+
+    do_GET = respond
+    do_POST = respond
+
+    def log_message(self, format, *args):
+        pass
+
+@pytest.fixture
+def server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FlakyHandler)
+    server.requests = []
+    server.responses = {}
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+def github(server, **kwargs):
+    options = {**client_options(backoff_factor=0, jitter=0, **kwargs), 'base_url': f"http://127.0.0.1:{server.server_port}"}
+    return Github(seconds_between_requests=None, seconds_between_writes=None, **options)
+
+def test_retry_idempotent_methods_only():
+    """Test that server errors are only retried for idempotent methods"""
+    retry = SyncRetry(total=3)
+
+    assert retry.is_retry('GET', 502)
+    assert retry.is_retry('PUT', 503)
+    assert not retry.is_retry('POST', 502)
+    assert not retry.is_retry('PATCH', 500)
+
+def test_retry_rate_limits_any_method():
+    """Test that rate limited requests are retried whatever the method"""
+    retry = SyncRetry(total=3)
+
+    assert retry.is_retry('POST', 403)
+    assert not SyncRetry(total=0).is_retry('POST', 403)
+
+def test_retry_backoff_jitter():
+    """Test that jitter is added to backoff and kept by new retries"""
+    retry = SyncRetry(total=5, backoff_factor=1, jitter=0.5)
+    assert retry.get_backoff_time() == 0
+
+    error = RequestHistory('GET', '/', None, 502, None)
+    retry = retry.new(total=3, history=(error, error))
+
+    assert retry.jitter == 0.5
+    assert 2 <= retry.get_backoff_time() <= 2.5
+
+def test_client_retries_transient_get(server):
+    """Test that a GET failing with a 502 is retried on the same client"""
+    server.responses['/repos/digital-land/specification'] = [(502, {}), (502, {})]
+
+    repo = github(server).get_repo('digital-land/specification')
+
+    assert repo.full_name == 'digital-land/specification'
+    assert len(server.requests) == 3
+
+def test_client_honours_retry_after(server):
+    """Test that a rate limited request with Retry-After is retried"""
+    server.responses['/repos/digital-land/specification'] = [(403, {'Retry-After': '0'})]
+
+    repo = github(server).get_repo('digital-land/specification')
+
+    assert repo.full_name == 'digital-land/specification'
+    assert len(server.requests) == 2
+
+def test_client_gives_up_with_github_exception(server):
+    """Test that a persistent failure is raised as a GithubException once retries run out"""
+    server.responses['/repos/digital-land/specification'] = [(502, {})] * 5
+
+    with pytest.raises(GithubException) as exc_info:
+        github(server, retries=2).get_repo('digital-land/specification')
+
+    assert exc_info.value.status == 502
+    assert len(server.requests) == 3
+
+def test_client_options_api_url(monkeypatch):
+    """Test the API URL is taken from GITHUB_API_URL if it is set"""
+    monkeypatch.delenv('GITHUB_API_URL', raising=False)
+    assert 'base_url' not in client_options()
+
+    monkeypatch.setenv('GITHUB_API_URL', 'https://github.example.com/api/v3')
+    assert client_options()['base_url'] == 'https://github.example.com/api/v3'
@@ -0,0 +1,200 @@
+import copy
+import glob
+import pytest
+from unittest.mock import patch
+from src.specifications.import_specifications import import_file, import_collection, main
+from src.specifications.update_specifications import load_config, compile_schema, render_file, render_collections
+from src.specifications.publishers import DirectoryPublisher, GitPublisher, git
+from src.specifications.discovery import get_export_rule, clear_cache
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    clear_cache()
+    yield
+    clear_cache()
+
+def export_everything(config):
+    """A copy of the config that exports the guidance pages and data design too, as a site might"""
+    config = copy.deepcopy(config)
+    exports = {
+        'guidance_pages': {'destination': 'content/guidance/{name}.md', 'body': 'body'},
+        'data_design': {'destination': 'content/data-design/{name}.md'},
+    }
+    for collection in config['collections']:
+        if collection['id'] in exports:
+            collection['export'] = exports[collection['id']]
+    return config
+
+@pytest.mark.parametrize('collection_id', ['specifications', 'guidance_pages', 'data_design'])
+def test_import_file_round_trip(collection_id, tmp_path):
+    """Test that importing a rendered file writes a source that renders the same"""
+    config = export_everything(load_config())
+    rule = get_export_rule(config, collection_id)
+    schema = compile_schema(config, collection_id)
+
+    for source in sorted(glob.glob(f"{rule['source']}/*.yml")):
+        content = render_file(source, schema, rule['body'])
+        imported = tmp_path / source.replace('/', '_')
+        import_file(content, str(imported), schema, rule['body'])
+
+        assert render_file(str(imported), schema, rule['body']) == content, source
+
+def test_import_file_keeps_other_keys(tmp_path):
+    """Test that the fields outside the data of an existing source are kept"""
+    config = load_config()
+    schema = compile_schema(config)
+    source = tmp_path / 'listed-building.yml'
+    source.write_text('id: listed-building\ndisplay_name: Listed building\ndata:\n  specification: old\n')
+
+    import_file('---\nname: Listed building\nspecification: listed-building\n---\n', str(source), schema)
+
+    assert source.read_text() == (
+        'id: listed-building\n'
+        'display_name: Listed building\n'
+        'data:\n'
+        '  specification: listed-building\n'
+        '  name: Listed building\n'
+    )
+
+@pytest.mark.parametrize('name, old, new', [
+    ('article-4-direction', 'a brief description of the article 4 direction',
+     'a short description of the article 4 direction'),
+    ('conservation-area', 'unique within your dataset', 'unique across your dataset'),
+])
+def test_import_file_changes_only_the_edited_line(tmp_path, name, old, new):
+    """Test importing a one field edit into a source the CMS wrote changes just that line"""
+    schema = compile_schema(load_config())
+    original = f"data/collections/specifications/{name}.yml"
+    source = tmp_path / f"{name}.yml"
+    source.write_bytes(open(original, 'rb').read())
+    content = render_file(original, schema).replace(old, new, 1)
+
+    import_file(content, str(source), schema)
+
+    before = open(original, 'rb').read().decode().split('\n')
+    after = source.read_bytes().decode().split('\n')
+    assert len(after) == len(before)
+    assert [(line, changed) for line, changed in zip(before, after) if line != changed] == \
+        [(line, line.replace(old, new)) for line in before if old in line][:1]
+    assert render_file(str(source), schema) == content
+
+def test_import_file_keeps_body_layout(tmp_path):
+    """Test a body with carriage returns is changed in place, ending as it did, and the other lines are kept"""
+    config = export_everything(load_config())
+    schema = compile_schema(config, 'guidance_pages')
+    original = 'data/collections/guidance_pages/index.yml'
+    source = tmp_path / 'index.yml'
+    source.write_bytes(open(original, 'rb').read())
+    content = render_file(original, schema, 'body').replace('title: ', 'title: New ', 1)
+
+    import_file(content, str(source), schema, 'body')
+
+    assert source.read_bytes() == open(original, 'rb').read().replace(b'title: ', b'title: New ', 1)
+
+    content = content.replace('simply and quickly', 'quickly')
+    import_file(content, str(source), schema, 'body')
+
+    assert render_file(str(source), schema, 'body') == content
+    # Without a line break at the end of the body, as the CMS wrote it
+    assert '(https://provide.planning.data.gov.uk/)"\n' in source.read_text()
+
+@pytest.fixture
+def published(tmp_path):
+    """Specifications copied to a source directory and published to the main branch of a git repository"""
+    config = copy.deepcopy(load_config())
+    sources = tmp_path / 'specifications'
+    sources.mkdir()
+    for path in glob.glob('data/collections/specifications/*.yml'):
+        with open(path) as f:
+            (sources / path.split('/')[-1]).write_text(f.read())
+    for collection in config['collections']:
+        if collection['id'] == 'specifications':
+            collection['export']['source'] = str(sources)
+
+    work = tmp_path / 'work'
+    bare = tmp_path / 'specification.git'
+    git('init', '-q', '-b', 'main', str(work))
+    (work / 'README.md').write_text('# Specification\n')
+    git('add', 'README.md', cwd=work)
+    git('-c', 'user.name=Test', '-c', 'user.email=test@example.com', 'commit', '-q', '-m', 'Initial commit', cwd=work)
+    git('clone', '-q', '--bare', str(work), str(bare))
+
+    publisher = GitPublisher(str(bare))
+    publisher.publish('main', render_collections(config, ['specifications']))
+    return publisher, config, sources
+
+def test_import_collection_nothing_changed(published):
+    """Test that nothing is fetched or written when the sources already render what is published"""
+    publisher, config, _ = published
+
+    with patch.object(publisher, 'get_published_contents') as get_published_contents:
+        assert import_collection(publisher, config) == []
+    get_published_contents.assert_not_called()
+
+def test_import_collection_carriage_returns(tmp_path):
+    """Test guidance pages whose bodies have carriage returns import from a directory as nothing changed"""
+    config = export_everything(load_config())
+    sources = tmp_path / 'guidance_pages'
+    sources.mkdir()
+    for path in glob.glob('data/collections/guidance_pages/*.yml'):
+        with open(path) as f:
+            (sources / path.split('/')[-1]).write_text(f.read())
+    for collection in config['collections']:
+        if collection['id'] == 'guidance_pages':
+            collection['export']['source'] = str(sources)
+
+    publisher = DirectoryPublisher(str(tmp_path / 'published'))
+    files = render_collections(config, ['guidance_pages'])
+    assert any('\r' in content for content in files.values())
+    publisher.publish('main', files)
+
+    assert import_collection(publisher, config, 'guidance_pages') == []
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_import_collection(published, workers):
+    """Test that only edited and new files are fetched, in one batch, and written"""
+    publisher, config, sources = published
+    files = render_collections(config, ['specifications'])
+    edited = files['content/specification/listed-building.md'].replace(
+        'Listed building outlines', 'Listed building boundaries')
+    new = files['content/specification/tree-preservation-order.md'].replace(
+        'specification: tree-preservation-order', 'specification: tree')
+    publisher.publish('main', {
+        'content/specification/listed-building.md': edited,
+        'content/specification/tree.md': new,
+        'content/guidance/listed-building.md': '---\ntitle: Not a specification\n---\n',
+    })
+    unchanged = (sources / 'article-4-direction.yml').read_text()
+
+    get_published_contents = publisher.get_published_contents
+    with patch.object(publisher, 'get_published_contents', side_effect=get_published_contents) as batch:
+        written = import_collection(publisher, config, workers=workers)
+
+    assert written == [str(sources / 'listed-building.yml'), str(sources / 'tree.yml')]
+    batch.assert_called_once()
+    assert sorted(batch.call_args.args[1]) == ['content/specification/listed-building.md',
+                                               'content/specification/tree.md']
+    assert (sources / 'article-4-direction.yml').read_text() == unchanged
+    assert 'plural: Listed building boundaries' in (sources / 'listed-building.yml').read_text()
+    assert (sources / 'listed-building.yml').read_text().startswith('id: listed-building\n')
+
+    clear_cache()
+    assert render_collections(config, ['specifications']) == {**files, **{
+        'content/specification/listed-building.md': edited,
+        'content/specification/tree.md': new,
+    }}
+
+def test_import_collection_not_exported(published):
+    """Test that a collection without an export can't be imported"""
+    publisher, config, _ = published
+    config['collections'] = [dict(collection, export=None) for collection in config['collections']]
+
+    with pytest.raises(ValueError):
+        import_collection(publisher, config)
+
+def test_main_git_dir(published):
+    """Test importing from a local git repository"""
+    publisher, config, sources = published
+
+    with patch('src.specifications.update_specifications.load_config', return_value=config):
+        assert main(['--git-dir', publisher.path]) == 0
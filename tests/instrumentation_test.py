@@ -0,0 +1,77 @@
+import json
+import logging
+from unittest.mock import MagicMock
+from src.specifications.instrumentation import Instrumentation, InstrumentedRepo, GITHUB_REQUESTER_LOGGER
+
+def log_github_request(verb, url, input, status, headers, output):
+    """Log a request the way PyGithub's Requester does"""
+    logging.getLogger(GITHUB_REQUESTER_LOGGER).debug(
+        "%s %s://%s%s %s %s ==> %i %s %s",
+        verb, 'https', 'api.github.com', url, {}, input, status, headers, output
+    )
+
+def test_stage_timing():
+    """Test that stages are recorded with their labels and totalled"""
+    instrumentation = Instrumentation()
+
+    with instrumentation.stage('parse', file='a.yml'):
+        pass
+    instrumentation.record_stage('parse', 0.5, file='b.yml')
+
+    report = instrumentation.report()
+    assert [stage['file'] for stage in report['stages']] == ['a.yml', 'b.yml']
+    assert report['stage_totals']['parse'] >= 0.5
+
+def test_instrument_github_records_requests():
+    """Test that requests PyGithub logs are counted with their sizes and rate limit"""
+    instrumentation = Instrumentation()
+    logger = logging.getLogger(GITHUB_REQUESTER_LOGGER)
+    level = logger.level
+
+    with instrumentation.instrument_github():
+        log_github_request('GET', '/repos/digital-land/specification', None, 200,
+                           {'x-ratelimit-remaining': '4999', 'x-ratelimit-limit': '5000'}, '{"id": 1}')
+        log_github_request('POST', '/repos/digital-land/specification/git/trees', '{"tree": []}', 201,
+                           {'x-ratelimit-remaining': '4998', 'x-ratelimit-limit': '5000'}, '{}')
+
+    # Requests made outside the context aren't recorded
+    log_github_request('GET', '/repos/digital-land/specification', None, 200, {}, '')
+    assert logger.level == level
+
+    api = instrumentation.report()['api']
+    assert api['requests'] == 2
+    assert api['bytes_sent'] == len('{"tree": []}')
+    assert api['bytes_received'] == len('{"id": 1}') + 2
+    assert api['rate_limit'] == {'remaining': '4998', 'limit': '5000'}
+    assert api['endpoints'] == {
+        'GET /repos/digital-land/specification': 1,
+        'POST /repos/digital-land/specification/git/trees': 1
+    }
+
+def test_instrumented_repo():
+    """Test that each repository call is timed"""
+    instrumentation = Instrumentation()
+    repo = MagicMock()
+    repo.full_name = 'digital-land/specification'
+
+    instrumented = InstrumentedRepo(repo, instrumentation)
+    instrumented.get_branch('main')
+
+    repo.get_branch.assert_called_once_with('main')
+    assert instrumented.full_name == 'digital-land/specification'
+    assert [(stage['stage'], stage['call']) for stage in instrumentation.stages] == [('github', 'get_branch')]
+
+def test_report_and_job_summary(tmp_path, monkeypatch):
+    """Test writing the JSON report and the GitHub Actions job summary"""
+    instrumentation = Instrumentation()
+    instrumentation.record_stage('render', 0.25, file='a.yml')
+
+    instrumentation.write_report(tmp_path / 'report.json')
+    assert json.loads((tmp_path / 'report.json').read_text())['stage_totals'] == {'render': 0.25}
+
+    monkeypatch.delenv('GITHUB_STEP_SUMMARY', raising=False)
+    assert not instrumentation.write_job_summary()
+
+    monkeypatch.setenv('GITHUB_STEP_SUMMARY', str(tmp_path / 'summary.md'))
+    assert instrumentation.write_job_summary()
+    assert '| render | 1 | 0.250 |' in (tmp_path / 'summary.md').read_text()
@@ -0,0 +1,63 @@
+import json
+from src.specifications.journal import SyncJournal
+from src.specifications.publishers import git_blob_sha
+
+FILES = {
+    'content/specification/article-4-direction.md': '---\nspecification: article-4-direction\n---\n',
+    'content/specification/listed-building.md': '---\nspecification: listed-building\n---\n'
+}
+
+def test_journal_records_and_resumes(tmp_path):
+    """Test that recorded files survive a restart and only unrecorded or changed files are pending"""
+    path = tmp_path / 'journal.json'
+    journal = SyncJournal(str(path))
+    journal.start('specifications', 'abc123', 'mini-cms/first')
+    journal.record('specifications', 'content/specification/article-4-direction.md',
+                   FILES['content/specification/article-4-direction.md'])
+
+    journal = SyncJournal(str(path))
+    assert journal.get_resumable('specifications', 'abc123')['branch'] == 'mini-cms/first'
+    assert journal.get_pending('specifications', FILES) == {
+        'content/specification/listed-building.md': FILES['content/specification/listed-building.md']
+    }
+
+    changed = dict(FILES, **{'content/specification/article-4-direction.md': '---\nchanged: true\n---\n'})
+    assert list(journal.get_pending('specifications', changed)) == list(FILES)
+
+def test_journal_other_source_commit(tmp_path):
+    """Test that a sync from another source commit, or of other collections, isn't resumed"""
+    journal = SyncJournal(str(tmp_path / 'journal.json'))
+    journal.start('specifications', 'abc123', 'mini-cms/first')
+
+    assert journal.get_resumable('specifications', 'def456') is None
+    assert journal.get_resumable('specifications', None) is None
+    assert journal.get_resumable('guidance_pages', 'abc123') is None
+
+def test_journal_finish(tmp_path):
+    """Test that a finished sync is forgotten and the file is left valid"""
+    path = tmp_path / 'journal.json'
+    journal = SyncJournal(str(path))
+    journal.start('specifications', 'abc123', 'mini-cms/first')
+    journal.start('guidance_pages', 'abc123', 'mini-cms/first')
+    journal.record('specifications', 'a.md', 'a')
+
+    journal.finish('specifications')
+    journal.finish('specifications')
+
+    assert json.loads(path.read_text()) == {
+        'guidance_pages': {'source_commit': 'abc123', 'branch': 'mini-cms/first', 'files': {}}
+    }
+    assert not (tmp_path / 'journal.json.tmp').exists()
+
+def test_journal_unreadable(tmp_path):
+    """Test that a missing or corrupt journal starts empty"""
+    assert SyncJournal(str(tmp_path / 'missing.json')).entries == {}
+
+    path = tmp_path / 'journal.json'
+    path.write_text('{"specifications": ')
+    journal = SyncJournal(str(path))
+    assert journal.entries == {}
+
+    journal.start('specifications', 'abc123', 'mini-cms/first')
+    journal.record('specifications', 'a.md', 'a')
+    assert json.loads(path.read_text())['specifications']['files'] == {'a.md': git_blob_sha('a')}
@@ -0,0 +1,96 @@
+import copy
+import pytest
+from src.specifications.model import (
+    Layout,
+    Item,
+    Specification,
+    Dataset,
+    Field,
+    build_item,
+    load_collections,
+)
+from src.specifications.update_specifications import Schema, load_config, compile_schema, get_file_mapping, order_data
+from src.specifications.validator import yaml
+
+SCHEMA = Schema([
+    {'id': 'specification'},
+    {'id': 'name'},
+    {'id': 'datasets', 'fields': [
+        {'id': 'dataset'},
+        {'id': 'fields', 'field_map': {'id': 'field'}, 'fields': [{'id': 'field'}, {'id': 'description'}]},
+    ], 'field_map': {'id': 'dataset'}},
+], key='specification')
+
+DATA = {
+    'name': 'Tree',
+    'extra': 'not in the schema',
+    'specification': 'tree',
+    'datasets': [
+        {'fields': [{'description': 'Reference', 'field': 'reference'}, {'field': 'point'}], 'dataset': 'tree'},
+    ],
+}
+
+def test_build_item():
+    """Test an item holds its fields in schema order, without those not in the schema"""
+    specification = build_item(DATA, Layout(SCHEMA))
+
+    assert isinstance(specification, Specification)
+    assert specification.key == 'tree'
+    assert specification.keys() == ['specification', 'name', 'datasets']
+    assert specification['name'] == 'Tree'
+    assert 'extra' not in specification
+    assert specification.get('extra') is None
+    with pytest.raises(KeyError):
+        specification['extra']
+
+    dataset = specification.datasets[0]
+    assert isinstance(dataset, Dataset)
+    assert [field.key for field in dataset.fields] == ['reference', 'point']
+    assert isinstance(dataset.fields[0], Field)
+    assert dataset.fields[1].keys() == ['field']
+
+def test_to_dict_matches_order_data():
+    """Test an item converts back to the data order_data would give"""
+    specification = build_item(DATA, Layout(SCHEMA))
+
+    assert specification.to_dict() == order_data(DATA, SCHEMA)
+    assert list(specification.to_dict()['datasets'][0]['fields'][0]) == ['field', 'description']
+
+def test_items_have_no_dict():
+    """Test items only hold their layout and values"""
+    specification = build_item(DATA, Layout(SCHEMA))
+
+    assert not hasattr(specification, '__dict__')
+    assert not hasattr(specification.datasets[0].fields[0], '__dict__')
+
+def test_strings_shared():
+    """Test equal strings loaded into different items are stored once"""
+    strings = {}
+    layout = Layout(SCHEMA)
+    first = build_item({'datasets': [{'dataset': ''.join(['tr', 'ee'])}]}, layout, strings)
+    second = build_item({'datasets': [{'dataset': ''.join(['t', 'ree'])}]}, layout, strings)
+
+    assert first.datasets[0]['dataset'] is second.datasets[0]['dataset']
+
+def test_other_collections_are_items():
+    """Test collections other than specifications are made of plain items"""
+    page = build_item({'id': 'index', 'title': 'Home'}, Layout(Schema([{'id': 'id'}, {'id': 'title'}], key='id')))
+
+    assert type(page) is Item
+    assert (page.key, page['title']) == ('index', 'Home')
+
+def test_load_collections():
+    """Test every exported collection loads as it would be ordered for rendering"""
+    config = copy.deepcopy(load_config())
+    for collection in config['collections']:
+        collection.setdefault('export', {'destination': f"content/{collection['id']}/{{name}}.md"})
+    collections = load_collections(config)
+
+    assert list(load_collections(load_config())) == ['specifications']
+    assert list(collections) == ['guidance_pages', 'specifications', 'data_design']
+    assert collections['specifications']['listed-building'].key == 'listed-building'
+    for collection_id, items in collections.items():
+        schema = compile_schema(config, collection_id)
+        for source, item in zip(get_file_mapping(config, collection_id), items.values()):
+            with open(source, 'r') as f:
+                assert item.to_dict() == order_data(yaml.load(f)['data'], schema)
@@ -0,0 +1,229 @@
+import time
+import subprocess
+import threading
+import pytest
+from unittest.mock import MagicMock
+from github import GithubException, UnknownObjectException
+from src.specifications.publishers import (
+    GitHubPublisher,
+    DirectoryPublisher,
+    GitPublisher,
+    git,
+    git_blob_sha,
+    get_source_commit_trailer,
+)
+
+FILES = {
+    'content/specification/article-4-direction.md': '---\nspecification: article-4-direction\n---\n',
+    'content/specification/listed-building.md': '---\nspecification: listed-building\n---\n'
+}
+
+@pytest.fixture
+def bare_repo(tmp_path):
+    """A bare git repository with a main branch containing a README"""
+    work = tmp_path / 'work'
+    bare = tmp_path / 'specification.git'
+    git('init', '-q', '-b', 'main', str(work))
+    (work / 'README.md').write_text('# Specification\n')
+    git('add', 'README.md', cwd=work)
+    git('-c', 'user.name=Test', '-c', 'user.email=test@example.com', 'commit', '-q', '-m', 'Initial commit', cwd=work)
+    git('clone', '-q', '--bare', str(work), str(bare))
+    return bare
+
+def test_get_source_commit_trailer():
+    """Test reading the source commit from a commit message"""
+    assert get_source_commit_trailer('Update\n\nMini-CMS-Source-Commit: abc123') == 'abc123'
+    assert get_source_commit_trailer('Update') is None
+
+def test_github_publisher_per_file_creates_missing_files():
+    """Test that the Contents API path creates files that don't exist yet"""
+    repo = MagicMock()
+    repo.get_contents.side_effect = UnknownObjectException(404, {'message': 'Not Found'})
+
+    GitHubPublisher(repo).publish('test-branch', FILES, batch=False)
+
+    assert repo.create_file.call_count == 2
+    repo.update_file.assert_not_called()
+
+def test_github_publisher_per_file_transient_failure():
+    """Test that a failure other than a 404 isn't mistaken for a missing file"""
+    repo = MagicMock()
+    repo.get_contents.side_effect = GithubException(502, {'message': 'Bad Gateway'})
+
+    with pytest.raises(GithubException):
+        GitHubPublisher(repo).publish('test-branch', FILES, batch=False)
+
+    repo.create_file.assert_not_called()
+    repo.update_file.assert_not_called()
+
+def test_github_publisher_per_file_reads_concurrently():
+    """Test that file SHAs are read concurrently, up to the limit, and written one at a time in path order"""
+    repo = MagicMock()
+    lock = threading.Lock()
+    in_flight = []
+    most_in_flight = []
+
+    def get_contents(path, ref):
+        with lock:
+            in_flight.append(path)
+            most_in_flight.append(len(in_flight))
+        time.sleep(0.05)
+        with lock:
+            in_flight.remove(path)
+        return MagicMock(sha=f"sha-{path}")
+
+    repo.get_contents.side_effect = get_contents
+    files = {f"content/{name}.md": name for name in 'fedcba'}
+    published = []
+
+    GitHubPublisher(repo, concurrency=3).publish('test-branch', files, batch=False,
+                                                 on_published=lambda destination, content: published.append(content))
+
+    assert max(most_in_flight) == 3
+    assert published == list('abcdef')
+    assert [call.kwargs['sha'] for call in repo.update_file.call_args_list] == \
+        [f"sha-content/{name}.md" for name in 'abcdef']
+
+def test_github_publisher_per_file_conflict_retried():
+    """Test that a file changed since its SHA was read is read again and written"""
+    repo = MagicMock()
+    repo.get_contents.side_effect = [MagicMock(sha='old'), MagicMock(sha='old'), MagicMock(sha='new')]
+    repo.update_file.side_effect = [None, GithubException(409, {'message': 'does not match'}), None]
+
+    GitHubPublisher(repo).publish('test-branch', FILES, batch=False)
+
+    assert [call.kwargs['sha'] for call in repo.update_file.call_args_list] == ['old', 'old', 'new']
+
+def test_directory_publisher(tmp_path):
+    """Test writing files into a directory and reading back their SHAs"""
+    publisher = DirectoryPublisher(str(tmp_path))
+
+    publisher.create_branch('test-branch', None)
+    publisher.publish('test-branch', FILES, source_commit='abc123')
+
+    assert publisher.get_published_shas(None) == {
+        destination: git_blob_sha(content) for destination, content in FILES.items()
+    }
+    assert publisher.get_last_synced_commit(['content/specification']) == 'abc123'
+
+def test_git_publisher_batch(bare_repo):
+    """Test committing every file to a branch of a bare repository in one commit"""
+    publisher = GitPublisher(str(bare_repo))
+    main_sha = publisher.get_branch_sha('main')
+
+    publisher.create_branch('mini-cms/test', main_sha)
+    publisher.publish('mini-cms/test', FILES, source_commit='abc123')
+
+    branch_sha = publisher.get_branch_sha('mini-cms/test')
+    assert git('rev-parse', f"{branch_sha}^", cwd=bare_repo) == main_sha
+    assert git('show', "mini-cms/test:content/specification/listed-building.md", cwd=bare_repo) + '\n' == \
+        FILES['content/specification/listed-building.md']
+
+    shas = publisher.get_published_shas(branch_sha)
+    assert 'README.md' in shas
+    for destination, content in FILES.items():
+        assert shas[destination] == git_blob_sha(content)
+
+    assert publisher.get_last_synced_commit(['content/specification'], branch='mini-cms/test') == 'abc123'
+    assert publisher.get_last_synced_commit(['content/specification']) is None
+
+def test_git_publisher_per_file(bare_repo):
+    """Test committing one file per commit"""
+    publisher = GitPublisher(str(bare_repo))
+    publisher.create_branch('mini-cms/test', publisher.get_branch_sha('main'))
+
+    publisher.publish('mini-cms/test', FILES, batch=False)
+
+    log = git('log', '--format=%s', 'main..mini-cms/test', cwd=bare_repo).splitlines()
+    assert log == [
+        'Create content/specification/listed-building.md',
+        'Create content/specification/article-4-direction.md'
+    ]
+
+def test_git_publisher_create_branch_exists(bare_repo):
+    """Test that an existing branch isn't overwritten"""
+    publisher = GitPublisher(str(bare_repo))
+    main_sha = publisher.get_branch_sha('main')
+
+    with pytest.raises(subprocess.CalledProcessError):
+        publisher.create_branch('main', main_sha)
+
+def test_git_publisher_get_published_contents(bare_repo):
+    """Test reading several files at a commit in one batch, skipping missing ones"""
+    publisher = GitPublisher(str(bare_repo))
+    publisher.create_branch('mini-cms/test', publisher.get_branch_sha('main'))
+    files = dict(FILES, **{'content/specification/brownfield-land.md': '---\nname: Brownfield – land\n---\n'})
+    publisher.publish('mini-cms/test', files)
+
+    contents = publisher.get_published_contents(
+        publisher.get_branch_sha('mini-cms/test'),
+        ['content/specification/missing.md', *files, 'README.md']
+    )
+
+    assert contents == dict(files, **{'README.md': '# Specification\n'})
+
+def test_directory_publisher_get_published_contents(tmp_path):
+    """Test reading files back from a directory"""
+    publisher = DirectoryPublisher(str(tmp_path))
+    publisher.publish('test-branch', FILES)
+
+    assert publisher.get_published_contents(None, [*FILES, 'content/specification/missing.md']) == FILES
+
+def test_directory_publisher_carriage_returns(tmp_path):
+    """Test carriage returns in published files are written and read back as they are"""
+    publisher = DirectoryPublisher(str(tmp_path))
+    files = {'content/guidance/index.md': '---\nid: index\n---\n\nFirst line\r\nSecond line\r\n'}
+    publisher.publish('test-branch', files)
+
+    assert (tmp_path / 'content/guidance/index.md').read_bytes() == files['content/guidance/index.md'].encode()
+    assert publisher.get_published_shas(None) == {path: git_blob_sha(content) for path, content in files.items()}
+    assert publisher.get_published_contents(None, list(files)) == files
+
+def test_github_publisher_get_published_contents():
+    """Test reading files in one GraphQL query, fetching truncated blobs in full"""
+    repo = MagicMock()
+    repo.full_name = 'digital-land/specification'
+    repo._requester.base_url = 'https://api.github.com'
+    repo._requester.requestJsonAndCheck.return_value = ({}, {'data': {'repository': {
+        'file0': {'oid': 'a1', 'text': FILES['content/specification/article-4-direction.md'], 'isTruncated': False},
+        'file1': {'oid': 'b2', 'text': None, 'isTruncated': True},
+        'file2': None,
+    }}})
+    repo.get_git_blob.return_value.content = 'LS0tCmJpZzogdHJ1ZQotLS0K'
+
+    contents = GitHubPublisher(repo).get_published_contents('abc123', [*FILES, 'content/specification/missing.md'])
+
+    assert contents == {
+        'content/specification/article-4-direction.md': FILES['content/specification/article-4-direction.md'],
+        'content/specification/listed-building.md': '---\nbig: true\n---\n',
+    }
+    repo._requester.requestJsonAndCheck.assert_called_once()
+    method, url = repo._requester.requestJsonAndCheck.call_args.args
+    query = repo._requester.requestJsonAndCheck.call_args.kwargs['input']
+    assert (method, url) == ('POST', '/graphql')
+    assert query['variables'] == {'owner': 'digital-land', 'name': 'specification'}
+    assert 'file2: object(expression: "abc123:content/specification/missing.md")' in query['query']
+    repo.get_git_blob.assert_called_once_with('b2')
+
+def test_github_publisher_get_published_contents_enterprise():
+    """Test the GraphQL endpoint of GitHub Enterprise Server, in batches"""
+    repo = MagicMock()
+    repo.full_name = 'digital-land/specification'
+    repo._requester.base_url = 'https://github.example.com/api/v3'
+    repo._requester.requestJsonAndCheck.return_value = ({}, {'data': {'repository': {'file0': None}}})
+    publisher = GitHubPublisher(repo)
+    publisher.GRAPHQL_BATCH_SIZE = 1
+
+    assert publisher.get_published_contents('abc123', list(FILES)) == {}
+    assert repo._requester.requestJsonAndCheck.call_count == 2
+    assert repo._requester.requestJsonAndCheck.call_args.args[1] == 'https://github.example.com/api/graphql'
+
+def test_github_publisher_get_published_contents_error():
+    """Test that GraphQL errors are raised rather than read as missing files"""
+    repo = MagicMock()
+    repo.full_name = 'digital-land/specification'
+    repo._requester.base_url = 'https://api.github.com'
+    repo._requester.requestJsonAndCheck.return_value = ({}, {'errors': [{'message': 'Bad credentials'}]})
+
+    with pytest.raises(GithubException):
+        GitHubPublisher(repo).get_published_contents('abc123', list(FILES))
@@ -0,0 +1,167 @@
+import glob
+import pytest
+from io import StringIO
+from ruamel.yaml.comments import CommentedMap
+from ruamel.yaml.scalarstring import (
+    PlainScalarString,
+    LiteralScalarString,
+    SingleQuotedScalarString,
+    DoubleQuotedScalarString,
+)
+from src.specifications.serializer import FrontmatterSerializer, Unsupported, MAX_REMEMBERED
+from src.specifications.update_specifications import yaml, serializer, compile_schema, order_data
+
+SPECIFICATIONS = sorted(glob.glob('data/collections/specifications/*.yml'))
+
+def ruamel_dump(data):
+    buffer = StringIO()
+    yaml.dump(data, buffer)
+    return buffer.getvalue()
+
+@pytest.mark.parametrize('source', SPECIFICATIONS)
+def test_fast_dump_matches_ruamel_for_specifications(source):
+    """Test every specification is written by the fast path byte for byte as ruamel writes it"""
+    with open(source, 'r') as f:
+        data = order_data(yaml.load(f)['data'], compile_schema())
+
+    assert serializer.fast_dump(data) == ruamel_dump(data)
+
+def test_specifications_found():
+    """Test the golden tests have the collection to run over"""
+    assert len(SPECIFICATIONS) >= 5
+
+@pytest.mark.parametrize('value', [
+    'plain text',
+    '',
+    'true',
+    'null',
+    '~',
+    '2024-01-01',
+    '123',
+    '1.0.0',
+    '0x1F',
+    "it's",
+    'key: value',
+    'ends with colon:',
+    'http://example.com',
+    'not # a comment',
+    'a # comment',
+    '#hash',
+    '- dash',
+    '-dash',
+    '? question',
+    '---',
+    '...',
+    ' leading space',
+    'trailing space ',
+    '"quoted"',
+    'tab\there',
+    'carriage\rreturn',
+    'null\x00byte',
+    'unicode \u2019 \xe9 \U0001F600',
+    'bom \ufeff',
+    'next \x85 line',
+    'multi\nline\n',
+    'no trailing newline\nhere',
+    'keep\ntrailing\n\n',
+    '\nleading newline\n',
+    ' leading space\nblock\n',
+    'blank\n\nlines\n\n\nbetween\n',
+    'spaces  \n  around\n',
+    LiteralScalarString('literal\n'),
+    LiteralScalarString('one line'),
+    SingleQuotedScalarString('single'),
+    SingleQuotedScalarString("it's"),
+    SingleQuotedScalarString('paragraph\n\nand another\n'),
+    SingleQuotedScalarString('space \nbefore break'),
+    SingleQuotedScalarString('tab\t'),
+    DoubleQuotedScalarString('double "quoted" \\ escaped\n'),
+    DoubleQuotedScalarString('line\r\nbreaks\n'),
+    PlainScalarString('plain'),
+    PlainScalarString('plain\nlines'),
+    True,
+    False,
+    0,
+    -12,
+    None,
+])
+def test_fast_dump_matches_ruamel_for_scalars(value):
+    """Test each scalar style is chosen and written as ruamel would, at each nesting level"""
+    data = {
+        PlainScalarString('top'): value,
+        PlainScalarString('datasets'): [
+            {
+                PlainScalarString('dataset'): value,
+                PlainScalarString('fields'): [{PlainScalarString('field'): 'x', PlainScalarString('guidance'): value}],
+            },
+        ],
+        PlainScalarString('nested'): {PlainScalarString('value'): value},
+        PlainScalarString('list'): ['x', value] if value is not None and not isinstance(value, LiteralScalarString) else [],
+    }
+
+    try:
+        assert serializer.fast_dump(data) == ruamel_dump(data)
+    except Unsupported:
+        # Anything the fast path doesn't write itself is dumped by ruamel
+        assert serializer.dump(data) == ruamel_dump(data)
+
+def test_fast_dump_ends_document_after_kept_line_breaks():
+    """Test a final literal block keeping its trailing line breaks closes the document as ruamel does"""
+    data = {'guidance': 'text\n\n'}
+
+    assert serializer.fast_dump(data) == ruamel_dump(data)
+    assert serializer.fast_dump(data).endswith('...\n')
+
+@pytest.mark.parametrize('data', [
+    {'version': 1.5},
+    {'list': [['nested']]},
+    {'list': [LiteralScalarString('block\n')]},
+    {1: 'integer key'},
+    {'key: with colon': 'value'},
+    {'long': 'word ' * 1000},
+])
+def test_dump_falls_back_to_ruamel(data):
+    """Test data the fast path can't write is dumped by ruamel instead"""
+    with pytest.raises(Unsupported):
+        serializer.fast_dump(data)
+
+    assert serializer.dump(data) == ruamel_dump(data)
+
+def test_dump_falls_back_for_comments():
+    """Test round trip data carrying comments is dumped by ruamel, keeping them"""
+    data = yaml.load("name: Test  # comment\nversion: 1.0.0\n")
+
+    with pytest.raises(Unsupported):
+        serializer.fast_dump(data)
+    assert '# comment' in serializer.dump(data)
+
+def test_dump_plain_round_trip_containers():
+    """Test round trip mappings without comments are written by the fast path"""
+    data = CommentedMap([('name', 'Test'), ('fields', [CommentedMap([('field', 'a')])])])
+
+    assert serializer.fast_dump(data) == ruamel_dump(data)
+
+def test_width_follows_yaml_instance():
+    """Test lines are folded at the width of the YAML instance the serializer was made for"""
+    narrow = FrontmatterSerializer(yaml)
+    narrow.width = 20
+
+    with pytest.raises(Unsupported):
+        narrow.fast_dump({'description': 'a description longer than twenty characters'})
+
+def test_dump_block_nested():
+    """Test a mapping dumped at an indent is written as it is nested in a whole document"""
+    item = {'field': 'a', 'guidance': 'kept\n\n'}
+    whole = serializer.fast_dump({'fields': [{'field': 'z'}, item]})
+
+    text, open_ended = serializer.dump_block(item, 4, '  - ')
+    assert whole.endswith(text + '...\n')
+    assert open_ended
+    assert serializer.dump_block({'field': 'a'}, 4, '  - ') == ('  - field: a\n', False)
+
+def test_remembered_strings_bounded():
+    """Test the strings whose type is remembered don't grow with everything dumped"""
+    fresh = FrontmatterSerializer(yaml)
+    fresh.fast_dump({f"key-{index}": f"value {index}" for index in range(MAX_REMEMBERED * 2)})
+
+    assert len(fresh._resolves_to_str) <= MAX_REMEMBERED
@@ -0,0 +1,98 @@
+import pytest
+from io import StringIO
+from benchmarks.synthetic import write_collection
+from src.specifications.serializer import Unsupported
+from src.specifications.update_specifications import load_config, compile_schema, render_file, get_render_jobs
+from src.specifications.discovery import get_exported_collections
+from src.specifications.streaming import stream_render, render_to_file, render_to_directory
+
+CONFIG = load_config()
+JOBS = get_render_jobs(CONFIG, get_exported_collections(CONFIG))
+SCHEMA = compile_schema(CONFIG)
+
+def read(path):
+    # Rendered bodies can hold carriage returns, which reading with universal newlines would change
+    with open(path, 'r', newline='') as f:
+        return f.read()
+
+def stream(source, schema=SCHEMA, body_field=None):
+    out = StringIO()
+    stream_render(str(source), schema, out, body_field)
+    return out.getvalue()
+
+@pytest.mark.parametrize('source, destination, schema, body_field', JOBS, ids=[job[1] for job in JOBS])
+def test_stream_matches_render_file(source, destination, schema, body_field):
+    """Test every exported source streams byte for byte as render_file renders it"""
+    assert stream(source, schema, body_field) == render_file(source, schema, body_field)
+
+def test_stream_synthetic_collection(tmp_path):
+    """Test streaming synthetic specifications with several datasets"""
+    mapping = write_collection(str(tmp_path), specifications=3, datasets=2, fields=4)
+
+    # The first has a github-discussion of 0, which loads as a ScalarInt and is rendered whole
+    for source in list(mapping)[1:]:
+        assert stream(source) == render_file(source, SCHEMA)
+
+@pytest.mark.parametrize('name, content', [
+    ('indentless sequences', "data:\n  datasets:\n  - dataset: a\n    fields:\n    - field: b\n  name: A\n"),
+    ('kept line breaks at the end', "data:\n  name: A\n  datasets:\n    - dataset: a\n      fields:\n"
+                                    "        - field: b\n          guidance: |+\n            kept\n\n"),
+    ('kept line breaks before a key', "data:\n  datasets:\n    - fields:\n        - guidance: |+\n"
+                                      "            kept\n\n          field: b\n      dataset: a\n  name: A\n"),
+    ('trailing spaces at the end', "data:\n  name: A\n  plural: |\n    As  \n"),
+    ('comment after a value', "data:\n  name: A  # the name\n  datasets:  # each dataset\n    - dataset: a\n"),
+    ('flow sequence', "data:\n  datasets: [{name: b, dataset: a}]\n  name: A\n"),
+    ('empty values', "data:\n  name:\n  datasets:\n  plural: ~\n"),
+    ('hash in a literal block', "data:\n  plural: |\n    # not a comment\n    As\n  name: A\n"),
+    ('multi-line plain scalar', "data:\n  plural: one\n    two\n\n    three\n  name: A\n"),
+])
+def test_stream_layouts(tmp_path, name, content):
+    """Test sources laid out in other ways still stream as render_file renders them"""
+    source = tmp_path / 'source.yml'
+    source.write_text(content)
+
+    assert stream(source) == render_file(str(source), SCHEMA)
+
+@pytest.mark.parametrize('name, content', [
+    ('comment between keys', "data:\n  name: A\n  # note\n  plural: As\n"),
+    ('alias', "data:\n  name: &name A\n  plural: *name\n"),
+    ('carriage returns', "data:\r\n  name: A\r\n"),
+    ('quoted key', "data:\n  'name': A\n"),
+    ('duplicate key', "data:\n  name: A\n  name: B\n"),
+    ('no fields in the schema', "data:\n  other: A\n"),
+    ('document start', "---\ndata:\n  name: A\n"),
+])
+def test_unsupported_rendered_whole(tmp_path, name, content):
+    """Test sources streaming can't be sure of are rendered whole instead"""
+    source = tmp_path / 'source.yml'
+    source.write_text(content, newline='')
+    with pytest.raises(Unsupported):
+        stream(source)
+
+    destination = tmp_path / 'source.md'
+    try:
+        expected = render_file(str(source), SCHEMA)
+    except Exception as e:
+        with pytest.raises(type(e)):
+            render_to_file(str(source), str(destination), SCHEMA)
+    else:
+        assert render_to_file(str(source), str(destination), SCHEMA) is False
+        assert read(destination) == expected
+
+def test_render_to_file_streams(tmp_path):
+    """Test a source streaming supports is written without rendering it whole"""
+    source, destination, schema, body_field = JOBS[0]
+    path = tmp_path / 'rendered.md'
+
+    assert render_to_file(source, str(path), schema, body_field) is True
+    assert read(path) == render_file(source, schema, body_field)
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_render_to_directory(tmp_path, workers):
+    """Test rendering jobs into a directory, serially or across processes"""
+    streamed = render_to_directory(JOBS, str(tmp_path), workers=workers)
+
+    assert list(streamed) == [destination for _, destination, _, _ in JOBS]
+    assert all(streamed.values())
+    for source, destination, schema, body_field in JOBS:
+        assert read(tmp_path / destination) == render_file(source, schema, body_field)
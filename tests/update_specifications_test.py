@@ -1,5 +1,16 @@
 import os
+import copy
 import pytest
+from src.specifications.journal import SyncJournal
+from src.specifications.publishers import (
+    GitHubPublisher,
+    DirectoryPublisher,
+    GitPublisher,
+    git,
+    git_blob_sha,
+    add_source_commit_trailer,
+    commit_files_in_branch,
+)
 from unittest.mock import patch, MagicMock
 from datetime import datetime
 from ruamel.yaml import YAML
@@ -13,9 +24,27 @@ from src.specifications.update_specifications import (
     get_data_order,
     get_dataset_field_order,
     get_field_property_order,
+    compile_schema,
+    load_config,
     update_files_in_branch,
+    render_files,
+    get_changed_files,
+    get_changed_sources,
+    get_last_synced_commit,
     create_pull_request,
-    REPO_NAME
+    sync_specifications,
+    get_source_commit,
+    yaml,
+    safe_yaml,
+    render_file,
+    dump_frontmatter,
+    get_file_mapping,
+    get_targets,
+    describe_collections,
+    render_collections,
+    get_branch_name,
+    get_branch_prefix,
+    REPO_NAME,
 )
 
 # Test data
@@ -48,6 +77,7 @@ MOCK_CONFIG = {
     'collections': [
         {
             'id': 'specifications',
+            'export': {'destination': 'content/specification/{name}.md'},
             'fields': [
                 {'id': 'specification'},
                 {'id': 'name'},
@@ -548,7 +578,480 @@ def test_update_files_in_branch(mock_yaml_dump, mock_yaml_load, mock_open, mock_
     mock_repo.get_contents.assert_called()
     mock_repo.update_file.assert_called()
 
-@patch('src.specifications.update_specifications.Github')
+def test_compile_schema():
+    """Test compiling the ordering for every nesting level from a single config"""
+    schema = compile_schema(MOCK_CONFIG)
+
+    assert schema.order == ['specification', 'name', 'plural', 'specification-status', 'start-date',
+                            'end-date', 'entry-date', 'github-discussion', 'version', 'datasets']
+    assert schema.get(['datasets']).order == ['dataset', 'name', 'fields']
+    assert schema.get(['datasets', 'fields']).order == ['field', 'description', 'guidance']
+    assert schema.get(['missing']).order == []
+    assert compile_schema(MOCK_CONFIG, 'missing').order == []
+
+def test_update_files_in_branch_parses_config_once(mock_repo, mock_file):
+    """Test that a run parses the config once however many files and fields there are"""
+    mock_repo.get_contents.return_value = mock_file
+
+    with patch('src.specifications.update_specifications.load_config', wraps=load_config) as mock_load_config:
+        update_files_in_branch(mock_repo, 'test-branch')
+
+    mock_load_config.assert_called_once()
+    assert mock_repo.update_file.call_count == 5
+
+def test_update_files_in_branch_batch(mock_repo):
+    """Test that batch mode publishes every file in a single commit"""
+    mock_repo.create_git_commit.return_value.sha = 'new_sha'
+
+    update_files_in_branch(mock_repo, 'test-branch', batch=True)
+
+    # No per-file Contents API calls
+    mock_repo.get_contents.assert_not_called()
+    mock_repo.update_file.assert_not_called()
+    mock_repo.create_file.assert_not_called()
+
+    # One tree containing every destination and one commit
+    mock_repo.create_git_tree.assert_called_once()
+    tree = mock_repo.create_git_tree.call_args[0][0]
+    assert [element._InputGitTreeElement__path for element in tree] == [
+        'content/specification/article-4-direction.md',
+        'content/specification/brownfield-land.md',
+        'content/specification/conservation-area.md',
+        'content/specification/listed-building.md',
+        'content/specification/tree-preservation-order.md'
+    ]
+    mock_repo.create_git_commit.assert_called_once()
+    mock_repo.get_git_ref.assert_called_once_with('heads/test-branch')
+    mock_repo.get_git_ref.return_value.edit.assert_called_once_with(sha='new_sha')
+
+def test_commit_files_in_branch_api_calls_constant(mock_repo):
+    """Test that the number of API calls doesn't grow with the number of files"""
+    files = {f"content/specification/spec-{i}.md": f"---\nspecification: spec-{i}\n---\n" for i in range(50)}
+
+    commit_files_in_branch(mock_repo, 'test-branch', files)
+
+    assert len(mock_repo.method_calls) == 4
+    assert len(mock_repo.create_git_tree.call_args[0][0]) == 50
+
+def test_git_blob_sha():
+    """Test that the blob SHA matches `git hash-object`"""
+    assert git_blob_sha("hello\n") == 'ce013625030ba8dba906f756967f9e9ca394464a'
+
+def test_get_changed_files(mock_repo):
+    """Test that only files differing from the published tree are returned"""
+    files = {
+        'content/specification/unchanged.md': '---\nname: unchanged\n---\n',
+        'content/specification/changed.md': '---\nname: changed\n---\n',
+        'content/specification/new.md': '---\nname: new\n---\n'
+    }
+    mock_repo.get_git_tree.return_value.tree = [
+        MagicMock(path='content/specification/unchanged.md', type='blob', sha=git_blob_sha('---\nname: unchanged\n---\n')),
+        MagicMock(path='content/specification/changed.md', type='blob', sha=git_blob_sha('---\nname: old\n---\n')),
+        MagicMock(path='content/specification', type='tree', sha='tree_sha')
+    ]
+
+    changed = get_changed_files(GitHubPublisher(mock_repo), 'main_sha', files)
+
+    mock_repo.get_git_tree.assert_called_once_with('main_sha', recursive=True)
+    assert list(changed.keys()) == ['content/specification/changed.md', 'content/specification/new.md']
+
+@patch('github.Github')
+def test_create_pull_request_nothing_changed(mock_github_class):
+    """Test that no branch or pull request is created when nothing has changed"""
+    mock_repo = MagicMock()
+    mock_github_class.return_value.get_repo.return_value = mock_repo
+    mock_repo.get_git_tree.return_value.tree = [
+        MagicMock(path=destination, type='blob', sha=git_blob_sha(content))
+        for destination, content in render_files().items()
+    ]
+
+    pr = create_pull_request('test_token', 'Test PR', 'Test body')
+
+    assert pr is None
+    mock_repo.create_git_ref.assert_not_called()
+    mock_repo.create_git_tree.assert_not_called()
+    mock_repo.create_pull.assert_not_called()
+
+def test_add_source_commit_trailer():
+    """Test recording the source commit as a commit message trailer"""
+    assert add_source_commit_trailer('Update', 'abc123') == 'Update\n\nMini-CMS-Source-Commit: abc123'
+    assert add_source_commit_trailer('Update', None) == 'Update'
+
+def test_get_last_synced_commit(mock_repo):
+    """Test finding the source commit of the last sync from commit trailers"""
+    mock_repo.get_commits.return_value = [
+        MagicMock(commit=MagicMock(message='Fix typo')),
+        MagicMock(commit=MagicMock(message='Update specifications\n\nMini-CMS-Source-Commit: abc123')),
+        MagicMock(commit=MagicMock(message='Update specifications\n\nMini-CMS-Source-Commit: older'))
+    ]
+
+    assert get_last_synced_commit(GitHubPublisher(mock_repo)) == 'abc123'
+    mock_repo.get_commits.assert_called_once_with(sha='main', path='content/specification')
+
+def test_get_last_synced_commit_not_found(mock_repo):
+    """Test that no source commit is found when there is no previous sync"""
+    mock_repo.get_commits.return_value = [MagicMock(commit=MagicMock(message='Fix typo'))]
+
+    assert get_last_synced_commit(GitHubPublisher(mock_repo)) is None
+
+def test_get_changed_sources():
+    """Test diffing sources against a commit of this repository"""
+    # Nothing has changed since HEAD
+    assert get_changed_sources('HEAD') == set()
+
+    # Unknown commits fall back to rendering everything
+    assert get_changed_sources('0' * 40) is None
+
+@patch('src.specifications.update_specifications.get_changed_sources')
+@patch('src.specifications.update_specifications.get_last_synced_commit')
+@patch('github.Github')
+def test_create_pull_request_incremental(mock_github_class, mock_get_last_synced_commit, mock_get_changed_sources):
+    """Test that incremental mode only renders and publishes sources changed since the last sync"""
+    mock_repo = MagicMock()
+    mock_github_class.return_value.get_repo.return_value = mock_repo
+    mock_get_last_synced_commit.return_value = 'abc123'
+    mock_get_changed_sources.return_value = {'data/collections/specifications/listed-building.yml'}
+
+    create_pull_request('test_token', 'Test PR', 'Test body', incremental=True)
+
+    mock_get_changed_sources.assert_called_once_with('abc123', mapping=get_file_mapping())
+    tree = mock_repo.create_git_tree.call_args[0][0]
+    assert [element._InputGitTreeElement__path for element in tree] == ['content/specification/listed-building.md']
+    message = mock_repo.create_git_commit.call_args[0][0]
+    assert 'Mini-CMS-Source-Commit: ' in message
+
+def test_render_files_parallel_matches_serial():
+    """Test that rendering across a process pool gives the same output in the same order"""
+    serial = render_files()
+    parallel = render_files(workers=2)
+
+    assert list(parallel.keys()) == list(serial.keys())
+    assert parallel == serial
+
+def test_render_files_parallel_error():
+    """Test that a failure in a worker is raised"""
+    mapping = {'data/collections/specifications/missing.yml': 'content/specification/missing.md'}
+    with pytest.raises(FileNotFoundError):
+        render_files(workers=2, mapping=mapping)
+
+def test_load_config_safe_loader():
+    """Test the config is read with the safe loader into plain dicts, compiling the same schema"""
+    config = load_config()
+    round_trip = YAML()
+    with open('config.yml', 'r') as f:
+        round_trip_config = round_trip.load(f)
+
+    assert type(config) is dict
+    assert config == round_trip_config
+    assert compile_schema(config).get(['datasets', 'fields']).order == \
+        compile_schema(round_trip_config).get(['datasets', 'fields']).order
+
+def test_render_files_unchanged_by_safe_config_loader():
+    """Test the rendered markdown is the same as with the config loaded round trip"""
+    round_trip = YAML()
+    with open('config.yml', 'r') as f:
+        round_trip_schema = compile_schema(round_trip.load(f))
+
+    rendered = render_files()
+
+    assert rendered == render_files(schema=round_trip_schema)
+    for source, destination in get_file_mapping().items():
+        with open(source, 'r') as f:
+            data = order_data(yaml.load(f)['data'], round_trip_schema)
+        buffer = StringIO()
+        yaml.dump(data, buffer)
+        assert rendered[destination] == f"---\n{buffer.getvalue().strip()}\n---\n"
+
+def test_render_sources_need_round_trip_loader():
+    """Test source files are loaded round trip, as their quoting is carried into the markdown"""
+    source = 'data/collections/specifications/article-4-direction.yml'
+    schema = compile_schema()
+    with open(source, 'r') as f:
+        safe_data = order_data(safe_yaml.load(f)['data'], schema)
+
+    assert render_file(source, schema) != dump_frontmatter(safe_data)
+
+def test_get_file_mapping():
+    """Test the specifications are discovered from the export in config.yml"""
+    assert get_file_mapping() == {
+        "data/collections/specifications/article-4-direction.yml": "content/specification/article-4-direction.md",
+        "data/collections/specifications/brownfield-land.yml": "content/specification/brownfield-land.md",
+        "data/collections/specifications/conservation-area.yml": "content/specification/conservation-area.md",
+        "data/collections/specifications/listed-building.yml": "content/specification/listed-building.md",
+        "data/collections/specifications/tree-preservation-order.yml": "content/specification/tree-preservation-order.md"
+    }
+
+def test_get_file_mapping_not_exported():
+    """Test that a collection without an export can't be mapped"""
+    with pytest.raises(ValueError):
+        get_file_mapping({'collections': [{'id': 'guidance_pages'}]}, 'guidance_pages')
+
+def test_sync_specifications_local(tmp_path):
+    """Test a full export to a local directory and that a rerun finds nothing changed"""
+    publisher = DirectoryPublisher(str(tmp_path))
+
+    pr = sync_specifications(publisher, 'test-branch', 'Test PR', 'Test body')
+
+    assert pr.html_url == f"file://{tmp_path}"
+    assert sorted(os.listdir(tmp_path / 'content' / 'specification')) == [
+        'article-4-direction.md',
+        'brownfield-land.md',
+        'conservation-area.md',
+        'listed-building.md',
+        'tree-preservation-order.md'
+    ]
+    assert (tmp_path / 'content' / 'specification' / 'listed-building.md').read_text() == \
+        render_files()['content/specification/listed-building.md']
+
+    assert sync_specifications(publisher, 'test-branch', 'Test PR', 'Test body') is None
+
+@pytest.fixture
+def specification_repo(tmp_path):
+    """A bare git repository with a main branch to sync to, and a copy of one source to edit"""
+    work = tmp_path / 'work'
+    bare = tmp_path / 'specification.git'
+    git('init', '-q', '-b', 'main', str(work))
+    (work / 'README.md').write_text('# Specification\n')
+    git('add', 'README.md', cwd=work)
+    git('-c', 'user.name=Test', '-c', 'user.email=test@example.com', 'commit', '-q', '-m', 'Initial commit', cwd=work)
+    git('clone', '-q', '--bare', str(work), str(bare))
+
+    source = tmp_path / 'listed-building.yml'
+    with open('data/collections/specifications/listed-building.yml') as f:
+        source.write_text(f.read())
+
+    with patch('src.specifications.update_specifications.get_file_mapping',
+               return_value={str(source): 'content/specification/listed-building.md'}):
+        yield GitPublisher(str(bare)), source
+
+def test_sync_specifications_reuses_open_pull_request(specification_repo):
+    """Test that an open mini-cms pull request is updated instead of a new one being opened"""
+    publisher, source = specification_repo
+    main_sha = publisher.get_branch_sha('main')
+
+    first = sync_specifications(publisher, 'mini-cms/update-specifications-1', 'First', 'First body',
+                                reuse_pull_request=True)
+    assert first.head.ref == 'mini-cms/update-specifications-1'
+
+    # Nothing new to publish, so the branch isn't touched
+    first_sha = publisher.get_branch_sha('mini-cms/update-specifications-1')
+    again = sync_specifications(publisher, 'mini-cms/update-specifications-2', 'Second', 'Second body',
+                                reuse_pull_request=True)
+    assert again.number == first.number
+    assert publisher.get_branch_sha('mini-cms/update-specifications-1') == first_sha
+
+    # A new edit rebuilds the existing branch as a single commit on main and refreshes the body
+    source.write_text(source.read_text().replace('Listed building outlines', 'Listed building boundaries'))
+    updated = sync_specifications(publisher, 'mini-cms/update-specifications-3', 'Third', 'Third body',
+                                  reuse_pull_request=True)
+
+    assert updated.number == first.number
+    [pr_body] = [pr.body for pr in publisher.get_pull_requests()]
+    assert pr_body.startswith('Third body\n\n### Changes\n')
+    branch_sha = publisher.get_branch_sha('mini-cms/update-specifications-1')
+    assert git('rev-list', '--count', f"{main_sha}..{branch_sha}", cwd=publisher.path) == '1'
+    assert 'Listed building boundaries' in git('show', f"{branch_sha}:content/specification/listed-building.md",
+                                               cwd=publisher.path)
+    for branch in ('mini-cms/update-specifications-2', 'mini-cms/update-specifications-3'):
+        with pytest.raises(Exception):
+            publisher.get_branch_sha(branch)
+
+def test_sync_specifications_reuse_closes_reverted_pull_request(specification_repo):
+    """Test that an open pull request is closed when its changes are reverted in the sources"""
+    publisher, source = specification_repo
+    publisher.publish('main', render_files())
+    original = source.read_text()
+
+    source.write_text(original.replace('Listed building outlines', 'Listed building boundaries'))
+    first = sync_specifications(publisher, 'mini-cms/update-specifications-1', 'First', 'First body',
+                                reuse_pull_request=True)
+    assert first.state == 'open'
+
+    source.write_text(original)
+    assert sync_specifications(publisher, 'mini-cms/update-specifications-2', 'Second', 'Second body',
+                               reuse_pull_request=True) is None
+
+    assert [pr.state for pr in publisher.get_pull_requests()] == ['closed']
+    assert publisher.find_pull_request(get_branch_prefix()) is None
+
+def test_sync_specifications_reuse_ignores_other_collections(specification_repo):
+    """Test that a sync doesn't take over the open pull request of another set of collections"""
+    publisher, _ = specification_repo
+    main_sha = publisher.get_branch_sha('main')
+    publisher.create_branch('mini-cms/update-guidance_pages-1', main_sha)
+    publisher.publish('mini-cms/update-guidance_pages-1', {'content/guidance/get-help.md': '---\nid: get-help\n---\n'})
+    guidance = publisher.create_pull_request(title='Guidance', body='Guidance body',
+                                             head='mini-cms/update-guidance_pages-1', base='main')
+    guidance_sha = publisher.get_branch_sha('mini-cms/update-guidance_pages-1')
+
+    pr = sync_specifications(publisher, get_branch_name(datetime(2024, 1, 2, 3, 4, 5)), 'Title', 'Body',
+                             reuse_pull_request=True)
+
+    assert pr.number != guidance.number
+    assert pr.head.ref == 'mini-cms/update-specifications-2024-01-02--03-04-05'
+    assert publisher.get_branch_sha('mini-cms/update-guidance_pages-1') == guidance_sha
+
+def test_sync_specifications_describes_changes(specification_repo):
+    """Test that the pull request body lists the datasets and fields changed from main"""
+    publisher, source = specification_repo
+    publisher.publish('main', render_files())
+
+    source.write_text(
+        source.read_text()
+        .replace('Listed building outlines', 'Listed building boundaries')
+        .replace('Example: `1480524`', 'Example: `1024710`')
+    )
+    pr = sync_specifications(publisher, 'mini-cms/first', 'First', 'First body')
+
+    assert pr.body == (
+        'First body\n\n### Changes\n\n'
+        '- **`content/specification/listed-building.md`**\n'
+        '  - Changed `plural`\n'
+        '  - Dataset `listed-building-outline` changed\n'
+        '    - Field `listed-building` changed\n'
+        '      - Changed `guidance`'
+    )
+
+def test_sync_specifications_new_pull_request_without_reuse(specification_repo):
+    """Test that without reuse every sync with changes opens a new pull request"""
+    publisher, source = specification_repo
+
+    sync_specifications(publisher, 'mini-cms/first', 'First', 'First body')
+    source.write_text(source.read_text().replace('Listed building outlines', 'Listed building boundaries'))
+    second = sync_specifications(publisher, 'mini-cms/second', 'Second', 'Second body')
+
+    assert second.number == 2
+    assert [pr.head.ref for pr in publisher.get_pull_requests()] == ['mini-cms/first', 'mini-cms/second']
+
+@pytest.fixture
+def two_specification_repo(specification_repo, tmp_path):
+    """The specification repository, syncing two specifications"""
+    publisher, source = specification_repo
+    other = tmp_path / 'article-4-direction.yml'
+    with open('data/collections/specifications/article-4-direction.yml') as f:
+        other.write_text(f.read())
+
+    with patch('src.specifications.update_specifications.get_file_mapping', return_value={
+        str(other): 'content/specification/article-4-direction.md',
+        str(source): 'content/specification/listed-building.md',
+    }):
+        yield publisher
+
+def test_sync_specifications_resumes_from_journal(two_specification_repo, tmp_path):
+    """Test that a rerun after a failure publishes the rest to the same branch and opens one pull request"""
+    publisher = two_specification_repo
+    journal = SyncJournal(str(tmp_path / 'journal.json'))
+    commit = publisher._commit
+    calls = []
+
+    def fail_second_commit(*args, **kwargs):
+        calls.append(list(args[1]))
+        if len(calls) == 2:
+            raise RuntimeError("connection reset")
+        return commit(*args, **kwargs)
+
+    with patch.object(publisher, '_commit', side_effect=fail_second_commit):
+        with pytest.raises(RuntimeError):
+            sync_specifications(publisher, 'mini-cms/first', 'First', 'First body', batch=False, journal=journal)
+    assert publisher.get_pull_requests() == []
+
+    with patch.object(publisher, '_commit', side_effect=fail_second_commit):
+        pr = sync_specifications(publisher, 'mini-cms/second', 'Second', 'Second body', batch=False,
+                                 journal=SyncJournal(journal.path))
+
+    # Only the file that failed is published again, to the first branch
+    assert calls == [
+        ['content/specification/article-4-direction.md'],
+        ['content/specification/listed-building.md'],
+        ['content/specification/listed-building.md'],
+    ]
+    assert pr.head.ref == 'mini-cms/first'
+    assert [pr.head.ref for pr in publisher.get_pull_requests()] == ['mini-cms/first']
+    assert git('rev-list', '--count', 'main..mini-cms/first', cwd=publisher.path) == '2'
+    with pytest.raises(Exception):
+        publisher.get_branch_sha('mini-cms/second')
+    assert SyncJournal(journal.path).entries == {}
+
+def test_sync_specifications_journal_pull_request_failed(two_specification_repo, tmp_path):
+    """Test that a rerun after the pull request failed to open publishes nothing and opens it"""
+    publisher = two_specification_repo
+    journal = SyncJournal(str(tmp_path / 'journal.json'))
+
+    with patch.object(publisher, 'create_pull_request', side_effect=RuntimeError("rate limited")):
+        with pytest.raises(RuntimeError):
+            sync_specifications(publisher, 'mini-cms/first', 'First', 'First body', journal=journal)
+    branch_sha = publisher.get_branch_sha('mini-cms/first')
+
+    pr = sync_specifications(publisher, 'mini-cms/second', 'Second', 'Second body', journal=journal)
+
+    assert pr.head.ref == 'mini-cms/first'
+    assert publisher.get_branch_sha('mini-cms/first') == branch_sha
+
+def test_sync_specifications_journal_ignores_collection_order(specification_repo, tmp_path):
+    """Test that a rerun resumes from the journal with the same collections given in another order"""
+    publisher, _ = specification_repo
+    journal = SyncJournal(str(tmp_path / 'journal.json'))
+    config = export_everything(load_config())
+    mapping = {
+        'specifications': {'data/collections/specifications/listed-building.yml': 'content/specification/listed-building.md'},
+        'guidance_pages': {'data/collections/guidance_pages/get-help.yml': 'content/guidance/get-help.md'},
+    }
+
+    with patch('src.specifications.update_specifications.get_file_mapping',
+               side_effect=lambda config, collection_id: mapping[collection_id]):
+        with patch.object(publisher, 'create_pull_request', side_effect=RuntimeError("rate limited")):
+            with pytest.raises(RuntimeError):
+                sync_specifications(publisher, 'mini-cms/first', 'First', 'First body', config=config,
+                                    collections=['specifications', 'guidance_pages'], journal=journal)
+
+        pr = sync_specifications(publisher, 'mini-cms/second', 'Second', 'Second body', config=config,
+                                 collections=['guidance_pages', 'specifications'], journal=journal)
+
+    assert pr.head.ref == 'mini-cms/first'
+    assert journal.entries == {}
+
+def test_sync_specifications_journal_not_resumed(two_specification_repo, tmp_path):
+    """Test that a journal from another source commit or for a deleted branch starts a new sync"""
+    publisher = two_specification_repo
+    journal = SyncJournal(str(tmp_path / 'journal.json'))
+    journal.start('specifications', 'some-other-commit', 'mini-cms/old')
+
+    pr = sync_specifications(publisher, 'mini-cms/first', 'First', 'First body', journal=journal)
+    assert pr.head.ref == 'mini-cms/first'
+    assert journal.entries == {}
+
+    journal.start('specifications', get_source_commit(), 'mini-cms/deleted')
+    pr = sync_specifications(publisher, 'mini-cms/second', 'Second', 'Second body', journal=journal)
+    assert pr.head.ref == 'mini-cms/second'
+
+def test_github_publisher_find_pull_request():
+    """Test finding an open mini-cms pull request, ignoring other branches and forks"""
+    repo = MagicMock()
+    repo.full_name = 'digital-land/specification'
+    other = MagicMock()
+    other.head.ref = 'feature/something'
+    fork = MagicMock()
+    fork.head.ref = 'mini-cms/update-specifications-fork'
+    fork.head.repo.full_name = 'someone/specification'
+    ours = MagicMock()
+    ours.head.ref = 'mini-cms/update-specifications-2025-01-01--00-00-00'
+    ours.head.repo.full_name = 'digital-land/specification'
+    repo.get_pulls.return_value = [other, fork, ours]
+
+    assert GitHubPublisher(repo).find_pull_request('mini-cms/') is ours
+    repo.get_pulls.assert_called_once_with(state='open', base='main')
+
+def test_github_publisher_publish_on_base():
+    """Test that publishing on a base commit force-updates the branch"""
+    repo = MagicMock()
+    repo.create_git_commit.return_value.sha = 'new_sha'
+
+    GitHubPublisher(repo).publish('mini-cms/test', {'a.md': 'a'}, base='main_sha')
+
+    repo.get_git_commit.assert_called_once_with('main_sha')
+    repo.get_git_ref.return_value.edit.assert_called_once_with(sha='new_sha', force=True)
+
+@patch('github.Github')
 def test_create_pull_request(mock_github_class):
     """Test creating a pull request"""
     # Setup mock GitHub instance
@@ -585,7 +1088,7 @@ def test_create_pull_request(mock_github_class):
     mock_repo.create_pull.assert_called_once()
     assert pr.html_url == 'https://github.com/test/pr'
 
-@patch('src.specifications.update_specifications.Github')
+@patch('github.Github')
 def test_create_pull_request_no_token(mock_github_class):
     """Test creating a pull request without token"""
     # Setup mock to raise BadCredentialsException when None token is used
@@ -596,4 +1099,91 @@ def test_create_pull_request_no_token(mock_github_class):
     with pytest.raises(BadCredentialsException) as exc_info:
         create_pull_request(None, 'Test PR', 'Test body')
 
-    assert 'Bad credentials' in str(exc_info.value)
\ No newline at end of file
+    assert 'Bad credentials' in str(exc_info.value)
+def test_get_branch_name():
+    """Test sync branches are named after their collections, in the same order whichever order they're given in"""
+    now = datetime(2024, 1, 2, 3, 4, 5)
+
+    assert get_branch_name(now) == 'mini-cms/update-specifications-2024-01-02--03-04-05'
+    assert get_branch_name(now, ['specifications', 'guidance_pages']) == \
+        'mini-cms/update-guidance_pages+specifications-2024-01-02--03-04-05'
+    assert get_branch_prefix(['guidance_pages', 'specifications']) == 'mini-cms/update-guidance_pages+specifications-'
+    assert not get_branch_name(now, ['specifications', 'data_design']).startswith(get_branch_prefix())
+
+def test_get_targets():
+    """Test collections are grouped by repository, defaulting to the specification repository"""
+    config = {
+        'collections': [
+            {'id': 'specifications', 'export': {'destination': 'content/specification/{name}.md'}},
+            {'id': 'guidance_pages', 'export': {'destination': 'content/{name}.md', 'repository': 'example/site'}},
+            {'id': 'data_design', 'export': {'destination': 'content/events/{name}.md'}},
+            {'id': 'drafts'},
+        ]
+    }
+
+    assert get_targets(config) == {REPO_NAME: ['specifications', 'data_design'], 'example/site': ['guidance_pages']}
+    assert get_targets(config, ['guidance_pages']) == {'example/site': ['guidance_pages']}
+    with pytest.raises(ValueError):
+        get_targets(config, ['drafts'])
+
+def test_describe_collections():
+    """Test collections are described by their labels"""
+    assert describe_collections(load_config(), ['specifications']) == 'specifications'
+    assert describe_collections(load_config(), ['guidance_pages', 'data_design']) == \
+        'guidance pages, data design collections'
+
+def export_everything(config):
+    """A copy of the config that exports the guidance pages and data design too, as a site might"""
+    config = copy.deepcopy(config)
+    exports = {
+        'guidance_pages': {'destination': 'content/guidance/{name}.md', 'body': 'body'},
+        'data_design': {'destination': 'content/data-design/{name}.md'},
+    }
+    for collection in config['collections']:
+        if collection['id'] in exports:
+            collection['export'] = exports[collection['id']]
+    return config
+
+def test_render_collections():
+    """Test every exported collection renders with its own schema, and guidance pages have a markdown body"""
+    config = export_everything(load_config())
+
+    files = render_collections(config, ['specifications', 'guidance_pages', 'data_design'], workers=2)
+
+    assert {path.split('/')[1] for path in files} == {'specification', 'guidance', 'data-design'}
+    assert files['content/specification/listed-building.md'] == render_files()['content/specification/listed-building.md']
+    assert files['content/guidance/get-help.md'].startswith("---\nid: get-help\ntitle: Get help\n---\n\nIf you need any help")
+    assert files['content/data-design/events.md'].startswith("---\nid: events\nname: Data Design Events\nevents:\n  - id: ")
+
+def test_sync_specifications_several_collections_one_commit(specification_repo):
+    """Test collections published to the same target share one commit and pull request"""
+    publisher, _ = specification_repo
+    main_sha = publisher.get_branch_sha('main')
+    mapping = {
+        'specifications': {'data/collections/specifications/listed-building.yml': 'content/specification/listed-building.md'},
+        'guidance_pages': {'data/collections/guidance_pages/get-help.yml': 'content/guidance/get-help.md'},
+    }
+
+    with patch('src.specifications.update_specifications.get_file_mapping',
+               side_effect=lambda config, collection_id: mapping[collection_id]):
+        pr = sync_specifications(publisher, 'mini-cms/all', 'Title', 'Body', collections=list(mapping),
+                                 config=export_everything(load_config()))
+
+    branch_sha = publisher.get_branch_sha(pr.head.ref)
+    assert git('rev-list', '--count', f"{main_sha}..{branch_sha}", cwd=publisher.path) == '1'
+    assert git('ls-tree', '-r', '--name-only', branch_sha, 'content', cwd=publisher.path).splitlines() == [
+        'content/guidance/get-help.md',
+        'content/specification/listed-building.md',
+    ]
+
+def test_sync_specifications_schema_gate(specification_repo):
+    """Test nothing is published when a source doesn't match the schema in config.yml"""
+    publisher, source = specification_repo
+    source.write_text(source.read_text().replace('  specification: listed-building\n', ''))
+
+    with pytest.raises(ValueError):
+        sync_specifications(publisher, 'mini-cms/invalid', 'Title', 'Body')
+    with pytest.raises(Exception):
+        publisher.get_branch_sha('mini-cms/invalid')
+
+    assert sync_specifications(publisher, 'mini-cms/unchecked', 'Title', 'Body', check_schema=False) is not None
@@ -0,0 +1,155 @@
+from datetime import date
+from src.specifications.validator import (
+    Violation,
+    Checker,
+    compile_validator,
+    get_collection_id,
+    validate,
+    validate_file,
+    get_errors,
+    main,
+)
+from src.specifications.update_specifications import load_config
+
+CONFIG = {
+    'collections': [
+        {
+            'id': 'specifications',
+            'fields': [
+                {'id': 'specification', 'type': 'string', 'required': True},
+                {'id': 'start-date', 'type': 'date'},
+                {'id': 'datasets', 'type': 'repeatable', 'fields': [
+                    {'id': 'dataset', 'type': 'string', 'required': True},
+                    {'id': 'fields', 'type': 'repeatable', 'fields': [
+                        {'id': 'field', 'type': 'string', 'required': True},
+                        {'id': 'guidance', 'type': 'govspeak'},
+                    ]},
+                ]},
+            ],
+        },
+        {
+            'id': 'events',
+            'fields': [
+                {'id': 'start_time', 'type': 'datetime'},
+                {'id': 'type', 'type': 'select', 'options': [{'value': 'general'}, {'value': 'working_group'}]},
+            ],
+        },
+    ]
+}
+
+def test_checker_valid():
+    """Test a source matching the schema has no violations"""
+    checker = compile_validator(CONFIG)['specifications']
+    data = {
+        'specification': 'test',
+        'start-date': '2024-01-01',
+        'datasets': [{'dataset': 'test', 'fields': [{'field': 'reference', 'guidance': 'Text\n'}]}],
+    }
+
+    assert list(checker.check(data, 'test.yml')) == []
+
+def test_checker_reports_key_paths():
+    """Test every violation is reported with the path of the key"""
+    checker = compile_validator(CONFIG)['specifications']
+    data = {
+        'start-date': '24/01/2024',
+        'unknown': 'value',
+        'datasets': [
+            {'dataset': 'ok'},
+            {'fields': [{'field': 'reference'}, {'guidance': ['not', 'text']}]},
+        ],
+    }
+
+    assert list(checker.check(data, 'test.yml')) == [
+        Violation('test.yml', 'specification', "is required"),
+        Violation('test.yml', 'start-date', "should be a date written as YYYY-MM-DD, not '24/01/2024'"),
+        Violation('test.yml', 'datasets[1].dataset', "is required"),
+        Violation('test.yml', 'datasets[1].fields[1].field', "is required"),
+        Violation('test.yml', 'datasets[1].fields[1].guidance', "should be govspeak, not list"),
+        Violation('test.yml', 'unknown', "is not a field in config.yml"),
+    ]
+
+def test_checker_types():
+    """Test each field type accepts what YAML reads for it"""
+    specifications = compile_validator(CONFIG)['specifications']
+    events = compile_validator(CONFIG)['events']
+
+    # Unquoted values are read as numbers and dates
+    assert list(specifications.check({'specification': 44, 'start-date': date(2024, 1, 1)}, 's')) == []
+    assert list(specifications.check({'specification': 'test', 'start-date': ''}, 's')) == []
+    assert list(specifications.check({'specification': 'test', 'datasets': 'none'}, 's')) == [
+        Violation('s', 'datasets', "should be a list, not str"),
+    ]
+    assert list(events.check({'start_time': '2025-08-20 10:30:00', 'type': 'general'}, 'e')) == []
+    assert [violation.path for violation in events.check({'start_time': 'soon', 'type': 'party'}, 'e')] == \
+        ['start_time', 'type']
+
+def test_get_collection_id():
+    """Test the collection is found from the directory under data/collections"""
+    assert get_collection_id('data/collections/specifications/listed-building.yml') == 'specifications'
+    assert get_collection_id('data/collections/stray.yml') is None
+    assert get_collection_id('config.yml') is None
+
+def test_validate_file_without_data(tmp_path):
+    """Test a source without data is reported rather than raising"""
+    source = tmp_path / 'empty.yml'
+    source.write_text('id: empty\n')
+
+    assert validate_file(str(source), Checker([])) == [Violation(str(source), '', "has no data")]
+
+def test_validate_collections_tree():
+    """Test every source in data/collections matches config.yml, apart from dataset names the CMS can't edit"""
+    violations = validate(load_config())
+
+    assert get_errors(violations) == []
+    assert [(violation.source, violation.path) for violation in violations] == [
+        ('data/collections/specifications/conservation-area.yml', 'datasets[0].name'),
+        ('data/collections/specifications/conservation-area.yml', 'datasets[1].name'),
+        ('data/collections/specifications/listed-building.yml', 'datasets[0].name'),
+    ]
+
+def test_checker_warns_about_fields_not_editable():
+    """Test missing required fields that can't be edited in the CMS are warnings, not errors"""
+    checker = Checker([
+        {'id': 'dataset', 'type': 'string', 'required': True},
+        {'id': 'name', 'type': 'string', 'editable': False, 'required': True},
+    ])
+
+    violations = list(checker.check({'name': ''}, 'test.yml'))
+
+    assert violations == [
+        Violation('test.yml', 'dataset', "is required"),
+        Violation('test.yml', 'name', "is required", warning=True),
+    ]
+    assert get_errors(violations) == violations[:1]
+    assert str(violations[1]) == 'test.yml: name: is required (warning)'
+
+def test_validate_parallel_matches_serial(tmp_path):
+    """Test validating across a process pool reports the same violations in the same order"""
+    sources = []
+    for index in range(4):
+        source = tmp_path / f"{index}.yml"
+        source.write_text(f"data:\n  specification: test-{index}\n  start-date: nope-{index}\n")
+        sources.append(str(source))
+
+    serial = validate(CONFIG, sources, collection_id='specifications')
+    parallel = validate(CONFIG, sources, workers=2, collection_id='specifications')
+
+    assert len(serial) == 4
+    assert parallel == serial
+
+def test_validate_source_outside_collection(tmp_path):
+    """Test sources not in a collection directory are reported"""
+    source = str(tmp_path / 'stray.yml')
+
+    assert validate(CONFIG, [source]) == [Violation(source, '', "is not in a collection in config.yml")]
+
+def test_main_exit_code(tmp_path, capsys):
+    """Test the command fails with every violation printed, as a pre-commit hook"""
+    assert main([]) == 0
+
+    config = tmp_path / 'config.yml'
+    config.write_text("collections:\n  - id: specifications\n    fields:\n      - { id: missing, required: true }\n")
+    assert main(['--config', str(config), 'data/collections/specifications/listed-building.yml', 'README.md']) == 1
+    output = capsys.readouterr().out
+    assert 'data/collections/specifications/listed-building.yml: missing: is required' in output
@@ -0,0 +1,170 @@
+import os
+import pytest
+from src.specifications.watch import Watcher
+from src.specifications.discovery import clear_cache
+
+CONFIG = (
+    "collections:\n"
+    "  - id: specifications\n"
+    "    export:\n"
+    "      source: {source}\n"
+    "      destination: content/specification/{{name}}.md\n"
+    "    fields:\n"
+    "      - id: {first}\n"
+    "      - id: {second}\n"
+)
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    clear_cache()
+    yield
+    clear_cache()
+
+@pytest.fixture
+def watched(tmp_path):
+    """A config, a collection with two sources and an output directory"""
+    source = tmp_path / 'specifications'
+    source.mkdir()
+    (source / 'tree.yml').write_text('data:\n  name: Tree\n  specification: tree\n')
+    (source / 'listed.yml').write_text('data:\n  name: Listed\n  specification: listed\n')
+    config = tmp_path / 'config.yml'
+    config.write_text(CONFIG.format(source=source, first='specification', second='name'))
+    return tmp_path
+
+def saved(path, content=None):
+    """Write a file if given content, and move its mtime on as a later save would"""
+    if content is not None:
+        path.write_text(content)
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000000))
+
+def get_watcher(directory):
+    return Watcher(str(directory / 'output'), config_path=str(directory / 'config.yml'))
+
+def test_start_renders_everything(watched):
+    """Test every source is rendered when watching starts"""
+    watcher = get_watcher(watched)
+
+    assert watcher.start() == ['content/specification/listed.md', 'content/specification/tree.md']
+    assert (watched / 'output' / 'content' / 'specification' / 'tree.md').read_text() == (
+        '---\nspecification: tree\nname: Tree\n---\n'
+    )
+    assert watcher.check() is None
+
+def test_only_changed_source_rendered(watched):
+    """Test a save renders only the saved source"""
+    watcher = get_watcher(watched)
+    watcher.start()
+
+    saved(watched / 'specifications' / 'tree.yml', 'data:\n  name: Trees\n  specification: tree\n')
+    changes = watcher.check()
+
+    assert changes == {'config': False, 'changed': {str(watched / 'specifications' / 'tree.yml')}, 'removed': set()}
+    assert watcher.update(changes) == ['content/specification/tree.md']
+    assert 'name: Trees' in (watched / 'output' / 'content' / 'specification' / 'tree.md').read_text()
+
+def test_unchanged_output_not_written(watched):
+    """Test a save that renders the same content doesn't rewrite the output"""
+    watcher = get_watcher(watched)
+    watcher.start()
+
+    saved(watched / 'specifications' / 'tree.yml')
+
+    assert watcher.update(watcher.check()) == []
+
+def test_added_and_removed_sources(watched):
+    """Test new sources are rendered, and the output of removed ones deleted"""
+    watcher = get_watcher(watched)
+    watcher.start()
+
+    (watched / 'specifications' / 'listed.yml').unlink()
+    (watched / 'specifications' / 'park.yml').write_text('data:\n  specification: park\n')
+    saved(watched / 'specifications')
+
+    assert watcher.update(watcher.check()) == ['content/specification/listed.md', 'content/specification/park.md']
+    assert sorted(os.listdir(watched / 'output' / 'content' / 'specification')) == ['park.md', 'tree.md']
+
+def test_config_change_recompiles(watched):
+    """Test a change to config.yml compiles the ordering again and renders everything"""
+    watcher = get_watcher(watched)
+    watcher.start()
+
+    saved(watched / 'config.yml', CONFIG.format(source=watched / 'specifications', first='name', second='specification'))
+    changes = watcher.check()
+
+    assert changes['config']
+    assert watcher.update(changes) == ['content/specification/listed.md', 'content/specification/tree.md']
+    assert (watched / 'output' / 'content' / 'specification' / 'tree.md').read_text() == (
+        '---\nname: Tree\nspecification: tree\n---\n'
+    )
+
+def test_invalid_config_keeps_previous(watched, capsys):
+    """Test a config.yml that fails to load is reported and the previous config kept"""
+    watcher = get_watcher(watched)
+    watcher.start()
+
+    saved(watched / 'config.yml', 'collections: [\n')
+
+    assert watcher.update(watcher.check()) == []
+    assert 'still using the previous config' in capsys.readouterr().out
+
+    saved(watched / 'specifications' / 'tree.yml', 'data:\n  name: Trees\n  specification: tree\n')
+    assert watcher.update(watcher.check()) == ['content/specification/tree.md']
+
+def test_invalid_source_reported(watched, capsys):
+    """Test a source that fails to render is reported without stopping the others"""
+    watcher = get_watcher(watched)
+    watcher.start()
+
+    saved(watched / 'specifications' / 'tree.yml', 'data: [\n')
+    saved(watched / 'specifications' / 'listed.yml', 'data:\n  specification: listed\n')
+
+    assert watcher.update(watcher.check()) == ['content/specification/listed.md']
+    assert 'Error rendering' in capsys.readouterr().out
+
+def test_run_debounces_saves(watched, capsys):
+    """Test a burst of saves is rendered once no more changes are seen"""
+    watcher = get_watcher(watched)
+    tree = watched / 'specifications' / 'tree.yml'
+    listed = watched / 'specifications' / 'listed.yml'
+    waits = []
+
+    def sleep(seconds):
+        # Save a file on the first two waits, as an editor saving several files would
+        waits.append(seconds)
+        if len(waits) == 1:
+            saved(tree, 'data:\n  name: Trees\n  specification: tree\n')
+        elif len(waits) == 2:
+            saved(listed, 'data:\n  name: Listed buildings\n  specification: listed\n')
+
+    watcher.run(interval=1, debounce=0.1, max_checks=2, sleep=sleep)
+
+    assert waits == [1, 0.1, 0.1, 1]
+    output = capsys.readouterr().out.splitlines()
+    assert output[1:] == [
+        'Updated content/specification/listed.md',
+        'Updated content/specification/tree.md',
+        output[-1],
+    ]
+    assert output[-1].startswith('Rendered 2 files in ')
+
+def test_run_config_change(watched, capsys):
+    """Test saving config.yml while running renders everything with the new ordering"""
+    watcher = get_watcher(watched)
+    waits = []
+
+    def sleep(seconds):
+        waits.append(seconds)
+        if len(waits) == 1:
+            saved(watched / 'config.yml',
+                  CONFIG.format(source=watched / 'specifications', first='name', second='specification'))
+        # A config change that never settles would keep debouncing
+        assert len(waits) < 10
+
+    watcher.run(interval=1, debounce=0.1, max_checks=1, sleep=sleep)
+
+    assert waits == [1, 0.1]
+    assert (watched / 'output' / 'content' / 'specification' / 'tree.md').read_text() == (
+        '---\nname: Tree\nspecification: tree\n---\n'
+    )
+    assert capsys.readouterr().out.splitlines()[-1].startswith('Rendered 2 files in ')